@@ -16,6 +16,7 @@ from corehq.apps.case_search.exceptions import (
     CaseFilterError,
     XPathFunctionException,
 )
+from corehq.apps.case_search.query_planner import RelatedQueryPlanner
 from corehq.apps.case_search.xpath_functions import (
     XPATH_QUERY_FUNCTIONS,
 )
@@ -33,12 +34,14 @@ class SearchFilterContext:
         'corehq.apps.case_search.utils.RegistryQueryHelper',
     ] = None
     profiler: 'corehq.apps.case_search.utils.CaseSearchProfiler' = None
+    planner: RelatedQueryPlanner = None
 
     def __post_init__(self):
         from corehq.apps.case_search.utils import QueryHelper
         if self.helper is None:
             self.helper = QueryHelper(self.domain)
         self.profiler = self.helper.profiler
+        self.planner = RelatedQueryPlanner(self.domain, self.profiler)
 
 
 def print_ast(node):
@@ -6,7 +6,7 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.dispatch import receiver
 from django.forms import model_to_dict
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.db.transaction import atomic
 from django.utils.translation import gettext as _
 
@@ -352,6 +352,16 @@ class CaseSearchConfig(models.Model):
         return config
 
 
+@receiver([post_save, post_delete], sender=CaseSearchConfig)
+@receiver([post_save, post_delete], sender=FuzzyProperties)
+@receiver([post_save, post_delete], sender=IgnorePatterns)
+@receiver(m2m_changed, sender=CaseSearchConfig.fuzzy_properties.through)
+@receiver(m2m_changed, sender=CaseSearchConfig.ignore_patterns.through)
+def case_search_config_changed(sender, instance, **kwargs):
+    from corehq.apps.case_search.result_cache import increment_config_generation
+    increment_config_generation(instance.domain)
+
+
 @quickcache(['domain'], timeout=24 * 60 * 60, memoize_timeout=60)
 def case_search_enabled_for_domain(domain):
     try:
@@ -0,0 +1,88 @@
+"""Choose how related case lookups are run
+
+Elasticsearch can't join cases to their related cases, so related case
+lookups (``subcase-exists``, ``subcase-count`` and ``ancestor-exists``)
+run intermediate queries and pass the IDs they find to the outer query.
+The case search index has no join field, so ``has_child`` queries
+aren't available. Instead, the size of each lookup is estimated before
+it is run and one of these strategies is used:
+
+- ``empty``: nothing matches, so no IDs are fetched.
+- ``id_list``: fetch the matching cases and collect their IDs.
+- ``aggregation``: count subcases by parent ID with a nested terms
+  aggregation, so that subcases are not fetched.
+- ``chunked``: look up the child cases of a large list of case IDs in
+  chunks, so that no single query has a giant ``terms`` filter.
+
+Chosen plans are recorded on the ``CaseSearchProfiler``.
+"""
+from dataclasses import asdict, dataclass
+
+from corehq import toggles
+
+EMPTY = 'empty'
+ID_LIST = 'id_list'
+AGGREGATION = 'aggregation'
+CHUNKED = 'chunked'
+
+# subcase lookups with more matches than this are aggregated
+SUBCASE_ID_LIST_LIMIT = 1000
+# child case lookups are run for at most this many case IDs at a time
+LOOKUP_CHUNK_SIZE = 1000
+
+
+@dataclass
+class RelatedQueryPlan:
+    slug: str
+    strategy: str
+    estimate: int = None
+    """Estimated number of cases matching the lookup, if known"""
+
+    def to_json(self):
+        return asdict(self)
+
+
+class RelatedQueryPlanner:
+
+    def __init__(self, domain, profiler):
+        self.domain = domain
+        self.profiler = profiler
+
+    @property
+    def enabled(self):
+        return toggles.CASE_SEARCH_RELATED_QUERY_PLANNER.enabled(self.domain)
+
+    def plan_subcase_lookup(self, subcase_es):
+        """Plan a lookup of parent cases from the subcases matching ``subcase_es``"""
+        if not self.enabled:
+            return self._add_plan('subcase_lookup', ID_LIST)
+        estimate = subcase_es.count()
+        if not estimate:
+            strategy = EMPTY
+        elif estimate > SUBCASE_ID_LIST_LIMIT:
+            strategy = AGGREGATION
+        else:
+            strategy = ID_LIST
+        return self._add_plan('subcase_lookup', strategy, estimate)
+
+    def plan_ancestor_filter(self, estimate):
+        """Plan a lookup of the cases matching an ancestor-exists filter
+
+        :param estimate: Number of cases matching the filter.
+        """
+        strategy = EMPTY if self.enabled and not estimate else ID_LIST
+        return self._add_plan('ancestor_filter', strategy, estimate)
+
+    def plan_child_case_lookup(self, case_ids):
+        """Plan a lookup of the child cases of ``case_ids``"""
+        estimate = len(case_ids)
+        if self.enabled and estimate > LOOKUP_CHUNK_SIZE:
+            strategy = CHUNKED
+        else:
+            strategy = ID_LIST
+        return self._add_plan('child_case_lookup', strategy, estimate)
+
+    def _add_plan(self, slug, strategy, estimate=None):
+        plan = RelatedQueryPlan(slug, strategy, estimate)
+        self.profiler.plans.append(plan)
+        return plan
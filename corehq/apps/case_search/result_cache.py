@@ -0,0 +1,181 @@
+"""Shared cache of case search results
+
+Many users of an app run the same searches (e.g. the same case list
+filters), so search results are cached in Redis, keyed on the domain,
+app, case types and normalized search criteria.
+
+Cached results are not deleted when cases change. Instead, the case
+search pillow increments a generation counter for the domain and case
+type of each case it processes, and the current generations of the case
+types a search depends on are part of its cache key. Searches that can
+return or filter on cases of unknown case types (related case lookups
+and related case expansion) also depend on a generation counter for the
+whole domain. All searches depend on a generation counter for the case
+search config of the domain (fuzzy properties and ignore patterns),
+which is incremented when it is saved.
+
+Cases written by the pillow are not found by searches until the index is
+refreshed. Searches that run in that window would cache stale results
+under the new generations, so the generations are incremented again
+once the index has been refreshed.
+"""
+import hashlib
+import json
+from operator import attrgetter
+
+from django.core.cache import cache
+from eulxml.xpath import parse as parse_xpath
+from eulxml.xpath import serialize
+from eulxml.xpath.ast import BinaryExpression, FunctionCall
+
+from corehq import toggles
+from corehq.apps.case_search.models import CASE_SEARCH_XPATH_QUERY_KEY
+
+RESULTS_TIMEOUT = 5 * 60
+# the refresh_interval of the case search index
+INDEX_REFRESH_INTERVAL = 5
+RELATED_LOOKUP_FUNCTIONS = {'subcase-exists', 'subcase-count', 'ancestor-exists'}
+
+
+def get_generation_key(domain, case_type=None):
+    if case_type is None:
+        return f'case-search-generation:{domain}'
+    return f'case-search-generation:{domain}:case-type:{case_type}'
+
+
+def get_config_generation_key(domain):
+    return f'case-search-config-generation:{domain}'
+
+
+def increment_config_generation(domain):
+    """Invalidate cached search results of a domain whose case search
+    config changed
+    """
+    cache.incr(get_config_generation_key(domain), ignore_key_check=True)
+
+
+def increment_generations(domain, case_type, again_after_refresh=True):
+    """Invalidate cached search results that may include a case of ``case_type``
+
+    Called by the case search pillow for every case it processes.
+
+    :param again_after_refresh: Increment the generations again after the
+    index has been refreshed. At most one increment is pending for each
+    case type: it is scheduled late enough to cover every case processed
+    before the next one can be scheduled.
+    """
+    from corehq.apps.case_search.tasks import increment_generations_after_refresh
+
+    keys = [get_generation_key(domain)]
+    if case_type:
+        keys.append(get_generation_key(domain, case_type))
+    for key in keys:
+        cache.incr(key, ignore_key_check=True)
+
+    pending_key = f'{keys[-1]}:pending'
+    if again_after_refresh and cache.add(pending_key, 1, timeout=INDEX_REFRESH_INTERVAL):
+        increment_generations_after_refresh.apply_async(
+            args=[domain, case_type],
+            countdown=2 * INDEX_REFRESH_INTERVAL,
+        )
+
+
+class CaseSearchResultCache:
+
+    def __init__(self, key):
+        self.key = key
+
+    @classmethod
+    def for_request(cls, domain, app_id, config):
+        """Get the cache for a search request, or None if it can't be cached
+
+        :param config: ``CaseSearchRequestConfig`` of the request.
+        """
+        from corehq.apps.case_search.utils import get_app_context, get_max_search_results
+
+        if not toggles.CASE_SEARCH_RESULT_CACHE.enabled(domain):
+            return None
+        if config.data_registry:
+            # the domains that are searched depend on the user
+            return None
+        criteria = []
+        depends_on_domain = bool(config.custom_related_case_property or config.include_all_related_cases)
+        for search_criteria in sorted(config.criteria, key=attrgetter('key')):
+            try:
+                values, has_related_lookup = _normalize_criteria(search_criteria)
+            except _UnparsableXpath:
+                return None
+            criteria.append((search_criteria.key, values))
+            depends_on_domain = depends_on_domain or has_related_lookup
+
+        case_types = _as_list(config.case_types)
+        dependencies = set(case_types)
+        if app_id and not depends_on_domain:
+            paths, child_case_types = get_app_context(domain, app_id, case_types)
+            depends_on_domain = bool(paths)
+            dependencies.update(child_case_types)
+        generation_keys = sorted(get_generation_key(domain, case_type) for case_type in dependencies)
+        if depends_on_domain:
+            generation_keys.append(get_generation_key(domain))
+        generation_keys.append(get_config_generation_key(domain))
+        generations = cache.get_many(generation_keys)
+
+        key_parts = [
+            domain,
+            app_id,
+            sorted(case_types),
+            criteria,
+            config.custom_related_case_property,
+            config.include_all_related_cases,
+            [(prop.property_name, prop.sort_type, prop.is_descending) for prop in config.commcare_sort or []],
+            get_max_search_results(domain),
+            [(key, generations.get(key, 0)) for key in generation_keys],
+        ]
+        key_hash = hashlib.md5(json.dumps(key_parts).encode('utf-8')).hexdigest()
+        return cls(f'case-search-results:{domain}:{key_hash}')
+
+    def get(self):
+        return cache.get(self.key)
+
+    def set(self, fixtures):
+        cache.set(self.key, fixtures, RESULTS_TIMEOUT)
+
+
+class _UnparsableXpath(Exception):
+    pass
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _normalize_criteria(criteria):
+    """Get the normalized values of search criteria, and whether they look up related cases"""
+    values = _as_list(criteria.value)
+    if criteria.key == CASE_SEARCH_XPATH_QUERY_KEY:
+        nodes = [_parse_xpath(value) for value in values if value]
+        return [serialize(node) for node in nodes], any(_is_related_lookup(node) for node in nodes)
+    return values, '/' in criteria.key
+
+
+def _parse_xpath(xpath):
+    try:
+        return parse_xpath(xpath)
+    except TypeError:
+        raise _UnparsableXpath
+    except RuntimeError:
+        # eulxml doesn't clean up after this type of failure (see build_filter_from_xpath)
+        parse_xpath("thisisdumb")
+        raise _UnparsableXpath
+
+
+def _is_related_lookup(node):
+    if isinstance(node, FunctionCall):
+        if str(node.name) in RELATED_LOOKUP_FUNCTIONS:
+            return True
+        return any(_is_related_lookup(arg) for arg in node.args)
+    if isinstance(node, BinaryExpression):
+        return node.op == '/' or _is_related_lookup(node.left) or _is_related_lookup(node.right)
+    return False
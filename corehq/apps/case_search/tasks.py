@@ -1,3 +1,4 @@
+from corehq.apps.case_search.result_cache import increment_generations
 from corehq.apps.celery import task
 from corehq.pillows.case_search import (
     CaseSearchReindexerFactory,
@@ -13,3 +14,8 @@ def reindex_case_search_for_domain(domain):
 @task
 def delete_case_search_cases_for_domain(domain):
     delete_case_search_cases(domain)
+
+
+@task
+def increment_generations_after_refresh(domain, case_type):
+    increment_generations(domain, case_type, again_after_refresh=False)
@@ -524,3 +524,38 @@ class TestFilterDslLookups(ElasticTestMixin, TestCase):
         expected_filter = filters.match_none()
         built_filter = build_filter_from_ast(parsed, SearchFilterContext(self.domain))
         self.checkQuery(built_filter, expected_filter, is_raw_query=True)
+
+    @flag_enabled('CASE_SEARCH_RELATED_QUERY_PLANNER')
+    def test_subcase_count_planned_aggregation(self):
+        parsed = parse_xpath("subcase-count('father', house='Tyrell') = 2")
+        context = SearchFilterContext(self.domain)
+        with patch('corehq.apps.case_search.query_planner.SUBCASE_ID_LIST_LIMIT', 1):
+            built_filter = build_filter_from_ast(parsed, context)
+        self.checkQuery(built_filter, filters.doc_id([self.parent_case_id]), is_raw_query=True)
+        self.assertEqual(
+            [plan.to_json() for plan in context.profiler.plans],
+            [{'slug': 'subcase_lookup', 'strategy': 'aggregation', 'estimate': 2}],
+        )
+
+    @flag_enabled('CASE_SEARCH_RELATED_QUERY_PLANNER')
+    def test_subcase_exists_planned_empty(self):
+        parsed = parse_xpath("not(subcase-exists('father', name='Mace'))")
+        context = SearchFilterContext(self.domain)
+        built_filter = build_filter_from_ast(parsed, context)
+        self.checkQuery(built_filter, filters.NOT(filters.match_none()), is_raw_query=True)
+        self.assertEqual([plan.strategy for plan in context.profiler.plans], ['empty'])
+
+    @flag_enabled('CASE_SEARCH_RELATED_QUERY_PLANNER')
+    def test_ancestor_exists_planned_chunks(self):
+        parsed = parse_xpath("ancestor-exists(father/mother, house='Tyrell')")
+        context = SearchFilterContext(self.domain)
+        with patch('corehq.apps.case_search.query_planner.LOOKUP_CHUNK_SIZE', 1):
+            built_filter = build_filter_from_ast(parsed, context)
+        self.assertItemsEqual(
+            CaseSearchES().filter(built_filter).values_list('_id', flat=True),
+            [self.child_case1_id, self.child_case2_id],
+        )
+        self.assertEqual(
+            [plan.strategy for plan in context.profiler.plans],
+            ['id_list', 'chunked'],
+        )
@@ -0,0 +1,98 @@
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from corehq.apps.case_search.models import extract_search_request_config
+from corehq.apps.case_search.result_cache import (
+    CaseSearchResultCache,
+    increment_config_generation,
+    increment_generations,
+)
+from corehq.util.test_utils import flag_disabled, flag_enabled
+
+
+def _get_cache(domain, request_dict, app_id=None):
+    config = extract_search_request_config(request_dict)
+    return CaseSearchResultCache.for_request(domain, app_id, config)
+
+
+def _get_key(domain, request_dict):
+    return _get_cache(domain, request_dict).key
+
+
+@flag_enabled('CASE_SEARCH_RESULT_CACHE')
+@flag_disabled('INCREASED_MAX_SEARCH_RESULTS')
+class CaseSearchResultCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.domain = uuid.uuid4().hex
+
+    def test_normalized_criteria(self):
+        first = _get_key(self.domain, {
+            'case_type': ['patient'],
+            'name': ['bob'],
+            '_xpath_query': ["age > 10 and  status='open'"],
+        })
+        second = _get_key(self.domain, {
+            '_xpath_query': ["age>10 and status = 'open'"],
+            'name': ['bob'],
+            'case_type': ['patient'],
+        })
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, _get_key(self.domain, {'case_type': ['patient'], 'name': ['alice']}))
+
+    def test_get_and_set(self):
+        request_dict = {'case_type': ['patient'], 'name': ['bob']}
+        _get_cache(self.domain, request_dict).set(b'<results id="case"/>')
+        self.assertEqual(_get_cache(self.domain, request_dict).get(), b'<results id="case"/>')
+
+    def test_invalidated_by_case_type(self):
+        request_dict = {'case_type': ['patient'], 'name': ['bob']}
+        key = _get_key(self.domain, request_dict)
+        increment_generations(self.domain, 'household')
+        self.assertEqual(_get_key(self.domain, request_dict), key)
+        increment_generations(self.domain, 'patient')
+        self.assertNotEqual(_get_key(self.domain, request_dict), key)
+
+    @patch('corehq.apps.case_search.tasks.increment_generations_after_refresh.apply_async')
+    def test_incremented_again_after_refresh(self, apply_async):
+        increment_generations(self.domain, 'patient')
+        increment_generations(self.domain, 'patient')
+        apply_async.assert_called_once_with(args=[self.domain, 'patient'], countdown=10)
+
+        request_dict = {'case_type': ['patient'], 'name': ['bob']}
+        key = _get_key(self.domain, request_dict)
+        increment_generations(self.domain, 'patient', again_after_refresh=False)
+        self.assertNotEqual(_get_key(self.domain, request_dict), key)
+        self.assertEqual(apply_async.call_count, 1)
+
+    def test_invalidated_by_config_change(self):
+        request_dict = {'case_type': ['patient'], 'name': ['bob']}
+        key = _get_key(self.domain, request_dict)
+        increment_config_generation(self.domain)
+        self.assertNotEqual(_get_key(self.domain, request_dict), key)
+
+    def test_key_depends_on_max_results(self):
+        request_dict = {'case_type': ['patient'], 'name': ['bob']}
+        key = _get_key(self.domain, request_dict)
+        with flag_enabled('INCREASED_MAX_SEARCH_RESULTS'):
+            self.assertNotEqual(_get_key(self.domain, request_dict), key)
+
+    def test_related_lookup_invalidated_by_any_case_type(self):
+        request_dict = {'case_type': ['patient'], '_xpath_query': ["ancestor-exists(parent, name='bob')"]}
+        key = _get_key(self.domain, request_dict)
+        increment_generations(self.domain, 'household')
+        self.assertNotEqual(_get_key(self.domain, request_dict), key)
+
+    def test_registry_search_not_cached(self):
+        request_dict = {'case_type': ['patient'], 'x_commcare_data_registry': ['registry']}
+        self.assertIsNone(_get_cache(self.domain, request_dict))
+
+    def test_unparsable_xpath_not_cached(self):
+        request_dict = {'case_type': ['patient'], '_xpath_query': ["name ~ 'bob'"]}
+        self.assertIsNone(_get_cache(self.domain, request_dict))
+
+    @flag_disabled('CASE_SEARCH_RESULT_CACHE')
+    def test_disabled(self):
+        self.assertIsNone(_get_cache(self.domain, {'case_type': ['patient']}))
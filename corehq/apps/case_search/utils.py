@@ -35,6 +35,7 @@ from corehq.apps.case_search.models import (
     CaseSearchConfig,
     extract_search_request_config,
 )
+from corehq.apps.case_search.result_cache import CaseSearchResultCache
 from corehq.apps.es import case_search, filters, queries
 from corehq.apps.es.case_search import (
     CaseSearchES,
@@ -61,6 +62,7 @@ class CaseSearchProfiler:
     timing_context: TimingContext = field(
         default_factory=lambda: TimingContext('Case Search'))
     queries: list = field(default_factory=list)
+    plans: list = field(default_factory=list)
     _query_number: int = 0
 
     def get_case_search_class(self, slug=None):
@@ -108,6 +110,12 @@ def get_case_search_results_from_request(domain, app_id, couch_user, request_dic
     profiler = CaseSearchProfiler(debug_mode=debug)
     with profiler.timing_context:
         config = extract_search_request_config(request_dict)
+        result_cache = None if debug else CaseSearchResultCache.for_request(domain, app_id, config)
+        if result_cache:
+            with profiler.timing_context('CaseSearchResultCache.get'):
+                fixtures = result_cache.get()
+            if fixtures is not None:
+                return fixtures, profiler
         cases = get_case_search_results(
             domain,
             config.case_types,
@@ -122,9 +130,17 @@ def get_case_search_results_from_request(domain, app_id, couch_user, request_dic
         )
         with profiler.timing_context('CaseDBFixture.fixture'):
             fixtures = CaseDBFixture(cases).fixture
+        if result_cache:
+            result_cache.set(fixtures)
     return fixtures, profiler
 
 
+def get_max_search_results(domain):
+    if toggles.INCREASED_MAX_SEARCH_RESULTS.enabled(domain):
+        return 1500
+    return CASE_SEARCH_MAX_RESULTS
+
+
 def get_case_search_results(domain, case_types, criteria,
                             app_id=None, couch_user=None, registry_slug=None, custom_related_case_property=None,
                             include_all_related_cases=None, commcare_sort=None, profiler=None):
@@ -241,13 +257,10 @@ class CaseSearchQueryBuilder:
         return search_es
 
     def _get_initial_search_es(self):
-        max_results = CASE_SEARCH_MAX_RESULTS
-        if toggles.INCREASED_MAX_SEARCH_RESULTS.enabled(self.request_domain):
-            max_results = 1500
         return (self.helper.get_base_queryset('main')
                 .case_type(self.case_types)
                 .is_closed(False)
-                .size(max_results))
+                .size(get_max_search_results(self.request_domain)))
 
     def _apply_sort(self, search_es, commcare_sort=None):
         if commcare_sort:
@@ -125,6 +125,7 @@ class ProfileCaseSearchView(_BaseCaseSearchView):
             'related_count': profiler.related_count,
             'timing_data': profiler.timing_context.to_dict(),
             'queries': [self._make_profile_downloadable(q) for q in profiler.queries],
+            'plans': [plan.to_json() for plan in profiler.plans],
         })
 
     @staticmethod
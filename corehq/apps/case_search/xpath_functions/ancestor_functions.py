@@ -2,6 +2,9 @@ from django.utils.translation import gettext
 from eulxml.xpath import serialize
 from eulxml.xpath.ast import BinaryExpression, FunctionCall, Step
 
+from dimagi.utils.chunked import chunked
+
+from corehq.apps.case_search import query_planner
 from corehq.apps.case_search.const import OPERATOR_MAPPING, EQ
 from corehq.apps.case_search.dsl_utils import unwrap_value
 from corehq.apps.case_search.exceptions import CaseFilterError, TooManyRelatedCasesError
@@ -48,7 +51,7 @@ def walk_ancestor_hierarchy(context, ancestor_path_node, case_ids):
     node = ancestor_path_node
 
     # get the related case path we need to walk, i.e. `parent/grandparent`
-    while _is_ancestor_path_expression(node):
+    while case_ids and _is_ancestor_path_expression(node):
         # This walks down the tree and finds case ids that match each identifier
         # This is basically performing multiple "joins" to find related cases since ES
         # doesn't have a way to relate models together
@@ -90,8 +93,17 @@ def _is_ancestor_path_expression(node):
 def _child_case_lookup(context, case_ids, identifier):
     """returns a list of all case_ids who have parents `case_id` with the relationship `identifier`
     """
-    es_query = context.helper.get_base_queryset('_child_case_lookup').get_child_cases(case_ids, identifier)
-    return es_query.get_ids()
+    plan = context.planner.plan_child_case_lookup(case_ids)
+    if plan.strategy == query_planner.CHUNKED:
+        child_case_ids = set()
+        for chunk in chunked(case_ids, query_planner.LOOKUP_CHUNK_SIZE, list):
+            child_case_ids.update(_child_case_lookup_query(context, chunk, identifier).get_ids())
+        return list(child_case_ids)
+    return _child_case_lookup_query(context, case_ids, identifier).get_ids()
+
+
+def _child_case_lookup_query(context, case_ids, identifier):
+    return context.helper.get_base_queryset('_child_case_lookup').get_child_cases(case_ids, identifier)
 
 
 def ancestor_exists(node, context):
@@ -144,10 +156,14 @@ def _get_case_ids_from_ast_filter(context, filter_node):
         from corehq.apps.case_search.filter_dsl import build_filter_from_ast
         es_filter = build_filter_from_ast(filter_node, context)
         es_query = context.helper.get_base_queryset('_get_case_ids_from_ast_filter').filter(es_filter)
-        if es_query.count() > MAX_RELATED_CASES:
+        count = es_query.count()
+        if count > MAX_RELATED_CASES:
             new_query = serialize(filter_node)
             raise TooManyRelatedCasesError(
                 gettext("The related case lookup you are trying to perform would return too many cases"),
                 new_query
             )
+        plan = context.planner.plan_ancestor_filter(count)
+        if plan.strategy == query_planner.EMPTY:
+            return []
         return es_query.get_ids()
@@ -9,9 +9,15 @@ from eulxml.xpath.ast import (
     serialize,
 )
 
+from corehq.apps.case_search import query_planner
 from corehq.apps.case_search.const import MAX_RELATED_CASES
 from corehq.apps.case_search.exceptions import XPathFunctionException
 from corehq.apps.es import filters, queries
+from corehq.apps.es.aggregations import (
+    FilterAggregation,
+    NestedAggregation,
+    TermsAggregation,
+)
 
 
 @dataclass
@@ -67,13 +73,19 @@ def _get_parent_case_ids_matching_subcase_query(subcase_query, context):
 
     Only cases with `[>,=] case_count_gt` subcases will be returned.
     """
-
-    counts_by_parent_id = Counter(
-        index['referenced_id']
-        for subcase in _run_subcase_query(subcase_query, context)
-        for index in subcase['indices']
-        if index['identifier'] == subcase_query.index_identifier
-    )
+    subcase_es = _get_subcase_query(subcase_query, context)
+    plan = context.planner.plan_subcase_lookup(subcase_es)
+    if plan.strategy == query_planner.EMPTY:
+        counts_by_parent_id = Counter()
+    elif plan.strategy == query_planner.AGGREGATION:
+        counts_by_parent_id = _aggregate_subcase_query(subcase_query, subcase_es)
+    else:
+        counts_by_parent_id = Counter(
+            index['referenced_id']
+            for subcase in subcase_es.source(['indices.referenced_id', 'indices.identifier']).run().hits
+            for index in subcase['indices']
+            if index['identifier'] == subcase_query.index_identifier
+        )
     if len(counts_by_parent_id) > MAX_RELATED_CASES:
         from ..exceptions import TooManyRelatedCasesError
         raise TooManyRelatedCasesError(
@@ -89,7 +101,7 @@ def _get_parent_case_ids_matching_subcase_query(subcase_query, context):
     ]
 
 
-def _run_subcase_query(subcase_query, context):
+def _get_subcase_query(subcase_query, context):
     from corehq.apps.case_search.filter_dsl import (
         build_filter_from_ast,
     )
@@ -105,18 +117,35 @@ def _run_subcase_query(subcase_query, context):
             'indices',
             queries.filtered(
                 queries.match_all(),
-                filters.AND(
-                    filters.term('indices.identifier', subcase_query.index_identifier),
-                    filters.NOT(filters.term('indices.referenced_id', ''))  # exclude deleted indices
-                )
+                _subcase_index_filter(subcase_query)
             )
         )
         .filter(subcase_filter)
-        .source(['indices.referenced_id', 'indices.identifier'])
-        .run().hits
     )
 
 
+def _subcase_index_filter(subcase_query):
+    return filters.AND(
+        filters.term('indices.identifier', subcase_query.index_identifier),
+        filters.NOT(filters.term('indices.referenced_id', ''))  # exclude deleted indices
+    )
+
+
+def _aggregate_subcase_query(subcase_query, subcase_es):
+    """Count subcases by parent case ID without fetching the subcases
+
+    Fetches one more parent than ``MAX_RELATED_CASES`` so that lookups
+    with too many parents can be detected.
+    """
+    aggregation = NestedAggregation('indices', 'indices').aggregation(
+        FilterAggregation('identifier', _subcase_index_filter(subcase_query)).aggregation(
+            TermsAggregation('parents', 'indices.referenced_id', size=MAX_RELATED_CASES + 1)
+        )
+    )
+    results = subcase_es.size(0).aggregation(aggregation).run()
+    return Counter(results.aggregations.indices.identifier.parents.counts_by_bucket())
+
+
 def _parse_normalize_subcase_query(node) -> SubCaseQuery:
     """Parse the subcase query and normalize it to the form 'subcase-count > N' or 'subcase-count = N'
     """
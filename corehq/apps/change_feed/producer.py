@@ -1,6 +1,8 @@
 import json
 import logging
+import threading
 import uuid
+from contextlib import contextmanager
 from functools import partial
 
 from django.conf import settings
@@ -20,6 +22,7 @@ class ChangeProducer(object):
     def __init__(self, auto_flush=True):
         self.auto_flush = auto_flush
         self._producer = None
+        self._local = threading.local()
 
     @property
     def producer(self):
@@ -42,15 +45,50 @@ class ChangeProducer(object):
         change_meta._transaction_id = uuid.uuid4().hex
         try:
             future = self.producer.send(topic, message_json_dump, key=change_meta.document_id)
-            if self.auto_flush:
+            if self._should_flush():
                 future.get()
         except Exception as e:
             raise KafkaPublishingError(e)
 
-        if not self.auto_flush:
+        if getattr(self._local, 'batching', False):
+            self._local.sent.append((future, change_meta))
+        elif not self._should_flush():
             on_error = partial(_on_error, change_meta)
             future.add_errback(on_error)
 
+    def _should_flush(self):
+        return self.auto_flush and not getattr(self._local, 'batching', False)
+
+    @contextmanager
+    def batch(self):
+        """Send changes without waiting for each one to be acknowledged
+
+        Changes sent in the current thread while the context is active
+        are flushed when it exits.
+
+        :raises: ``KafkaPublishingError`` when the context exits if any of
+        the changes could not be sent. Its ``change_metas`` are the
+        changes that were not sent.
+        """
+        if getattr(self._local, 'batching', False):
+            yield
+            return
+        self._local.batching = True
+        self._local.sent = []
+        try:
+            yield
+        finally:
+            self._local.batching = False
+            sent, self._local.sent = self._local.sent, []
+            if self._producer is not None:
+                self.flush()
+        failed = [change_meta for future, change_meta in sent if not future.succeeded()]
+        if failed:
+            raise KafkaPublishingError(
+                "%s changes could not be sent to Kafka" % len(failed),
+                change_metas=failed,
+            )
+
     def flush(self, timeout=None):
         self.producer.flush(timeout=timeout)
 
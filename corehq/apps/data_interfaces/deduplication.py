@@ -4,6 +4,9 @@ from django.utils.text import slugify
 
 from casexml.apps.case.const import CASE_UI_OWNER_ID
 
+from dimagi.utils.chunked import chunked
+
+from corehq import toggles
 from corehq.apps.case_search.const import INDEXED_METADATA_BY_KEY
 from corehq.apps.data_interfaces.utils import iter_cases_and_run_rules
 from corehq.apps.es import queries
@@ -127,24 +130,11 @@ def find_duplicate_case_ids(
 
 
 def add_case_properties_to_query(es, case, case_properties, match_type):
-    # HACK: due to inconsistencies in how case metadata properties are displayed
-    # to users, we need to translate the display value to the backend value
-    display_to_backend_properties_map = {CASE_UI_OWNER_ID: "@owner_id"}
-
     clause = queries.MUST if match_type == "ALL" else queries.SHOULD
-    _case_json = None
 
     at_least_one_property_query = False
 
-    for case_property_name in case_properties:
-        case_property_name = display_to_backend_properties_map.get(case_property_name, case_property_name)
-        if case_property_name in INDEXED_METADATA_BY_KEY:
-            if _case_json is None:
-                _case_json = case.to_json()
-            case_property_value = INDEXED_METADATA_BY_KEY[case_property_name].get_value(_case_json)
-        else:
-            case_property_value = case.get_case_property(case_property_name)
-
+    for case_property_name, case_property_value in iter_case_property_values(case, case_properties):
         if not case_property_value:
             continue
 
@@ -159,6 +149,27 @@ def add_case_properties_to_query(es, case, case_properties, match_type):
     return (es, at_least_one_property_query)
 
 
+def iter_case_property_values(case, case_properties):
+    """Yield the name and value of each property as it is indexed in
+    Elasticsearch, which is how duplicates are matched
+    """
+    # HACK: due to inconsistencies in how case metadata properties are displayed
+    # to users, we need to translate the display value to the backend value
+    display_to_backend_properties_map = {CASE_UI_OWNER_ID: "@owner_id"}
+
+    _case_json = None
+
+    for case_property_name in case_properties:
+        case_property_name = display_to_backend_properties_map.get(case_property_name, case_property_name)
+        if case_property_name in INDEXED_METADATA_BY_KEY:
+            if _case_json is None:
+                _case_json = case.to_json()
+            case_property_value = INDEXED_METADATA_BY_KEY[case_property_name].get_value(_case_json)
+        else:
+            case_property_value = case.get_case_property(case_property_name)
+        yield case_property_name, case_property_value
+
+
 def reset_and_backfill_deduplicate_rule(rule):
     from corehq.apps.data_interfaces.models import AutomaticUpdateRule
     from corehq.apps.data_interfaces.tasks import (
@@ -181,12 +192,14 @@ def reset_deduplicate_rule(rule):
     """
     from corehq.apps.data_interfaces.models import (
         CaseDeduplicationActionDefinition,
+        CaseDeduplicationBlockingKey,
         CaseDuplicate,
         CaseDuplicateNew,
     )
     deduplicate_action = CaseDeduplicationActionDefinition.from_rule(rule)
     CaseDuplicate.objects.filter(action=deduplicate_action).delete()
     CaseDuplicateNew.objects.filter(action=deduplicate_action).delete()
+    CaseDeduplicationBlockingKey.objects.filter(action=deduplicate_action).delete()
 
 
 def backfill_deduplicate_rule(domain, rule):
@@ -210,6 +223,9 @@ def backfill_deduplicate_rule(domain, rule):
             workflow=AutomaticUpdateRule.WORKFLOW_DEDUPLICATE,
         )
         action = CaseDeduplicationActionDefinition.from_rule(rule)
+        if toggles.CASE_DEDUPE_BLOCKING_KEYS.enabled(domain):
+            _backfill_blocks(domain, rule, action, now, run_record.id, progress_helper)
+            return
         case_iterator = AutomaticUpdateRule.iter_cases(
             domain, rule.case_type, include_closed=action.include_closed
         )
@@ -229,6 +245,39 @@ def backfill_deduplicate_rule(domain, rule):
         rule.save(update_fields=['last_run', 'locked_for_editing'])
 
 
+def _backfill_blocks(domain, rule, action, now, run_id, progress_helper):
+    """Save the blocking keys of the cases of the rule, then record the
+    cases that share a block as duplicates
+    """
+    from corehq.apps.data_interfaces.models import (
+        AutomaticUpdateRule,
+        CaseDeduplicationBlockingKey,
+        DomainCaseRuleRun,
+    )
+    from corehq.apps.hqcase.utils import is_copied_case
+
+    case_iterator = AutomaticUpdateRule.iter_cases(
+        domain,
+        rule.case_type,
+        include_closed=action.include_closed,
+        case_filter=rule.get_case_filter(now),
+    )
+    cases_checked = 0
+    for cases in chunked(case_iterator, 1000):
+        CaseDeduplicationBlockingKey.objects.bulk_create([
+            CaseDeduplicationBlockingKey(action=action, case_id=case.case_id, key=key)
+            for case in cases
+            if not is_copied_case(case) and rule.criteria_match(case, now)
+            for key in action.get_blocking_keys(case)
+        ])
+        for __ in cases:
+            progress_helper.increment_current_case_count()
+        cases_checked += len(cases)
+
+    result = action.record_duplicates_in_blocks(rule)
+    DomainCaseRuleRun.done(run_id, cases_checked, result)
+
+
 def get_dedupe_xmlns(rule):
     name_slug = slugify(rule.name)
     return f"{DEDUPE_XMLNS}__{name_slug}-{rule.case_type}"
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_interfaces", "0038_alter_caseduplicate_potential_duplicates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaseDeduplicationBlockingKey",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("case_id", models.CharField(max_length=126)),
+                ("key", models.CharField(max_length=64)),
+                ("action", models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to="data_interfaces.casededuplicationactiondefinition",
+                )),
+            ],
+            options={
+                "unique_together": {("action", "case_id", "key")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="casededuplicationblockingkey",
+            index=models.Index(fields=["action", "key"], name="data_interf_action__53e9f9_idx"),
+        ),
+    ]
@@ -3,12 +3,24 @@ import hashlib
 import operator
 import re
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
+from functools import reduce
 
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.db import models, transaction
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Substr
+from django.db.models.lookups import (
+    GreaterThan,
+    GreaterThanOrEqual,
+    IsNull,
+    LessThan,
+    LessThanOrEqual,
+    Regex,
+)
 from django.utils.translation import gettext_lazy
 from django.utils.functional import cached_property
 
@@ -39,6 +51,7 @@ from corehq.apps.data_interfaces.deduplication import (
     case_exists_in_es as _case_exists_in_es,
     find_duplicate_case_ids as _find_duplicate_case_ids,
     get_dedupe_xmlns,
+    iter_case_property_values,
     reset_and_backfill_deduplicate_rule,
     reset_deduplicate_rule,
 )
@@ -60,6 +73,7 @@ from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     get_case_timed_schedule_instances_for_schedule_id,
 )
 from corehq.messaging.scheduling.tasks import (
+    CaseScheduleInstanceBatch,
     delete_case_alert_schedule_instances,
     delete_case_timed_schedule_instances,
     refresh_case_alert_schedule_instances,
@@ -136,6 +150,10 @@ class AutomaticUpdateRule(models.Model):
     upstream_id = models.CharField(max_length=32, null=True)
     locked_for_editing = models.BooleanField(default=False)
 
+    # CaseUpdateBatch collecting the case updates of this rule, set by
+    # batched_case_updates during rule runs
+    case_update_batch = None
+
     class Meta(object):
         app_label = "data_interfaces"
         indexes = [
@@ -243,8 +261,19 @@ class AutomaticUpdateRule(models.Model):
                 min_boundary = rule.server_modified_boundary
         return now - timedelta(days=min_boundary)
 
+    @staticmethod
+    def get_case_filter_for_rules(rules, now):
+        """
+        :returns: ``Q`` object matching the cases that may match any of the
+        rules, or None if the cases can't be filtered in the database
+        """
+        filters = [rule.get_case_filter(now) for rule in rules]
+        if not filters or None in filters:
+            return None
+        return reduce(operator.or_, filters)
+
     @classmethod
-    def iter_cases(cls, domain, case_type, db=None, modified_lte=None, include_closed=False):
+    def iter_cases(cls, domain, case_type, db=None, modified_lte=None, include_closed=False, case_filter=None):
         q_expression = Q(domain=domain, type=case_type, deleted=False)
 
         if not include_closed:
@@ -253,6 +282,9 @@ class AutomaticUpdateRule(models.Model):
         if modified_lte:
             q_expression = q_expression & Q(server_modified_on__lte=modified_lte)
 
+        if case_filter is not None:
+            q_expression = q_expression & case_filter
+
         if db:
             return paginate_query(db, CommCareCase, q_expression, load_source='auto_update_rule')
         else:
@@ -369,6 +401,29 @@ class AutomaticUpdateRule(models.Model):
         else:
             return all(results)
 
+    def get_case_filter(self, now):
+        """Get a database filter for the cases that may match this rule
+
+        The filter matches a superset of the cases that ``criteria_match``
+        matches, so cases that match it must still be checked with
+        ``criteria_match``. Criteria that can't be evaluated in the database
+        (e.g. custom and UCR criteria) are left to ``criteria_match``.
+
+        :returns: ``Q`` object or None if no filter can be applied
+        """
+        filters = [criteria.definition.get_case_filter(now) for criteria in self.memoized_criteria]
+
+        if self.filter_on_server_modified:
+            filters.append(Q(server_modified_on__lt=now - timedelta(days=self.server_modified_boundary)))
+
+        if self.criteria_operator == 'ANY':
+            if not filters or None in filters:
+                return None
+            return reduce(operator.or_, filters)
+        else:
+            filters = [f for f in filters if f is not None]
+            return reduce(operator.and_, filters) if filters else None
+
     def _run_method_on_action_definitions(self, case, method):
         aggregated_result = CaseRuleActionResult()
 
@@ -559,6 +614,13 @@ class CaseRuleCriteriaDefinition(models.Model):
     def matches(self, case, now):
         raise NotImplementedError()
 
+    def get_case_filter(self, now):
+        """
+        :returns: ``Q`` object matching at least the cases that ``matches``
+        matches, or None if this definition can't be evaluated in the database
+        """
+        return None
+
 
 class MatchPropertyDefinition(CaseRuleCriteriaDefinition):
     MATCH_DAYS_LESS_THAN = 'DAYS_BEFORE'
@@ -585,6 +647,15 @@ class MatchPropertyDefinition(CaseRuleCriteriaDefinition):
         MATCH_REGEX,
     )
 
+    # lookups on a case's date value for each days match type, with
+    # `today - property_value days` as the right-hand side
+    DAYS_LOOKUPS = {
+        MATCH_DAYS_LESS_THAN: GreaterThan,
+        MATCH_DAYS_LESS_OR_EQUAL: GreaterThanOrEqual,
+        MATCH_DAYS_GREATER_THAN: LessThan,
+        MATCH_DAYS_GREATER_OR_EQUAL: LessThanOrEqual,
+    }
+
     property_name = models.CharField(max_length=126)
     property_value = models.CharField(max_length=126, null=True)
     match_type = models.CharField(max_length=15)
@@ -686,6 +757,45 @@ class MatchPropertyDefinition(CaseRuleCriteriaDefinition):
             self.MATCH_REGEX: self.check_regex,
         }.get(self.match_type)(case, now)
 
+    def get_case_filter(self, now):
+        if not self._is_dynamic_case_property():
+            return None
+
+        value = KeyTextTransform(self.property_name, 'case_json')
+        if self.match_type in self.DAYS_LOOKUPS:
+            today = now.date() if isinstance(now, datetime) else now
+            try:
+                cutoff = today - timedelta(days=int(self.property_value))
+            except (TypeError, ValueError, OverflowError):
+                return None
+            lookup = self.DAYS_LOOKUPS[self.match_type]
+            # only values starting with an ISO date are checked (see _try_date_conversion)
+            return (
+                Q(Regex(value, ALLOWED_DATE_REGEX.pattern))
+                & Q(lookup(Substr(value, 1, 10), cutoff.isoformat()))
+            )
+        elif self.match_type == self.MATCH_EQUAL and self.property_value is not None:
+            return Q(case_json__contains={self.property_name: self.property_value})
+        elif self.match_type == self.MATCH_NOT_EQUAL and self.property_value is not None:
+            return ~Q(case_json__contains={self.property_name: self.property_value})
+        elif self.match_type in (self.MATCH_HAS_VALUE, self.MATCH_REGEX):
+            return Q(case_json__has_key=self.property_name)
+        elif self.match_type == self.MATCH_HAS_NO_VALUE:
+            return (
+                ~Q(case_json__has_key=self.property_name)
+                | Q(IsNull(value, True))
+                | Q(Regex(value, r'^\s*$'))
+            )
+        return None
+
+    def _is_dynamic_case_property(self):
+        # properties of related cases and case fields are resolved in Python
+        return (
+            '/' not in self.property_name
+            and self.property_name != '_id'
+            and self.property_name not in {field.name for field in CommCareCase._meta.fields}
+        )
+
     def to_dict(self):
         return {
             'property_name': self.property_name,
@@ -731,6 +841,16 @@ class ClosedParentDefinition(CaseRuleCriteriaDefinition):
 
         return False
 
+    def get_case_filter(self, now):
+        # Parent cases may be in another shard, so this only filters on
+        # the index. _base_manager does not require a database to be
+        # specified, and the subquery is run in the database of the cases.
+        return Q(Exists(CommCareCaseIndex._base_manager.filter(
+            case_id=OuterRef('case_id'),
+            identifier=self.identifier,
+            relationship_id=self.relationship_id,
+        )))
+
 
 class LocationFilterDefinition(CaseRuleCriteriaDefinition):
 
@@ -1036,10 +1156,12 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
             close_case = False
 
         if close_case or properties:
-            result = update_case(case.domain, case.case_id, case_properties=properties, close=close_case,
-                                 xmlns=AUTO_UPDATE_XMLNS, max_wait=15, device_id=rule.id, form_name=rule.name)
-
-            rule.log_submission(result[0].form_id)
+            if rule.case_update_batch is not None:
+                rule.case_update_batch.add(case.case_id, properties, close_case)
+            else:
+                result = update_case(case.domain, case.case_id, case_properties=properties, close=close_case,
+                                     xmlns=AUTO_UPDATE_XMLNS, max_wait=15, device_id=rule.id, form_name=rule.name)
+                rule.log_submission(result[0].form_id)
 
             if properties:
                 num_updates += 1
@@ -1060,6 +1182,85 @@ class UpdateCaseDefinition(BaseUpdateCaseDefinition):
         }
 
 
+class CaseUpdateBatch(object):
+    """Collects the case updates of a rule and submits them in multi-case forms
+
+    Each form is logged as a ``CaseRuleSubmission``, so it can be undone
+    with ``CaseRuleUndoer``.
+    """
+
+    def __init__(self, rule, batch_size):
+        self.rule = rule
+        self.batch_size = batch_size
+        self.updates = {}  # {case_id: (case_properties, close)}
+        # errors of submissions that failed
+        self.result = CaseRuleActionResult()
+
+    def __contains__(self, case_id):
+        return case_id in self.updates
+
+    def add(self, case_id, case_properties, close):
+        properties, closed = self.updates.get(case_id, ({}, False))
+        self.updates[case_id] = ({**properties, **case_properties}, closed or close)
+        if len(self.updates) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.updates:
+            return
+        case_changes = [
+            (case_id, properties, close) for case_id, (properties, close) in self.updates.items()
+        ]
+        self.updates = {}
+        try:
+            result = bulk_update_cases(
+                self.rule.domain,
+                case_changes,
+                device_id=self.rule.id,
+                xmlns=AUTO_UPDATE_XMLNS,
+                user_id=SYSTEM_USER_ID,
+                form_name=self.rule.name,
+                max_wait=15,
+            )
+        except Exception:
+            self.result.add_result(CaseRuleActionResult(num_errors=len(case_changes)))
+            notify_exception(None, "Error submitting case updates of case update rule", {
+                'domain': self.rule.domain,
+                'rule_pk': self.rule.pk,
+            })
+            return
+        self.rule.log_submission(result[0].form_id)
+
+
+@contextmanager
+def batched_case_updates(domain, rules):
+    """Batch the case updates of ``rules`` while in this context
+
+    Updates that are still pending are submitted when the context exits.
+    Rules that reference parent cases are not batched, since their criteria
+    and updates depend on cases that may have pending updates.
+
+    :yields: ``CaseRuleActionResult`` that is updated with the errors of
+    failed submissions when the context exits.
+    """
+    result = CaseRuleActionResult()
+    if not toggles.BATCH_CASE_UPDATE_RULE_SUBMISSIONS.enabled(domain):
+        yield result
+        return
+
+    batched_rules = [rule for rule in rules if not rule.references_parent_case]
+    for rule in batched_rules:
+        rule.case_update_batch = CaseUpdateBatch(rule, settings.RULE_CASE_UPDATE_BATCH_SIZE)
+    try:
+        yield result
+    finally:
+        for rule in batched_rules:
+            batch = rule.case_update_batch
+            rule.case_update_batch = None
+            batch.flush()
+            result.add_result(batch.result)
+
+
 class CustomActionDefinition(CaseRuleActionDefinition):
     name = models.CharField(max_length=126)
 
@@ -1163,7 +1364,8 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
         if is_copied_case(case):
             return CaseRuleActionResult()
 
-        if not case_matching_rule_criteria_exists_in_es(case, rule):
+        use_blocking_keys = toggles.CASE_DEDUPE_BLOCKING_KEYS.enabled(rule.domain)
+        if not use_blocking_keys and not case_matching_rule_criteria_exists_in_es(case, rule):
             ALLOWED_ES_DELAY = timedelta(hours=1)
             if datetime.utcnow() - case.server_modified_on > ALLOWED_ES_DELAY:
                 # If old data was found that is not present in ElasticSearch, the data is unreliable.
@@ -1202,6 +1404,9 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
         current_hash = CaseDuplicateNew.case_and_action_to_hash(case, self)
         case_became_closed = not self.include_closed and case.closed
 
+        if use_blocking_keys:
+            self._update_blocking_keys(case, [] if case_became_closed else self.get_blocking_keys(case))
+
         if not self._case_was_modified(existing_duplicate, case_became_closed, current_hash):
             # Nothing has changed. We can stop processing here
             return CaseRuleActionResult(num_updates=0)
@@ -1255,7 +1460,10 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
         # Pull 3 matching cases to answer whether this is a new duplicate, an existing duplicate,
         # or not a duplicate. When this is an existing duplicate, we'd expect to see at least
         # 2 other matching records plus the current case, hence needing to fetch at least 3 records
-        matching_ids = find_matching_case_ids_in_es(case, rule, limit=3)
+        if toggles.CASE_DEDUPE_BLOCKING_KEYS.enabled(rule.domain):
+            matching_ids = self._find_matching_case_ids_in_blocks(case, limit=3)
+        else:
+            matching_ids = find_matching_case_ids_in_es(case, rule, limit=3)
 
         other_duplicate_ids = {case_id for case_id in matching_ids if case_id != case.case_id}
         if not other_duplicate_ids:
@@ -1275,6 +1483,86 @@ class CaseDeduplicationActionDefinition(BaseUpdateCaseDefinition):
         CaseDuplicateNew.objects.bulk_create(duplicates)
         return [duplicate.case_id for duplicate in duplicates]
 
+    def when_case_does_not_match(self, case, rule):
+        if toggles.CASE_DEDUPE_BLOCKING_KEYS.enabled(rule.domain):
+            self._update_blocking_keys(case, [])
+        return CaseRuleActionResult()
+
+    def get_blocking_keys(self, case):
+        """Get the keys of the blocks of cases that the case is a duplicate of
+
+        Values are compared exactly as they are indexed in Elasticsearch,
+        including case metadata, as they are when duplicates are found
+        with an Elasticsearch query. Rules that match ALL properties have
+        one key for the values of all the properties, and rules that match
+        ANY property have one key for each property with a value.
+        """
+        values = [
+            (prop_name, str(value) if value else '')
+            for prop_name, value in iter_case_property_values(case, self.case_properties)
+        ]
+        if self.match_type == CaseDeduplicationMatchTypeChoices.ALL:
+            if not any(value for prop_name, value in values):
+                return []
+            return [hash_arguments(*(value for prop_name, value in values))]
+        return [hash_arguments(prop_name, value) for prop_name, value in values if value]
+
+    def _update_blocking_keys(self, case, keys):
+        existing_keys = CaseDeduplicationBlockingKey.objects.filter(action=self, case_id=case.case_id)
+        if set(existing_keys.values_list('key', flat=True)) == set(keys):
+            return
+        with transaction.atomic():
+            existing_keys.delete()
+            CaseDeduplicationBlockingKey.objects.bulk_create([
+                CaseDeduplicationBlockingKey(action=self, case_id=case.case_id, key=key)
+                for key in keys
+            ])
+
+    def _find_matching_case_ids_in_blocks(self, case, limit):
+        own_keys = CaseDeduplicationBlockingKey.objects.filter(
+            action=self, case_id=case.case_id).values('key')
+        other_ids = CaseDeduplicationBlockingKey.objects.filter(
+            action=self, key__in=own_keys,
+        ).exclude(case_id=case.case_id).values_list('case_id', flat=True).distinct()[:limit - 1]
+        return [case.case_id] + list(other_ids)
+
+    def record_duplicates_in_blocks(self, rule):
+        """Record the cases that share a block as duplicates
+
+        The blocks with more than one case are found in the database, so
+        only the duplicates are loaded from it. Used to backfill the rule
+        after the blocking keys of its cases have been saved.
+
+        :returns: CaseRuleActionResult
+        """
+        blocks = (
+            CaseDeduplicationBlockingKey.objects.filter(action=self)
+            .values('key')
+            .annotate(num_cases=models.Count('case_id'))
+            .filter(num_cases__gt=1)
+            .values('key')
+        )
+        # a case is only recorded once, even if it is in several blocks
+        duplicate_ids = set(
+            CaseDeduplicationBlockingKey.objects.filter(action=self, key__in=blocks)
+            .values_list('case_id', flat=True)
+        )
+        for case_ids in chunked(duplicate_ids, 1000):
+            CaseDuplicateNew.objects.bulk_create([
+                CaseDuplicateNew(
+                    case_id=case.case_id,
+                    action=self,
+                    hash=CaseDuplicateNew.case_and_action_to_hash(case, self),
+                )
+                for case in CommCareCase.objects.get_cases(list(case_ids), rule.domain)
+            ])
+
+        num_updates = 0
+        if toggles.CASE_DEDUPE_UPDATES.enabled(rule.domain) and self.properties_to_update:
+            for case_ids in chunked(duplicate_ids, 1000):
+                num_updates += self._update_cases(rule.domain, rule, case_ids)
+        return CaseRuleActionResult(num_updates=num_updates)
+
     def _get_case_ids_not_recorded_as_duplicates(self, all_ids):
         existing_ids = set(CaseDuplicateNew.objects.filter(
             action=self, case_id__in=all_ids
@@ -1390,6 +1678,25 @@ class CaseDuplicateNew(models.Model):
         return hash_arguments(*current_values)
 
 
+class CaseDeduplicationBlockingKey(models.Model):
+    """Key of a block of cases that a deduplication action finds duplicates in
+
+    Only the cases that are checked by the action have keys: cases that
+    match the criteria of its rule, are not copies, and are open if the
+    action does not include closed cases.
+    """
+    id = models.BigAutoField(primary_key=True)
+    action = models.ForeignKey("CaseDeduplicationActionDefinition", on_delete=models.CASCADE)
+    case_id = models.CharField(max_length=126)
+    key = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('action', 'case_id', 'key')
+        indexes = [
+            models.Index(fields=['action', 'key'])
+        ]
+
+
 def hash_arguments(*args):
     # mimic file-like object
     class Updater:
@@ -1616,6 +1923,10 @@ class CreateScheduleInstanceActionDefinition(CaseRuleActionDefinition):
     alert_schedule = models.ForeignKey('scheduling.AlertSchedule', null=True, on_delete=models.PROTECT)
     timed_schedule = models.ForeignKey('scheduling.TimedSchedule', null=True, on_delete=models.PROTECT)
 
+    # Set by batched_schedule_instance_refresh to refresh the schedule
+    # instances of a batch of cases in bulk
+    schedule_instance_batch = None
+
     # A List of [recipient_type, recipient_id]
     recipients = jsonfield.JSONField(default=list)
 
@@ -1717,7 +2028,7 @@ class CreateScheduleInstanceActionDefinition(CaseRuleActionDefinition):
     def when_case_matches(self, case, rule):
         schedule = self.schedule
         if isinstance(schedule, AlertSchedule):
-            refresh_case_alert_schedule_instances(case, schedule, self, rule)
+            refresh_case_alert_schedule_instances(case, schedule, self, rule, batch=self.schedule_instance_batch)
         elif isinstance(schedule, TimedSchedule):
             kwargs = {}
             scheduler_module_info = self.get_scheduler_module_info()
@@ -1756,7 +2067,8 @@ class CreateScheduleInstanceActionDefinition(CaseRuleActionDefinition):
                 else:
                     kwargs['start_date'] = schedule_instance_start_date
 
-            refresh_case_timed_schedule_instances(case, schedule, self, rule, **kwargs)
+            refresh_case_timed_schedule_instances(
+                case, schedule, self, rule, batch=self.schedule_instance_batch, **kwargs)
 
         return CaseRuleActionResult()
 
@@ -1765,6 +2077,10 @@ class CreateScheduleInstanceActionDefinition(CaseRuleActionDefinition):
         return CaseRuleActionResult()
 
     def delete_schedule_instances(self, case):
+        if self.schedule_instance_batch is not None:
+            self.schedule_instance_batch.delete_instances_for_case(case.case_id)
+            return
+
         if self.alert_schedule_id:
             get_case_alert_schedule_instances_for_schedule_id(case.case_id, self.alert_schedule_id).delete()
 
@@ -1790,6 +2106,30 @@ class CreateScheduleInstanceActionDefinition(CaseRuleActionDefinition):
         }
 
 
+@contextmanager
+def batched_schedule_instance_refresh(rule, case_ids):
+    """Refresh the schedule instances of ``rule`` for ``case_ids`` in bulk
+    while in this context
+
+    The existing schedule instances of the cases are loaded when the context
+    is entered, and only the instances that were created, changed or deleted
+    are written when the context exits without an error.
+    """
+    definitions = [
+        action.definition for action in rule.memoized_actions
+        if isinstance(action.definition, CreateScheduleInstanceActionDefinition)
+    ]
+    for definition in definitions:
+        definition.schedule_instance_batch = CaseScheduleInstanceBatch(definition.schedule, case_ids)
+    try:
+        yield
+        for definition in definitions:
+            definition.schedule_instance_batch.flush()
+    finally:
+        for definition in definitions:
+            definition.schedule_instance_batch = None
+
+
 class CaseRuleSubmission(models.Model):
     """This model records which forms were submitted as a result of a case
     update rule. This serves both as a log as well as providing the ability
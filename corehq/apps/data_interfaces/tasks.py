@@ -32,6 +32,7 @@ from .deduplication import backfill_deduplicate_rule, reset_deduplicate_rule
 from .interfaces import FormManagementMode
 from .models import (
     AutomaticUpdateRule,
+    CaseDeduplicationBlockingKey,
     CaseDuplicate,
     CaseDuplicateNew,
     CaseRuleSubmission,
@@ -85,6 +86,7 @@ def delete_duplicates_for_cases(case_ids):
     CaseDuplicate.remove_duplicates_for_case_ids(case_ids)
 
     CaseDuplicateNew.remove_duplicates_for_case_ids(case_ids)
+    CaseDeduplicationBlockingKey.objects.filter(case_id__in=case_ids).delete()
 
 
 @task(serializer='pickle', ignore_result=True)
@@ -168,7 +170,12 @@ def run_case_update_rules_for_domain_and_db(domain, now, run_id, case_type, db=N
     )
 
     modified_before = AutomaticUpdateRule.get_boundary_date(rules, now)
-    iterator = AutomaticUpdateRule.iter_cases(domain, case_type, db=db, modified_lte=modified_before)
+    # only fetch cases that may match a rule. Cases that match no rule
+    # are not changed by case update rules.
+    case_filter = AutomaticUpdateRule.get_case_filter_for_rules(rules, now)
+    iterator = AutomaticUpdateRule.iter_cases(
+        domain, case_type, db=db, modified_lte=modified_before, case_filter=case_filter
+    )
     run = iter_cases_and_run_rules(domain, iterator, rules, now, run_id, case_type, db)
 
     if run.status == DomainCaseRuleRun.STATUS_FINISHED:
@@ -21,15 +21,17 @@ from corehq.apps.data_interfaces.models import (
     MatchPropertyDefinition,
     UCRFilterDefinition,
     UpdateCaseDefinition,
+    batched_case_updates,
 )
 from corehq.apps.data_interfaces.tasks import run_case_update_rules_for_domain
+from corehq.apps.data_interfaces.utils import run_rules_for_case
 from corehq.apps.domain.models import Domain
 from corehq.form_processor.models import CommCareCase, XFormInstance
 from corehq.form_processor.signals import sql_case_post_save
 from corehq.tests.locks import reentrant_redis_locks
 from corehq.toggles import NAMESPACE_DOMAIN, RUN_AUTO_CASE_UPDATES_ON_SAVE
 from corehq.util.context_managers import drop_connected_signals
-from corehq.util.test_utils import set_parent_case as set_actual_parent_case
+from corehq.util.test_utils import flag_enabled, set_parent_case as set_actual_parent_case
 
 
 @contextmanager
@@ -652,6 +654,121 @@ class CaseRuleCriteriaTest(BaseCaseRuleTest):
             self.assertTrue(rule.criteria_match(case, now))
 
 
+class CaseRuleCaseFilterTest(BaseCaseRuleTest):
+
+    def assertFilterIncludes(self, rule, case, now, included=True):
+        case_filter = rule.get_case_filter(now)
+        cases = AutomaticUpdateRule.iter_cases(self.domain, 'person', case_filter=case_filter)
+        case_ids = {c.case_id for c in cases}
+        self.assertEqual(case.case_id in case_ids, included)
+        if rule.criteria_match(case, now):
+            self.assertTrue(included, "filter excludes a matching case")
+
+    def set_properties(self, case, **properties):
+        hqcase.utils.update_case(self.domain, case.case_id, case_properties=properties)
+        return CommCareCase.objects.get_case(case.case_id, self.domain)
+
+    def test_case_property_equal(self):
+        now = datetime.utcnow()
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            property_value='negative',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+
+        with _with_case(self.domain, 'person', now) as case:
+            self.assertFilterIncludes(rule, case, now, included=False)
+            case = self.set_properties(case, result='x')
+            self.assertFilterIncludes(rule, case, now, included=False)
+            case = self.set_properties(case, result='negative')
+            self.assertFilterIncludes(rule, case, now)
+
+    def test_case_property_has_no_value(self):
+        now = datetime.utcnow()
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            match_type=MatchPropertyDefinition.MATCH_HAS_NO_VALUE,
+        )
+
+        with _with_case(self.domain, 'person', now) as case:
+            self.assertFilterIncludes(rule, case, now)
+            case = self.set_properties(case, result=' ')
+            self.assertFilterIncludes(rule, case, now)
+            case = self.set_properties(case, result='x')
+            self.assertFilterIncludes(rule, case, now, included=False)
+
+    def test_date_case_property(self):
+        now = datetime(2017, 5, 10)
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='last_visit_date',
+            property_value='5',
+            match_type=MatchPropertyDefinition.MATCH_DAYS_GREATER_OR_EQUAL,
+        )
+
+        with _with_case(self.domain, 'person', now) as case:
+            self.assertFilterIncludes(rule, case, now, included=False)
+            case = self.set_properties(case, last_visit_date='2017-05-06')
+            self.assertFilterIncludes(rule, case, now, included=False)
+            case = self.set_properties(case, last_visit_date='2017-05-05')
+            self.assertFilterIncludes(rule, case, now)
+            case = self.set_properties(case, last_visit_date='2017-05-01T10:00:00')
+            self.assertFilterIncludes(rule, case, now)
+
+    def test_closed_parent(self):
+        now = datetime.utcnow()
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(ClosedParentDefinition)
+
+        with _with_case(self.domain, 'person', now) as child, \
+                _with_case(self.domain, 'parent', now) as parent:
+            self.assertFilterIncludes(rule, child, now, included=False)
+            child = set_parent_case(self.domain, child, parent)
+            self.assertFilterIncludes(rule, child, now)
+
+    @override_settings(
+        AVAILABLE_CUSTOM_RULE_CRITERIA={
+            'CUSTOM_CRITERIA_TEST':
+                'corehq.apps.data_interfaces.tests.test_auto_case_updates.dummy_custom_match_function',
+        }
+    )
+    def test_custom_criteria_is_not_filtered(self):
+        now = datetime.utcnow()
+        rule = _create_empty_rule(self.domain)
+        rule.add_criteria(CustomMatchDefinition, name='CUSTOM_CRITERIA_TEST')
+        self.assertIsNone(rule.get_case_filter(now))
+
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            property_value='negative',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        rule = AutomaticUpdateRule.objects.get(pk=rule.pk)
+        self.assertIsNotNone(rule.get_case_filter(now))
+
+        rule.criteria_operator = 'ANY'
+        self.assertIsNone(rule.get_case_filter(now))
+
+    def test_case_filter_for_rules(self):
+        now = datetime.utcnow()
+        rule1 = _create_empty_rule(self.domain)
+        rule1.add_criteria(
+            MatchPropertyDefinition,
+            property_name='result',
+            property_value='negative',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+        rule2 = _create_empty_rule(self.domain)
+        self.assertIsNotNone(AutomaticUpdateRule.get_case_filter_for_rules([rule1], now))
+        self.assertIsNone(AutomaticUpdateRule.get_case_filter_for_rules([rule1, rule2], now))
+
+
 def set_case_property_directly(case, property_name, value):
     case.case_json[property_name] = value
 
@@ -1092,6 +1209,43 @@ class CaseRuleActionsTest(BaseCaseRuleTest):
             self.assertActionResult(rule, 1, result, CaseRuleActionResult(num_closes=1, num_related_updates=1))
             self.assertTrue(case.closed)
 
+    @flag_enabled('BATCH_CASE_UPDATE_RULE_SUBMISSIONS')
+    @override_settings(RULE_CASE_UPDATE_BATCH_SIZE=2)
+    def test_batched_updates(self):
+        rule = _create_empty_rule(self.domain)
+        _, definition = rule.add_action(UpdateCaseDefinition, close_case=False)
+        definition.set_properties_to_update([
+            UpdateCaseDefinition.PropertyDefinition(
+                name='result',
+                value_type=UpdateCaseDefinition.VALUE_TYPE_EXACT,
+                value='abc',
+            ),
+        ])
+        definition.save()
+        rule = AutomaticUpdateRule.objects.get(pk=rule.pk)
+
+        with _with_case(self.domain, 'person', datetime.utcnow()) as case1, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case2, \
+                _with_case(self.domain, 'person', datetime.utcnow()) as case3:
+            case_ids = [case1.case_id, case2.case_id, case3.case_id]
+            with batched_case_updates(self.domain, [rule]) as batch_result:
+                for case in [case1, case2, case3]:
+                    result = run_rules_for_case(case, [rule], datetime.utcnow())
+                    self.assertEqual(result, CaseRuleActionResult(num_updates=1))
+                # the first two cases were submitted in one form
+                self.assertActionResult(rule, 1)
+            self.assertActionResult(rule, 2)
+            self.assertEqual(batch_result, CaseRuleActionResult())
+            self.assertIsNone(rule.case_update_batch)
+
+            for case in CommCareCase.objects.get_cases(case_ids, self.domain):
+                self.assertEqual(case.get_case_property('result'), 'abc')
+
+            result = CaseRuleUndoer(self.domain, rule_id=rule.pk).bulk_undo()
+            self.assertEqual(result, {'processed': 2, 'skipped': 0, 'archived': 2})
+            for case in CommCareCase.objects.get_cases(case_ids, self.domain):
+                self.assertNotIn('result', case.dynamic_case_properties())
+
 
 class CaseRuleOnSaveTests(BaseCaseRuleTest):
 
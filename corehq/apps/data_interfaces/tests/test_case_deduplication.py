@@ -19,12 +19,14 @@ from corehq.apps.data_interfaces.deduplication import (
 from corehq.apps.data_interfaces.models import (
     AutomaticUpdateRule,
     CaseDeduplicationActionDefinition,
+    CaseDeduplicationBlockingKey,
     CaseDeduplicationMatchTypeChoices,
     CaseDuplicateNew,
     CaseRuleCriteria,
     LocationFilterDefinition,
     MatchPropertyDefinition,
 )
+from corehq.apps.data_interfaces.tasks import delete_duplicates_for_cases
 from corehq.apps.data_interfaces.utils import run_rules_for_case
 from corehq.apps.domain.shortcuts import create_domain
 from corehq.apps.es.case_search import case_search_adapter
@@ -898,6 +900,101 @@ class CaseDeduplicationActionTest(TestCase):
         self.assertEqual(updated_parent_case.get_case_property('name'), new_parent_case_property_value)
 
 
+@flag_enabled('CASE_DEDUPE_BLOCKING_KEYS')
+class CaseDeduplicationBlockingKeyTest(TestCase):
+    domain = 'case-dedupe-blocks'
+    case_type = 'adult'
+
+    def _create_rule(self, match_type=CaseDeduplicationMatchTypeChoices.ALL, include_closed=False,
+                     case_properties=('name', 'age')):
+        rule = AutomaticUpdateRule.objects.create(
+            domain=self.domain,
+            name='test',
+            case_type=self.case_type,
+            active=True,
+            deleted=False,
+            filter_on_server_modified=False,
+            server_modified_boundary=None,
+            workflow=AutomaticUpdateRule.WORKFLOW_DEDUPLICATE,
+        )
+        _, action = rule.add_action(
+            CaseDeduplicationActionDefinition,
+            match_type=match_type,
+            case_properties=list(case_properties),
+            include_closed=include_closed,
+        )
+        return rule, action
+
+    def _create_case(self, name='George Simon Esq.', age=12, closed=False, owner_id='user1'):
+        return create_case(
+            domain=self.domain, name=name, case_type=self.case_type,
+            case_json={'age': str(age)}, closed=closed, owner_id=owner_id, save=True)
+
+    def _get_duplicate_ids(self, action):
+        return set(CaseDuplicateNew.objects.filter(action=action).values_list('case_id', flat=True))
+
+    def test_keys_match_exact_values(self):
+        rule, action = self._create_rule()
+        keys = action.get_blocking_keys(self._create_case(name='George Simon Esq.'))
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(action.get_blocking_keys(self._create_case(name='George Simon Esq.')), keys)
+        self.assertNotEqual(action.get_blocking_keys(self._create_case(name='george simon esq.')), keys)
+        self.assertNotEqual(action.get_blocking_keys(self._create_case(name='George Simon Esq')), keys)
+
+    def test_keys_include_case_metadata(self):
+        rule, action = self._create_rule(case_properties=['case_name', 'owner_id'])
+        keys = action.get_blocking_keys(self._create_case(owner_id='owner1'))
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(action.get_blocking_keys(self._create_case(owner_id='owner1')), keys)
+        self.assertNotEqual(action.get_blocking_keys(self._create_case(owner_id='owner2')), keys)
+        self.assertNotEqual(action.get_blocking_keys(self._create_case(name='Other', owner_id='owner1')), keys)
+
+    def test_any_rule_has_key_per_property(self):
+        rule, action = self._create_rule(match_type=CaseDeduplicationMatchTypeChoices.ANY)
+        self.assertEqual(len(action.get_blocking_keys(self._create_case())), 2)
+        self.assertEqual(len(action.get_blocking_keys(self._create_case(name=''))), 1)
+
+    @patch('corehq.apps.data_interfaces.models._find_duplicate_case_ids')
+    @patch('corehq.apps.data_interfaces.models._case_exists_in_es')
+    def test_finds_duplicates_without_elasticsearch(self, case_exists_mock, find_duplicates_mock):
+        rule, action = self._create_rule()
+        case1 = self._create_case(name='George Simon')
+        case2 = self._create_case(name='George Simon')
+        unique = self._create_case(name='George Simon', age=13)
+        punctuated = self._create_case(name='George Simon.')
+
+        for case in [case1, unique, punctuated, case2]:
+            run_rules_for_case(case, [rule], datetime.utcnow())
+
+        self.assertEqual(self._get_duplicate_ids(action), {case1.case_id, case2.case_id})
+        case_exists_mock.assert_not_called()
+        find_duplicates_mock.assert_not_called()
+
+    def test_closed_case_keys_are_removed(self):
+        rule, action = self._create_rule()
+        case = self._create_case()
+        run_rules_for_case(case, [rule], datetime.utcnow())
+        self.assertEqual(CaseDeduplicationBlockingKey.objects.filter(action=action).count(), 1)
+
+        case.closed = True
+        run_rules_for_case(case, [rule], datetime.utcnow())
+        self.assertEqual(CaseDeduplicationBlockingKey.objects.filter(action=action).count(), 0)
+
+    def test_deleted_case_keys_are_removed(self):
+        rule, action = self._create_rule()
+        case1 = self._create_case()
+        case2 = self._create_case()
+        for case in [case1, case2]:
+            run_rules_for_case(case, [rule], datetime.utcnow())
+
+        delete_duplicates_for_cases([case1.case_id])
+
+        self.assertEqual(
+            set(CaseDeduplicationBlockingKey.objects.filter(action=action).values_list('case_id', flat=True)),
+            {case2.case_id},
+        )
+
+
 @flag_enabled('CASE_DEDUPE_UPDATES')
 @es_test(requires=[case_search_adapter, user_adapter])
 class TestDeduplicationRuleRuns(TestCase):
@@ -1258,3 +1355,27 @@ class DeduplicationBackfillTest(TestCase):
         duplicate_case_ids = CaseDuplicateNew.objects.filter(action=self.action).values_list('case_id', flat=True)
         self.assertEqual(len(duplicate_case_ids), 2)
         self.assertNotIn(self.case4.case_id, duplicate_case_ids)
+
+    @flag_enabled('CASE_DEDUPE_BLOCKING_KEYS')
+    def test_blocking_keys_finds_open_cases_only(self):
+        self._set_up_rule(include_closed=False)
+
+        backfill_deduplicate_rule(self.domain, self.rule)
+
+        duplicates = CaseDuplicateNew.objects.filter(action=self.action)
+        self.assertEqual({dup.case_id for dup in duplicates}, {self.case2.case_id, self.case3.case_id})
+        for duplicate in duplicates:
+            case = CommCareCase.objects.get_case(duplicate.case_id, self.domain)
+            self.assertEqual(duplicate.hash, CaseDuplicateNew.case_and_action_to_hash(case, self.action))
+
+    @flag_enabled('CASE_DEDUPE_BLOCKING_KEYS')
+    def test_blocking_keys_include_closed_cases(self):
+        self._set_up_rule(include_closed=True)
+
+        backfill_deduplicate_rule(self.domain, self.rule)
+
+        duplicate_case_ids = CaseDuplicateNew.objects.filter(action=self.action).values_list('case_id', flat=True)
+        self.assertEqual(
+            set(duplicate_case_ids),
+            {self.case1.case_id, self.case2.case_id, self.case3.case_id},
+        )
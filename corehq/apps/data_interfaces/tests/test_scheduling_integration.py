@@ -57,10 +57,12 @@ from corehq.messaging.scheduling.tests.util import (
 from corehq.messaging.tasks import (
     run_messaging_rule,
     run_messaging_rule_for_shard,
+    sync_case_chunk_for_messaging_rule,
     sync_case_for_messaging,
     sync_case_for_messaging_rule,
 )
 from corehq.sql_db.util import paginate_query_across_partitioned_databases
+from corehq.util.test_utils import flag_enabled
 
 
 def get_visit_scheduler_module_and_form_for_test():
@@ -761,6 +763,61 @@ class CaseRuleSchedulingIntegrationTest(TestCase):
         instances = get_case_timed_schedule_instances_for_schedule(case.case_id, schedule)
         self.assertEqual(instances.count(), 0)
 
+    @flag_enabled('BULK_REFRESH_MESSAGING_RULES')
+    @patch('corehq.messaging.scheduling.util.utcnow')
+    def test_bulk_sync_case_chunk_for_messaging_rule(self, utcnow_patch):
+        schedule = AlertSchedule.create_simple_alert(
+            self.domain,
+            SMSContent(message={'en': 'Hello'})
+        )
+
+        rule = create_empty_rule(self.domain, AutomaticUpdateRule.WORKFLOW_SCHEDULING)
+
+        rule.add_criteria(
+            MatchPropertyDefinition,
+            property_name='start_sending',
+            property_value='Y',
+            match_type=MatchPropertyDefinition.MATCH_EQUAL,
+        )
+
+        rule.add_action(
+            CreateScheduleInstanceActionDefinition,
+            alert_schedule_id=schedule.schedule_id,
+            recipients=(('CommCareUser', self.user.get_id),)
+        )
+
+        AutomaticUpdateRule.clear_caches(self.domain, AutomaticUpdateRule.WORKFLOW_SCHEDULING)
+
+        utcnow_patch.return_value = datetime(2017, 5, 1, 7, 0)
+        with self.create_case_and_sync(self.domain, 'person') as stopped_case, \
+                self.create_case_and_sync(self.domain, 'person') as started_case, \
+                self.create_case_and_sync(self.domain, 'person') as unchanged_case:
+            for case in (stopped_case, unchanged_case):
+                self.update_case_and_sync(self.domain, case.case_id, case_properties={'start_sending': 'Y'})
+            [unchanged_instance] = get_case_alert_schedule_instances_for_schedule(
+                unchanged_case.case_id, schedule)
+
+            utcnow_patch.return_value = datetime(2017, 5, 1, 7, 1)
+            update_case(self.domain, stopped_case.case_id, case_properties={'start_sending': 'N'})
+            update_case(self.domain, started_case.case_id, case_properties={'start_sending': 'Y'})
+            case_ids = [stopped_case.case_id, started_case.case_id, unchanged_case.case_id]
+            with patch('corehq.messaging.tasks._sync_case_for_messaging_rule') as sync_patch:
+                sync_case_chunk_for_messaging_rule(self.domain, case_ids, rule.pk)
+            sync_patch.assert_not_called()
+
+            instances = get_case_alert_schedule_instances_for_schedule(stopped_case.case_id, schedule)
+            self.assertEqual(instances.count(), 0)
+
+            [instance] = get_case_alert_schedule_instances_for_schedule(started_case.case_id, schedule)
+            self.assertEqual(instance.rule_id, rule.pk)
+            self.assertEqual(instance.recipient_id, self.user.get_id)
+            self.assertEqual(instance.next_event_due, datetime(2017, 5, 1, 7, 1))
+            self.assertTrue(instance.active)
+
+            [instance] = get_case_alert_schedule_instances_for_schedule(unchanged_case.case_id, schedule)
+            self.assertEqual(instance.schedule_instance_id, unchanged_instance.schedule_instance_id)
+            self.assertEqual(instance.next_event_due, datetime(2017, 5, 1, 7, 0))
+
     @patch('corehq.messaging.scheduling.util.utcnow')
     def test_timed_schedule_case_property_timed_event(self, utcnow_patch):
         schedule = TimedSchedule.create_simple_daily_schedule(
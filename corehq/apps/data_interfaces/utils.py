@@ -195,6 +195,7 @@ def iter_cases_and_run_rules(domain, case_iterator, rules, now, run_id, case_typ
     from corehq.apps.data_interfaces.models import (
         CaseRuleActionResult,
         DomainCaseRuleRun,
+        batched_case_updates,
     )
     HALT_AFTER = 23 * 60 * 60
 
@@ -205,28 +206,30 @@ def iter_cases_and_run_rules(domain, case_iterator, rules, now, run_id, case_typ
 
     cases_checked = 0
     last_migration_check_time = None
+    halted = False
 
-    for case in case_iterator:
-        migration_in_progress, last_migration_check_time = _check_data_migration_in_progress(
-            domain, last_migration_check_time
-        )
+    with batched_case_updates(domain, rules) as batch_result:
+        for case in case_iterator:
+            migration_in_progress, last_migration_check_time = _check_data_migration_in_progress(
+                domain, last_migration_check_time
+            )
 
-        time_elapsed = datetime.utcnow() - start_run
-        if (
-            time_elapsed.seconds > HALT_AFTER or case_update_result.total_updates >= max_allowed_updates
-            or migration_in_progress
-        ):
-            notify_error("Halting rule run for domain %s and case type %s." % (domain, case_type))
+            time_elapsed = datetime.utcnow() - start_run
+            if (
+                time_elapsed.seconds > HALT_AFTER or case_update_result.total_updates >= max_allowed_updates
+                or migration_in_progress
+            ):
+                notify_error("Halting rule run for domain %s and case type %s." % (domain, case_type))
+                halted = True
+                break
 
-            return DomainCaseRuleRun.done(
-                run_id, cases_checked, case_update_result, db=db, halted=True
-            )
+            case_update_result.add_result(run_rules_for_case(case, rules, now))
+            if progress_helper is not None:
+                progress_helper.increment_current_case_count()
+            cases_checked += 1
 
-        case_update_result.add_result(run_rules_for_case(case, rules, now))
-        if progress_helper is not None:
-            progress_helper.increment_current_case_count()
-        cases_checked += 1
-    return DomainCaseRuleRun.done(run_id, cases_checked, case_update_result, db=db)
+    case_update_result.add_result(batch_result)
+    return DomainCaseRuleRun.done(run_id, cases_checked, case_update_result, db=db, halted=halted)
 
 
 def _check_data_migration_in_progress(domain, last_migration_check_time):
@@ -241,12 +244,17 @@ def run_rules_for_case(case, rules, now):
     from corehq.apps.data_interfaces.models import CaseRuleActionResult
     aggregated_result = CaseRuleActionResult()
     last_result = None
+    last_rule = None
     for rule in rules:
         if last_result:
             if (
                 last_result.num_updates > 0 or last_result.num_related_updates > 0
                 or last_result.num_related_closes > 0
             ):
+                batch = last_rule.case_update_batch
+                if batch is not None and case.case_id in batch:
+                    # the next rule must see the updated case
+                    batch.flush()
                 case = CommCareCase.objects.get_case(case.case_id, case.domain)
 
         try:
@@ -260,6 +268,7 @@ def run_rules_for_case(case, rules, now):
             })
 
         aggregated_result.add_result(last_result)
+        last_rule = rule
         if last_result.num_closes > 0:
             break
 
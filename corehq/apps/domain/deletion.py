@@ -386,6 +386,7 @@ DOMAIN_DELETE_OPERATIONS = [
     ModelDeletion('data_interfaces', 'UpdateCaseDefinition', 'caseruleaction__rule__domain'),
     ModelDeletion('data_interfaces', 'CaseDuplicate', 'action__caseruleaction__rule__domain'),
     ModelDeletion('data_interfaces', 'CaseDuplicateNew', 'action__caseruleaction__rule__domain'),
+    ModelDeletion('data_interfaces', 'CaseDeduplicationBlockingKey', 'action__caseruleaction__rule__domain'),
     ModelDeletion('data_interfaces', 'CaseDeduplicationActionDefinition', 'caseruleaction__rule__domain'),
     ModelDeletion('data_interfaces', 'CreateScheduleInstanceActionDefinition', 'caseruleaction__rule__domain'),
     ModelDeletion('data_interfaces', 'CaseRuleAction', 'rule__domain'),
@@ -427,6 +428,8 @@ DOMAIN_DELETE_OPERATIONS = [
     ModelDeletion('ota', 'SerialIdBucket', 'domain'),
     ModelDeletion('ota', 'DeviceLogRequest', 'domain'),
     ModelDeletion('phone', 'SyncLogSQL', 'domain'),
+    ModelDeletion('phone', 'OwnerReachableCase', 'reachability__domain'),
+    ModelDeletion('phone', 'OwnerCaseReachability', 'domain'),
     CustomDeletion('ota', _delete_demo_user_restores, ['DemoUserRestore']),
     ModelDeletion('phonelog', 'ForceCloseEntry', 'domain'),
     ModelDeletion('phonelog', 'UserErrorEntry', 'domain'),
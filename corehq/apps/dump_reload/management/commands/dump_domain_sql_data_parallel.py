@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from corehq.apps.dump_reload.exceptions import DomainDumpError
+from corehq.apps.dump_reload.sql.parallel import dump_sql_data
+
+
+class Command(BaseCommand):
+    help = """Dump a domain's SQL data to a directory, using several processes.
+
+    The data of each model is dumped to a separate file for each database
+    it is stored in, and a manifest of the files is written to the
+    directory. If the dump is interrupted, run the command again with the
+    same directory to resume it.
+
+    Use `load_domain_sql_data_parallel` to load the dump. Data that is not
+    stored in SQL can be dumped with `dump_domain_data --dumper domain
+    --dumper couch --dumper toggles`.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain_name')
+        parser.add_argument('dump_dir')
+        parser.add_argument(
+            '-e', '--exclude', dest='exclude', action='append', default=[],
+            help='An app_label or app_label.ModelName to exclude '
+                 '(use multiple --exclude to exclude multiple apps/models).'
+        )
+        parser.add_argument(
+            '-i', '--include', dest='include', action='append', default=[],
+            help='An app_label or app_label.ModelName to include '
+                 '(use multiple --include to include multiple apps/models).'
+        )
+        parser.add_argument('--processes', type=int, default=4, help="Number of processes to dump with")
+
+    def handle(self, domain_name, dump_dir, **options):
+        try:
+            manifest = dump_sql_data(
+                domain_name,
+                dump_dir,
+                options['exclude'],
+                options['include'],
+                options['processes'],
+                stdout=self.stdout,
+            )
+        except DomainDumpError as e:
+            raise CommandError(str(e))
+        total = sum(part['count'] for part in manifest['partitions'])
+        self.stdout.write(f"Dumped {total} objects to {dump_dir}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from corehq.apps.dump_reload.exceptions import DataLoadException
+from corehq.apps.dump_reload.sql.parallel import load_sql_data
+
+
+class Command(BaseCommand):
+    help = """Load a dump created by `dump_domain_sql_data_parallel`, using several processes.
+
+    The progress of the load is recorded in the manifest of the dump. If
+    the load is interrupted, run the command again with the same directory
+    to resume it.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('dump_dir')
+        parser.add_argument('--processes', type=int, default=4, help="Number of processes to load with")
+
+    def handle(self, dump_dir, **options):
+        try:
+            loaded_counts = load_sql_data(dump_dir, options['processes'], stdout=self.stdout)
+        except DataLoadException as e:
+            raise CommandError(str(e))
+        for model, count in sorted(loaded_counts.items()):
+            self.stdout.write(f"  {model:<50}: {count}")
+        self.stdout.write(f"Loaded {sum(loaded_counts.values())} objects")
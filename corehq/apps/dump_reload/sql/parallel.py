@@ -0,0 +1,270 @@
+"""Parallel dump and load of a domain's SQL data
+
+The data of each model is dumped separately for each database it is
+stored in. Each of these partitions is dumped by a pool of processes to
+its own gzipped JSON lines file in a dump directory. A manifest in the
+dump directory lists the partitions, the number of objects dumped for
+each, and whether each has been loaded.
+
+Partitions are loaded model by model, in dependency order, and the
+partitions of each model are loaded in parallel. Objects are inserted in
+bulk, with constraint checks deferred until the transaction of the
+partition is committed.
+
+Dumps and loads that are interrupted can be resumed by running them
+again with the same dump directory: partitions that were dumped or
+loaded already are skipped.
+"""
+import gzip
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from itertools import groupby
+from operator import itemgetter
+
+from django.apps import apps
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import connections, router, transaction
+
+from corehq.apps.dump_reload.exceptions import DataLoadException, DomainDumpError
+from corehq.apps.dump_reload.sql.dump import (
+    get_model_iterator_builders_to_dump,
+    get_objects_to_dump_from_builders,
+)
+from corehq.apps.dump_reload.sql.load import (
+    CHUNK_SIZE,
+    LoadStat,
+    _reset_sequences,
+    constraint_checks_deferred,
+    get_db_alias,
+    update_model_name,
+)
+from corehq.apps.dump_reload.sql.serialization import JsonLinesSerializer
+from corehq.apps.dump_reload.util import get_model_label
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def dump_sql_data(domain, dump_dir, excludes, includes, processes, stdout=None):
+    """Dump the SQL data of a domain to ``dump_dir``
+
+    :returns: The manifest of the dump.
+    """
+    os.makedirs(dump_dir, exist_ok=True)
+    manifest = read_manifest(dump_dir)
+    if manifest is None:
+        manifest = {
+            'domain': domain,
+            'partitions': get_partitions(domain, excludes, includes),
+        }
+        write_manifest(dump_dir, manifest)
+    elif manifest['domain'] != domain:
+        raise DomainDumpError(f"{dump_dir} contains a dump of another domain: {manifest['domain']}")
+
+    pending = [part for part in manifest['partitions'] if part['count'] is None]
+    _run_in_pool(
+        dump_dir, manifest, processes, stdout, pending,
+        lambda part: (dump_partition, domain, dump_dir, part),
+        lambda part, count: part.update(count=count),
+    )
+    return manifest
+
+
+def load_sql_data(dump_dir, processes, stdout=None):
+    """Load a dump created by ``dump_sql_data``
+
+    :returns: Counter of loaded objects by model label.
+    """
+    manifest = read_manifest(dump_dir)
+    if manifest is None:
+        raise DataLoadException(f"Manifest not found in {dump_dir}")
+    if any(part['count'] is None for part in manifest['partitions']):
+        raise DataLoadException(f"The dump in {dump_dir} is incomplete. Resume it before loading.")
+
+    loaded_counts = Counter()
+    model_counts_by_db = defaultdict(Counter)
+
+    def on_loaded(part, counts_by_db):
+        part['loaded'] = True
+        for db_alias, count in counts_by_db.items():
+            loaded_counts[part['model']] += count
+            model_counts_by_db[db_alias][apps.get_model(part['model'])] += count
+
+    try:
+        # natural keys of dependencies are looked up when objects are
+        # loaded, so each model must be loaded after the models it depends on
+        for __, parts in groupby(manifest['partitions'], key=itemgetter('model')):
+            pending = [part for part in parts if not part['loaded']]
+            _run_in_pool(
+                dump_dir, manifest, processes, stdout, pending,
+                lambda part: (load_partition, dump_dir, part),
+                on_loaded,
+            )
+    finally:
+        _reset_sequences([
+            LoadStat(db_alias, model_counter)
+            for db_alias, model_counter in model_counts_by_db.items()
+        ])
+    return loaded_counts
+
+
+def get_partitions(domain, excludes, includes):
+    """Get the partitions of the data to dump, in dependency order"""
+    partitions = []
+    indexes = Counter()
+    for model_class, builder in get_model_iterator_builders_to_dump(domain, excludes, includes):
+        model_label = get_model_label(model_class)
+        # some models are dumped with more than one iterator builder
+        index = indexes[model_label, builder.db_alias]
+        indexes[model_label, builder.db_alias] += 1
+        partitions.append({
+            'model': model_label,
+            'db': builder.db_alias,
+            'index': index,
+            'file': f'sql-{model_label}-{builder.db_alias}-{index}.gz',
+            'count': None,
+            'loaded': False,
+        })
+    return partitions
+
+
+def dump_partition(domain, dump_dir, partition):
+    model_class = apps.get_model(partition['model'])
+    builders = [
+        builder for model, builder in get_model_iterator_builders_to_dump(
+            domain, [], [partition['model']], limit_to_db=partition['db'])
+        if model is model_class
+    ]
+    builder = builders[partition['index']]
+    stats = Counter()
+    objects = get_objects_to_dump_from_builders([(model_class, builder)], stats_counter=stats)
+    path = os.path.join(dump_dir, partition['file'])
+    tmp_path = f'{path}.tmp'
+    with gzip.open(tmp_path, 'wt') as stream:
+        # see SqlDataDumper.dump for why natural keys are used
+        JsonLinesSerializer().serialize(
+            objects,
+            use_natural_foreign_keys=True,
+            use_natural_primary_keys=True,
+            stream=stream,
+        )
+    os.replace(tmp_path, path)
+    return stats[partition['model']]
+
+
+def load_partition(dump_dir, partition):
+    """Load the objects of a partition
+
+    The objects are inserted in bulk in one transaction per database.
+    Sharded objects are routed to their shard in the target environment,
+    which need not have the same shards as the one they were dumped from.
+
+    :returns: Dict of the number of objects loaded into each database.
+    """
+    counts = Counter()
+    with ExitStack() as stack, gzip.open(os.path.join(dump_dir, partition['file']), 'rt') as dump_file:
+        chunks = defaultdict(list)
+        in_transaction = set()
+
+        def flush(db_alias):
+            if db_alias not in in_transaction:
+                stack.enter_context(transaction.atomic(using=db_alias))
+                stack.enter_context(constraint_checks_deferred(db_alias))
+                in_transaction.add(db_alias)
+            counts[db_alias] += _bulk_insert(db_alias, chunks.pop(db_alias))
+
+        for line in dump_file:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            update_model_name(obj)
+            db_alias = get_db_alias(obj)
+            chunks[db_alias].append(obj)
+            if len(chunks[db_alias]) >= CHUNK_SIZE:
+                flush(db_alias)
+        for db_alias in list(chunks):
+            flush(db_alias)
+    return dict(counts)
+
+
+def _bulk_insert(db_alias, obj_dicts):
+    objects = [
+        obj for obj in PythonDeserializer(obj_dicts, using=db_alias)
+        if router.allow_migrate_model(db_alias, type(obj.object))
+    ]
+    if not objects:
+        return 0
+    model = type(objects[0].object)
+    if model._meta.parents or any(obj.m2m_data for obj in objects):
+        # bulk_create does not support multi-table inheritance or
+        # many-to-many data
+        for obj in objects:
+            obj.save(using=db_alias, force_insert=True)
+    else:
+        _raw_insert(model, db_alias, [obj.object for obj in objects])
+    return len(objects)
+
+
+def _raw_insert(model, db_alias, objects):
+    """Insert objects in bulk as ``obj.save(raw=True)`` would
+
+    Unlike ``bulk_create``, values are inserted as they were dumped:
+    ``auto_now`` and ``auto_now_add`` fields are not set to the load time.
+    """
+    opts = model._meta
+    queryset = model._base_manager.using(db_alias)
+    with_pk = [obj for obj in objects if obj.pk is not None]
+    if with_pk:
+        queryset._insert(with_pk, fields=opts.local_concrete_fields, raw=True, using=db_alias)
+    # objects dumped with natural primary keys may not have a pk
+    without_pk = [obj for obj in objects if obj.pk is None]
+    if without_pk:
+        fields = [field for field in opts.local_concrete_fields if field is not opts.auto_field]
+        queryset._insert(without_pk, fields=fields, raw=True, using=db_alias)
+
+
+def _run_in_pool(dump_dir, manifest, processes, stdout, partitions, get_task, on_result):
+    """Run a task for each partition and update the manifest as they complete
+
+    Tasks that complete are recorded in the manifest even if others fail.
+    """
+    if not partitions:
+        return
+    # forked processes must not share the connections of this process
+    connections.close_all()
+    errors = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(*get_task(part)): part for part in partitions}
+        for future in as_completed(futures):
+            part = futures[future]
+            try:
+                result = future.result()
+            except Exception as err:
+                err.args += (f"Error in partition {part['file']!r}",)
+                errors.append(err)
+                continue
+            on_result(part, result)
+            write_manifest(dump_dir, manifest)
+            if stdout:
+                stdout.write(f"{part['file']}: {result}\n")
+    if errors:
+        raise errors[0] if len(errors) == 1 else Exception(errors)
+
+
+def read_manifest(dump_dir):
+    try:
+        with open(os.path.join(dump_dir, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(dump_dir, manifest):
+    path = os.path.join(dump_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(manifest, fh, indent=4)
+    os.replace(tmp_path, path)
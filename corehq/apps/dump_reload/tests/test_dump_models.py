@@ -55,6 +55,7 @@ IGNORE_MODELS = {
     "data_analytics.DomainMetrics",
     "data_analytics.GIRRow",
     "data_analytics.MALTRow",
+    "data_interfaces.CaseDeduplicationBlockingKey",  # rebuilt by backfilling deduplication rules
     "django_celery_results.ChordCounter",
     "django_celery_results.GroupResult",
     "django_celery_results.TaskResult",
@@ -80,6 +81,8 @@ IGNORE_MODELS = {
     "otp_static.StaticDevice",
     "otp_static.StaticToken",
     "otp_totp.TOTPDevice",
+    "phone.OwnerCaseReachability",  # recomputed by restores as needed
+    "phone.OwnerReachableCase",
     "phone.SyncLogSQL",  # not required and can be a lot of data
     "pillow_retry.PillowError",
     "pillowtop.DjangoPillowCheckpoint",
@@ -0,0 +1,123 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+
+from corehq.apps.dump_reload.exceptions import DataLoadException, DomainDumpError
+from corehq.apps.dump_reload.sql import parallel
+from corehq.apps.dump_reload.sql.serialization import JsonLinesSerializer
+from corehq.apps.locations.models import LocationType
+
+
+@patch.object(parallel, 'ProcessPoolExecutor', ThreadPoolExecutor)
+class TestParallelDumpLoad(SimpleTestCase):
+
+    def setUp(self):
+        self.dump_dir = mkdtemp(prefix='dump')
+        self.addCleanup(rmtree, self.dump_dir)
+
+    def write_manifest(self, *partitions):
+        manifest = {
+            'domain': 'test',
+            'partitions': [
+                {
+                    'model': model,
+                    'db': 'default',
+                    'index': 0,
+                    'file': f'sql-{model}-default-0.gz',
+                    'count': count,
+                    'loaded': loaded,
+                }
+                for model, count, loaded in partitions
+            ],
+        }
+        parallel.write_manifest(self.dump_dir, manifest)
+
+    def test_resume_dump(self):
+        self.write_manifest(('locations.LocationType', 2, False), ('locations.SQLLocation', None, False))
+        dumped = []
+
+        def dump_partition(domain, dump_dir, partition):
+            dumped.append(partition['model'])
+            return 3
+
+        with patch.object(parallel, 'dump_partition', dump_partition):
+            manifest = parallel.dump_sql_data('test', self.dump_dir, [], [], processes=2)
+
+        self.assertEqual(dumped, ['locations.SQLLocation'])
+        self.assertEqual([part['count'] for part in manifest['partitions']], [2, 3])
+        self.assertEqual(parallel.read_manifest(self.dump_dir), manifest)
+
+    def test_dump_of_other_domain(self):
+        self.write_manifest(('locations.LocationType', 2, False))
+        with self.assertRaises(DomainDumpError):
+            parallel.dump_sql_data('other', self.dump_dir, [], [], processes=2)
+
+    def test_resume_load(self):
+        self.write_manifest(
+            ('locations.LocationType', 2, True),
+            ('locations.SQLLocation', 3, False),
+        )
+        loaded = []
+
+        def load_partition(dump_dir, partition):
+            loaded.append(partition['model'])
+            return {'default': partition['count']}
+
+        with patch.object(parallel, 'load_partition', load_partition), \
+                patch.object(parallel, '_reset_sequences') as reset_sequences:
+            counts = parallel.load_sql_data(self.dump_dir, processes=2)
+
+        self.assertEqual(loaded, ['locations.SQLLocation'])
+        self.assertEqual(counts, {'locations.SQLLocation': 3})
+        [stat] = reset_sequences.call_args.args[0]
+        self.assertEqual(stat.db_alias, 'default')
+        manifest = parallel.read_manifest(self.dump_dir)
+        self.assertEqual([part['loaded'] for part in manifest['partitions']], [True, True])
+
+    def test_failed_partition_is_not_marked_loaded(self):
+        self.write_manifest(('locations.LocationType', 2, False), ('locations.SQLLocation', 3, False))
+
+        def load_partition(dump_dir, partition):
+            raise ValueError('boom')
+
+        with patch.object(parallel, 'load_partition', load_partition), \
+                patch.object(parallel, '_reset_sequences'), \
+                self.assertRaises(ValueError):
+            parallel.load_sql_data(self.dump_dir, processes=2)
+
+        manifest = parallel.read_manifest(self.dump_dir)
+        self.assertEqual([part['loaded'] for part in manifest['partitions']], [False, False])
+
+    def test_load_incomplete_dump(self):
+        self.write_manifest(('locations.LocationType', None, False))
+        with self.assertRaises(DataLoadException):
+            parallel.load_sql_data(self.dump_dir, processes=2)
+
+
+class TestLoadPartition(TestCase):
+
+    def test_dumped_timestamps_are_loaded(self):
+        dump_dir = mkdtemp(prefix='dump')
+        self.addCleanup(rmtree, dump_dir)
+        last_modified = datetime(2020, 1, 2, 3, 4, 5)
+        location_type = LocationType.objects.create(domain='test', name='State')
+        LocationType.objects.filter(pk=location_type.pk).update(last_modified=last_modified)
+        location_type.refresh_from_db()
+        partition = {'model': 'locations.LocationType', 'file': 'sql-locations.LocationType-default-0.gz'}
+        with gzip.open(os.path.join(dump_dir, partition['file']), 'wt') as stream:
+            JsonLinesSerializer().serialize(
+                [location_type],
+                use_natural_foreign_keys=True,
+                use_natural_primary_keys=True,
+                stream=stream,
+            )
+        LocationType.objects.filter(pk=location_type.pk).delete()
+
+        self.assertEqual(parallel.load_partition(dump_dir, partition), {'default': 1})
+        self.assertEqual(LocationType.objects.get(pk=location_type.pk).last_modified, last_modified)
@@ -366,23 +366,30 @@ def write_export_instance(writer, export_instance, documents,
         total_rows = 0
         track_load = load_counter(export_instance.type, "export", export_instance.domain)
 
+        # work out how to get the rows of each table once for all documents
+        table_plans = [
+            (
+                table,
+                table.get_row_plan(
+                    split_columns=export_instance.split_multiselects,
+                    transform_dates=export_instance.transform_dates,
+                    include_hyperlinks=include_hyperlinks,
+                ),
+                # This is for bulk exports on all case types.
+                # Skip over the tables that a doc shouldn't go into.
+                [path.name for path in table.path] if ALL_CASE_TYPE_TABLE in table.path else None,
+            )
+            for table in export_instance.selected_tables
+        ]
+
         for row_number, doc in enumerate(documents):
             total_bytes += sys.getsizeof(doc)
-            for table in export_instance.selected_tables:
-                # This is for bulk exports on all case types.
-                # Skip over the tables that this doc shouldn't go into.
-                path_names = [path.name for path in table.path]
-                if ALL_CASE_TYPE_TABLE in table.path and doc['type'] not in path_names:
+            for table, plan, path_names in table_plans:
+                if path_names is not None and doc['type'] not in path_names:
                     continue
 
                 try:
-                    rows = table.get_rows(
-                        doc,
-                        row_number,
-                        split_columns=export_instance.split_multiselects,
-                        transform_dates=export_instance.transform_dates,
-                        include_hyperlinks=include_hyperlinks,
-                    )
+                    rows = plan.get_rows(doc, row_number)
                 except Exception as e:
                     notify_exception(None, "Error exporting doc", details={
                         'domain': export_instance.domain,
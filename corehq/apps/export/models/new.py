@@ -523,6 +523,10 @@ class TableConfiguration(DocumentSchema, ReadablePathMixin):
                                    which column indices to hyperlink
         :return: List of ExportRows
         """
+        if not as_json:
+            plan = self.get_row_plan(split_columns, transform_dates, include_hyperlinks)
+            return plan.get_rows(document, row_number)
+
         document_id = document.get('_id')
 
         sub_documents = self._get_sub_documents(document, row_number, document_id=document_id)
@@ -536,9 +540,7 @@ class TableConfiguration(DocumentSchema, ReadablePathMixin):
         for doc_row in sub_documents:
             doc, row_index = doc_row.doc, doc_row.row
 
-            row_data = {} if as_json else []
-            col_index = 0
-            skip_excel_formatting = []
+            row_data = {}
             for col in self.selected_columns:
                 # When doing a bulk case export, each column will have a reference to the ALL_CASE_TYPE_EXPORT
                 # case type in its path. This needs to be temporarily removed when getting the value.
@@ -555,43 +557,21 @@ class TableConfiguration(DocumentSchema, ReadablePathMixin):
                     split_column=split_columns,
                     transform_dates=transform_dates,
                 )
-                if as_json:
-                    for index, header in enumerate(col.get_headers(split_column=split_columns)):
-                        if isinstance(val, list):
-                            row_data[header] = "{}".format(val[index])
-                        else:
-                            row_data[header] = "{}".format(val)
-                elif isinstance(val, list):
-                    row_data.extend(val)
-
-                    # we never want to auto-format RowNumberColumn
-                    # (always treat as text)
-                    next_col_index = col_index + len(val)
-                    if isinstance(col, RowNumberColumn):
-                        skip_excel_formatting.extend(
-                            list(range(col_index, next_col_index))
-                        )
-                    col_index = next_col_index
-                else:
-                    row_data.append(val)
-
-                    # we never want to auto-format RowNumberColumn
-                    # (always treat as text)
-                    if isinstance(col, RowNumberColumn):
-                        skip_excel_formatting.append(col_index)
-                    col_index += 1
-            if as_json:
-                rows.append(row_data)
-            else:
-                hyperlink_indices = self.get_hyperlink_column_indices(
-                    split_columns) if include_hyperlinks else []
-                rows.append(ExportRow(
-                    data=row_data,
-                    hyperlink_column_indices=hyperlink_indices,
-                    skip_excel_formatting=skip_excel_formatting
-                ))
+                for index, header in enumerate(col.get_headers(split_column=split_columns)):
+                    if isinstance(val, list):
+                        row_data[header] = "{}".format(val[index])
+                    else:
+                        row_data[header] = "{}".format(val)
+            rows.append(row_data)
         return rows
 
+    def get_row_plan(self, split_columns=False, transform_dates=False, include_hyperlinks=True):
+        """
+        Return a TableRowPlan that generates the same ExportRows as `get_rows`,
+        for use when generating rows for many documents.
+        """
+        return TableRowPlan(self, split_columns, transform_dates, include_hyperlinks)
+
     @staticmethod
     def _create_index(_path, _transform):
         return f'{_path_nodes_to_string(_path)} t.{_transform}'
@@ -731,6 +711,89 @@ class DatePeriod(DocumentSchema):
         return enddate
 
 
+class TableRowPlan(object):
+    """
+    Generates the ExportRows of a TableConfiguration.
+
+    Everything that does not depend on the document (the base path of each
+    column, the getters for plain columns and the hyperlink columns) is
+    worked out once when the plan is created rather than for every cell.
+    """
+
+    def __init__(self, table, split_columns=False, transform_dates=False, include_hyperlinks=True):
+        self.table = table
+        # When doing a bulk case export, each column will have a reference to the ALL_CASE_TYPE_EXPORT
+        # case type in its path. This needs to be temporarily removed when getting the value.
+        base_path = [] if ALL_CASE_TYPE_TABLE in table.path else table.path
+        self._columns = [
+            (
+                self._get_value_function(col, base_path, split_columns, transform_dates),
+                # we never want to auto-format RowNumberColumn
+                # (always treat as text)
+                isinstance(col, RowNumberColumn),
+            )
+            for col in table.selected_columns
+        ]
+        self._hyperlink_indices = (
+            table.get_hyperlink_column_indices(split_columns) if include_hyperlinks else []
+        )
+
+    @staticmethod
+    def _get_value_function(col, base_path, split_columns, transform_dates):
+        if type(col) is ExportColumn and base_path == col.item.path[:len(base_path)]:
+            getter = NestedDictGetter([x.name for x in col.item.path[len(base_path):]])
+
+            def get_value(domain, doc_id, doc, row_index):
+                return col._transform(getter(doc), doc, transform_dates)
+        else:
+            def get_value(domain, doc_id, doc, row_index):
+                return col.get_value(
+                    domain,
+                    doc_id,
+                    doc,
+                    base_path,
+                    row_index=row_index,
+                    split_column=split_columns,
+                    transform_dates=transform_dates,
+                )
+        return get_value
+
+    def get_rows(self, document, row_number):
+        """
+        Return a list of ExportRows generated for the given document.
+        See `TableConfiguration.get_rows`.
+        """
+        document_id = document.get('_id')
+        sub_documents = self.table._get_sub_documents(document, row_number, document_id=document_id)
+        domain = document.get('domain')
+
+        assert domain is not None, 'Form or Case must be associated with domain'
+        assert document_id is not None, 'Form or Case must have an id'
+
+        rows = []
+        for doc_row in sub_documents:
+            doc, row_index = doc_row.doc, doc_row.row
+            row_data = []
+            skip_excel_formatting = []
+            for get_value, is_row_number in self._columns:
+                val = get_value(domain, document_id, doc, row_index)
+                col_index = len(row_data)
+                if isinstance(val, list):
+                    row_data.extend(val)
+                    if is_row_number:
+                        skip_excel_formatting.extend(range(col_index, len(row_data)))
+                else:
+                    row_data.append(val)
+                    if is_row_number:
+                        skip_excel_formatting.append(col_index)
+            rows.append(ExportRow(
+                data=row_data,
+                hyperlink_column_indices=self._hyperlink_indices,
+                skip_excel_formatting=skip_excel_formatting
+            ))
+        return rows
+
+
 class ExportInstanceFilters(DocumentSchema):
     """
     A class represented a saved set of filters for an export
@@ -1,6 +1,6 @@
 from django.test import SimpleTestCase
 
-from corehq.apps.export.const import USERNAME_TRANSFORM
+from corehq.apps.export.const import MISSING_VALUE, USERNAME_TRANSFORM
 from corehq.apps.export.models import (
     DocRow,
     ExportColumn,
@@ -355,3 +355,51 @@ class TableConfigurationGetRowsTest(SimpleTestCase):
         self.assertEqual(
             [row.data for row in table_configuration.get_rows(submission, 0)], []
         )
+
+
+class TableRowPlanTest(SimpleTestCase):
+
+    def setUp(self):
+        self.table_configuration = TableConfiguration(
+            path=[PathNode(name="form", is_repeat=False), PathNode(name="repeat1", is_repeat=True)],
+            columns=[
+                RowNumberColumn(selected=True),
+                ExportColumn(
+                    item=ScalarItem(
+                        path=[
+                            PathNode(name='form'),
+                            PathNode(name='repeat1', is_repeat=True),
+                            PathNode(name='q1')
+                        ],
+                    ),
+                    selected=True,
+                ),
+            ]
+        )
+
+    def _get_submission(self, doc_id, values):
+        return {
+            'domain': 'my-domain',
+            '_id': doc_id,
+            'form': {'repeat1': [{'q1': value} for value in values]},
+        }
+
+    def test_plan_is_reused_for_documents(self):
+        plan = self.table_configuration.get_row_plan()
+        self.assertEqual(
+            [row.data for row in plan.get_rows(self._get_submission('1', ['foo', 'bar']), 0)],
+            [["0.0", 0, 0, 'foo'], ["0.1", 0, 1, 'bar']],
+        )
+        self.assertEqual(
+            [row.data for row in plan.get_rows(self._get_submission('2', ['baz']), 1)],
+            [["1.0", 1, 0, 'baz']],
+        )
+
+    def test_values(self):
+        submission = self._get_submission('1', ['foo', {'#text': 'bar', 'id': '2'}, None])
+        rows = self.table_configuration.get_row_plan().get_rows(submission, 3)
+        self.assertEqual(
+            [row.data for row in rows],
+            [["3.0", 3, 0, 'foo'], ["3.1", 3, 1, 'bar'], ["3.2", 3, 2, MISSING_VALUE]],
+        )
+        self.assertEqual(rows[0].skip_excel_formatting, [0, 1, 2])
@@ -1,13 +1,20 @@
+import hashlib
+import json
 from collections import defaultdict
 from functools import partial
 from operator import attrgetter
 from xml.etree import cElementTree as ElementTree
 
+from django.core.cache import cache
+
 from casexml.apps.phone.fixtures import FixtureProvider
 from casexml.apps.phone.utils import (
     GLOBAL_USER_ID,
     get_or_cache_global_fixture,
 )
+from dimagi.utils.chunked import chunked
+
+from corehq import toggles
 from corehq.apps.fixtures.exceptions import FixtureTypeCheckError
 from corehq.apps.fixtures.models import FIXTURE_BUCKET, LookupTable, LookupTableRow
 from corehq.apps.products.fixtures import product_fixture_generator_json
@@ -18,6 +25,9 @@ from .utils import clean_fixture_field_name, get_index_schema_node
 
 LOOKUP_TABLE_FIXTURE = 'lookup_table_fixture'
 REPORT_FIXTURE = 'report_fixture'
+ROW_XML_CACHE_TIMEOUT = 24 * 60 * 60
+ROW_XML_CACHE_CHUNK_SIZE = 1000
+ITEMS_PLACEHOLDER = '__items__'
 
 
 def item_lists_by_domain(domain, namespace_ids=False):
@@ -185,11 +195,33 @@ class ItemListsProvider(FixtureProvider):
         fixture_element = ElementTree.Element('fixture', attrib)
         item_list_element = ElementTree.Element('%s_list' % data_type.tag)
         fixture_element.append(item_list_element)
+        if toggles.LOOKUP_TABLE_ROW_XML_CACHE.enabled(data_type.domain):
+            item_list_element.text = ITEMS_PLACEHOLDER
+            head, tail = ElementTree.tostring(fixture_element, encoding='utf-8').split(
+                ITEMS_PLACEHOLDER.encode('utf-8'))
+            return head + b''.join(self._iter_cached_xml(items, data_type)) + tail
         for item in items:
             xml = self.to_xml(item, data_type)
             item_list_element.append(xml)
         return fixture_element
 
+    def _iter_cached_xml(self, items, data_type):
+        """Get the XML of each item, serializing only items that are not cached"""
+        schema_hash = _get_schema_hash(data_type)
+        for chunk in chunked(items, ROW_XML_CACHE_CHUNK_SIZE, list):
+            keys = [_get_row_xml_cache_key(item, schema_hash) for item in chunk]
+            cached = cache.get_many([key for key in keys if key])
+            to_cache = {}
+            for item, key in zip(chunk, keys):
+                xml = cached.get(key)
+                if xml is None:
+                    xml = ElementTree.tostring(self.to_xml(item, data_type), encoding='utf-8')
+                    if key:
+                        to_cache[key] = xml
+                yield xml
+            if to_cache:
+                cache.set_many(to_cache, ROW_XML_CACHE_TIMEOUT)
+
     def _get_schema_element(self, data_type):
         attrs_to_index = [field.field_name for field in data_type.fields if field.is_indexed]
         fixture_id = ':'.join((self.id, data_type.tag))
@@ -224,4 +256,16 @@ class ItemListsProvider(FixtureProvider):
         return xData
 
 
+def _get_schema_hash(data_type):
+    """Hash the parts of a table definition that the XML of its rows depends on"""
+    schema = [data_type.tag, data_type.item_attributes, [field.field_name for field in data_type.fields]]
+    return hashlib.md5(json.dumps(schema).encode('utf-8')).hexdigest()
+
+
+def _get_row_xml_cache_key(item, schema_hash):
+    if item.last_modified is None:
+        return None
+    return f'lookup-table-row-xml:{item.id.hex}:{item.last_modified.isoformat()}:{schema_hash}'
+
+
 item_lists = ItemListsProvider()
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.18 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fixtures', '0010_lookuptable_is_synced'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lookuptablerow',
+            name='last_modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -237,6 +237,8 @@ class LookupTableRow(models.Model):
     fields = AttrsDict(list_of(Field), default=dict)
     item_attributes = models.JSONField(default=dict)
     sort_key = models.IntegerField()
+    # row version, used to cache the XML of the row in restores
+    last_modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         app_label = 'fixtures'
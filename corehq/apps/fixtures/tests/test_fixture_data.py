@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from xml.etree import cElementTree as ElementTree
 
 from django.test import TestCase
@@ -18,6 +19,7 @@ from corehq.apps.fixtures.models import (
 )
 from corehq.apps.users.models import CommCareUser
 from corehq.blobs import get_blob_db
+from corehq.util.test_utils import flag_enabled
 
 
 def call_fixture_generator(user):
@@ -107,6 +109,38 @@ class FixtureDataTest(TestCase):
         </fixture>
         """ % self.user.user_id, ElementTree.tostring(fixture, encoding='utf-8'))
 
+    @flag_enabled('LOOKUP_TABLE_ROW_XML_CACHE')
+    def test_cached_row_xml(self):
+        restore_user = self.user.to_ota_restore_user(self.domain)
+        expected = """
+        <fixture id="item-list:district" user_id="%s">
+            <district_list>
+                <district>
+                    <state_name>Delhi_state</state_name>
+                    <district_name lang="hin">Delhi_in_HIN</district_name>
+                    <district_name lang="eng">Delhi_in_ENG</district_name>
+                    <district_id>Delhi_id</district_id>
+                </district>
+            </district_list>
+        </fixture>
+        """ % self.user.user_id
+        fixture, = call_fixture_generator(restore_user)
+        check_xml_line_by_line(self, expected, ElementTree.tostring(fixture, encoding='utf-8'))
+
+        with patch.object(fixturegenerators.ItemListsProvider, 'to_xml') as to_xml:
+            fixture, = call_fixture_generator(restore_user)
+        to_xml.assert_not_called()
+        check_xml_line_by_line(self, expected, ElementTree.tostring(fixture, encoding='utf-8'))
+
+        self.data_item.fields["district_id"] = [Field(value="Delhi_id_2")]
+        self.data_item.save()
+        fixture, = call_fixture_generator(restore_user)
+        check_xml_line_by_line(
+            self,
+            expected.replace("Delhi_id<", "Delhi_id_2<"),
+            ElementTree.tostring(fixture, encoding='utf-8'),
+        )
+
     def test_fixture_removal(self):
         """
         An empty fixture list should be generated for each fixture that the
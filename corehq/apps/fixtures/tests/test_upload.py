@@ -1,5 +1,6 @@
 from contextlib import contextmanager
 from datetime import timedelta
+from functools import partial
 from io import BytesIO
 from unittest.mock import patch
 
@@ -678,6 +679,23 @@ class TestFixtureUpload(TestCase):
         clear_cache.assert_called_once()
 
 
+class TestFixtureUploadSkipOrm(TestFixtureUpload):
+    do_upload = partial(_run_upload, skip_orm=True)
+
+    def test_rows_written_in_batches(self):
+        with patch.object(mod, "BULK_BATCH_SIZE", 2):
+            self.upload([(None, 'N', 'apple'), (None, 'N', 'banana'), (None, 'N', 'coconut')])
+            ids = {row_name(r): r.id.hex for r in self.get_rows(None)}
+            self.upload([
+                (ids['banana'], 'N', 'banana'),
+                (ids['apple'], 'Y', 'apple'),
+                (None, 'N', 'date'),
+                (None, 'N', 'eggplant'),
+            ], replace=True)
+        self.assertEqual(self.get_rows(), ['banana', 'date', 'eggplant'])
+        self.assertEqual(self.get_rows(None)[0].id.hex, ids['banana'])
+
+
 class TestLookupTableOwnershipUpload(TestCase):
     do_upload = _run_upload
 
@@ -1,13 +1,22 @@
+import csv
+import hashlib
+import json
 from collections import defaultdict
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from io import StringIO
+from itertools import chain
 from operator import attrgetter
+from uuid import UUID
 
 from attrs import define, field
 
 from django.core.exceptions import ValidationError
+from django.db import connection, models
 from django.db.models import Q
 from django.db.models.functions import Lower
 from django.db.transaction import atomic
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from dimagi.utils.chunked import chunked
@@ -26,6 +35,10 @@ from corehq.apps.users.models import CommCareUser
 from corehq.apps.users.util import normalize_username
 
 
+BULK_BATCH_SIZE = 1000
+COPY_FIELD_NAMES = ["id", "domain", "table", "fields", "item_attributes", "sort_key", "last_modified"]
+
+
 def upload_fixture_file(domain, filename, replace, task=None, skip_orm=False):
     """
     should only ever be called after the same file has been validated
@@ -43,13 +56,17 @@ def _run_upload(domain, workbook, replace=False, task=None, skip_orm=False):
 
     Upload with `skip_orm=True` is faster than the default with the
     following trade-off: it does not support fixture ownership. All
-    fixtures must be global.
+    fixtures must be global. Rows are streamed from the workbook and
+    written in batches (see `process_rows_in_bulk`) in a single
+    transaction.
     """
     def process_table(table, new_table):
+        if skip_orm:
+            process_rows_in_bulk(domain, workbook, table, update_progress, delete_missing=replace)
+            return
+
         def process_row(row, new_row):
             update_progress(table)
-            if skip_orm:
-                return  # fast upload does not do ownership
             owners.process(
                 workbook,
                 old_owners.get(row.id, []),
@@ -60,13 +77,12 @@ def _run_upload(domain, workbook, replace=False, task=None, skip_orm=False):
 
         old_rows = list(LookupTableRow.objects.iter_rows(domain, tag=table.tag))
         sort_keys = {r.id.hex: r.sort_key for r in old_rows}
-        if not skip_orm:
-            old_owners = defaultdict(list)
-            for owner in LookupTableRowOwner.objects.filter(
-                domain=domain,
-                row_id__in=list(sort_keys),
-            ):
-                old_owners[owner.row_id].append(owner)
+        old_owners = defaultdict(list)
+        for owner in LookupTableRowOwner.objects.filter(
+            domain=domain,
+            row_id__in=list(sort_keys),
+        ):
+            old_owners[owner.row_id].append(owner)
 
         rows.process(
             workbook,
@@ -94,18 +110,19 @@ def _run_upload(domain, workbook, replace=False, task=None, skip_orm=False):
     rows = Mutation()
     owners = Mutation()
     try:
-        tables.process(
-            workbook,
-            old_tables,
-            workbook.iter_tables(domain),
-            table_key,
-            process_table,
-            delete_missing=False,
-            deleted_key=attrgetter("tag"),
-        )
+        with atomic() if skip_orm else nullcontext():
+            tables.process(
+                workbook,
+                old_tables,
+                workbook.iter_tables(domain),
+                table_key,
+                process_table,
+                delete_missing=False,
+                deleted_key=attrgetter("tag"),
+            )
 
-        update_progress(None)
-        flush(tables, rows, owners)
+            update_progress(None)
+            flush(tables, rows, owners)
     finally:
         clear_fixture_cache(domain)
     return result
@@ -177,6 +194,87 @@ def flush(tables, rows, owners):
     owners.clear()
 
 
+def process_rows_in_bulk(domain, workbook, table, update_progress, delete_missing):
+    """Diff the rows of a table's data sheet with its existing rows
+
+    Rows are processed like `Mutation.process` does, but without
+    holding all rows of the table in memory: a hash of the key of each
+    existing row is loaded, and rows are streamed from the data sheet
+    and written in batches. Rows are deleted in bulk and inserted with
+    Postgres COPY, which is much faster than INSERT for large tables.
+    Ownership is not supported.
+    """
+    old_ids = defaultdict(list)
+    sort_keys = {}
+    for row in LookupTableRow.objects.iter_rows(domain, tag=table.tag):
+        old_ids[row_key_hash(row)].append(row.id)
+        sort_keys[row.id.hex] = row.sort_key
+
+    to_delete = []
+    to_create = []
+    for new in workbook.iter_rows(table, sort_keys, stream=True):
+        if isinstance(new, Deleted):
+            if new.key in sort_keys:
+                to_delete.append(UUID(new.key))
+            continue
+        update_progress(table)
+        matching_ids = old_ids.get(row_key_hash(new))
+        if matching_ids:
+            matching_ids.pop()
+        else:
+            uid = workbook.get_key(new)
+            if uid in sort_keys:
+                to_delete.append(UUID(uid))
+            to_create.append(new)
+        if len(to_create) >= BULK_BATCH_SIZE or len(to_delete) >= BULK_BATCH_SIZE:
+            _write_rows(to_create, to_delete)
+            to_create = []
+            to_delete = []
+    if delete_missing:
+        to_delete.extend(chain.from_iterable(old_ids.values()))
+    _write_rows(to_create, to_delete)
+
+
+def _write_rows(to_create, to_delete):
+    for chunk in chunked(to_delete, BULK_BATCH_SIZE, list):
+        LookupTableRow.objects.filter(id__in=chunk).delete()
+    for chunk in chunked(to_create, BULK_BATCH_SIZE, list):
+        copy_rows(chunk)
+
+
+def copy_rows(rows):
+    """Insert lookup table rows with Postgres COPY"""
+    opts = LookupTableRow._meta
+    fields = [opts.get_field(name) for name in COPY_FIELD_NAMES]
+    now = timezone.now()
+    data = StringIO()
+    writer = csv.writer(data)
+    for row in rows:
+        row.last_modified = now
+        writer.writerow([_get_copy_value(f, getattr(row, f.attname)) for f in fields])
+    data.seek(0)
+    table_name = connection.ops.quote_name(opts.db_table)
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)", data)
+
+
+def _get_copy_value(field, value):
+    if isinstance(field, models.JSONField):
+        return json.dumps(field.get_prep_value(value), cls=field.encoder)
+    return field.get_db_prep_save(value, connection)
+
+
+def row_key_hash(row):
+    """Get a hash of the key of a row, which is smaller than the key
+
+    See `row_key`.
+    """
+    fields = LookupTableRow._meta.get_field("fields").get_prep_value(row.fields)
+    key = [fields, row.item_attributes, row.sort_key]
+    return hashlib.md5(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).digest()
+
+
 def setup_progress(task, workbook):
     total_tables = workbook.count_tables()
     if task is None:
@@ -68,6 +68,16 @@ class _FixtureWorkbook(object):
             rows = self._rows[tag] = list(self.workbook.get_worksheet(tag))
         return rows
 
+    def iter_data_sheet(self, tag):
+        """Iterate over the rows of a data sheet without caching them
+
+        Unless the sheet has already been cached by `get_data_sheet`, it
+        can only be iterated once.
+        """
+        if tag in self._rows:
+            return iter(self._rows[tag])
+        return iter(self.workbook.get_worksheet(tag))
+
     def get_all_type_sheets(self):
         type_sheets = []
         seen_tags = set()
@@ -120,7 +130,10 @@ class _FixtureWorkbook(object):
         return len(self.get_all_type_sheets())
 
     def count_rows(self, data_type):
-        return len(self.get_data_sheet(data_type.tag))
+        if data_type.tag in self._rows:
+            return len(self._rows[data_type.tag])
+        # do not load a sheet that may be streamed; exclude the header row
+        return self.workbook.get_worksheet(data_type.tag).worksheet.max_row - 1
 
     def iter_tables(self, domain):
         for sheet in self.get_all_type_sheets():
@@ -137,10 +150,19 @@ class _FixtureWorkbook(object):
             self.item_keys[table] = sheet.table_id
             yield table
 
-    def iter_rows(self, data_type, sort_keys):
+    def iter_rows(self, data_type, sort_keys, stream=False):
+        """Iterate over the rows of a table's data sheet
+
+        :param stream: Do not cache the rows of the sheet. The sheet
+        can only be iterated once.
+        """
         type_fields = data_type.fields
         sort_key = -1
-        for i, di in enumerate(self.get_data_sheet(data_type.tag)):
+        if stream:
+            sheet_rows = self.iter_data_sheet(data_type.tag)
+        else:
+            sheet_rows = self.get_data_sheet(data_type.tag)
+        for i, di in enumerate(sheet_rows):
             uid = di.get('UID')
             if _is_deleted(di):
                 if uid:
@@ -262,6 +262,8 @@ class AdminRestoreView(TemplateView):
     def _get_restore_response(self):
         params = get_restore_params(self.request, self.domain)
         params['as_user'] = self.user.username
+        # the payload is parsed to show restore stats
+        params['accept_gzip'] = False
         return get_restore_response(
             self.domain, self.request.couch_user, app_id=self.app_id,
             **params
@@ -1,14 +1,18 @@
+import hashlib
+import json
 from collections import defaultdict
 from itertools import groupby
 from xml.etree.cElementTree import Element, SubElement
 
 from django.contrib.postgres.fields.array import ArrayField
+from django.core.cache import cache
 from django.db.models import IntegerField, Q
 
 from django_cte import With
 from django_cte.raw import raw_cte_sql
 
 from casexml.apps.phone.fixtures import FixtureProvider
+from casexml.apps.phone.utils import GLOBAL_USER_ID, write_fixture_items_to_io
 
 from corehq import toggles
 from corehq.apps.app_manager.const import (
@@ -25,6 +29,8 @@ from corehq.apps.locations.models import (
     get_domain_locations,
 )
 
+LOCATION_FIXTURE_CACHE_TIMEOUT = 24 * 60 * 60
+
 
 class LocationSet(object):
     """
@@ -114,10 +120,45 @@ class LocationFixtureProvider(FixtureProvider):
         if not should_sync_locations(restore_state.last_sync_log, locations_queryset, restore_state):
             return []
 
+        if toggles.LOCATION_FIXTURE_CACHE.enabled(restore_user.domain):
+            return get_or_cache_location_fixture(self.serializer, restore_user.domain, self.id,
+                                                 restore_user.user_id, locations_queryset)
         return self.serializer.get_xml_nodes(restore_user.domain, self.id, restore_user.user_id,
                                              locations_queryset)
 
 
+def get_or_cache_location_fixture(serializer, domain, fixture_id, user_id, locations_queryset):
+    """Get a location fixture from a cache shared by all users that sync the same locations
+
+    The fixture is cached without a user id, and is keyed on the ids and
+    last modified times of the locations to sync, the location types of
+    the domain, and the location data fields. Saving any of those
+    locations or location types changes the key.
+
+    :returns: List containing a byte string of the fixture elements.
+    """
+    key = _get_location_fixture_cache_key(domain, fixture_id, locations_queryset)
+    data = cache.get(key)
+    if data is None:
+        nodes = serializer.get_xml_nodes(domain, fixture_id, GLOBAL_USER_ID, locations_queryset)
+        data = write_fixture_items_to_io(nodes).read()
+        cache.set(key, data, LOCATION_FIXTURE_CACHE_TIMEOUT)
+    return [data.replace(GLOBAL_USER_ID.encode('utf-8'), user_id.encode('utf-8'))]
+
+
+def _get_location_fixture_cache_key(domain, fixture_id, locations_queryset):
+    def versions(queryset):
+        return sorted([pk, last_modified.isoformat()] for pk, last_modified in queryset)
+
+    key_parts = [
+        versions(locations_queryset.values_list('id', 'last_modified')),
+        versions(LocationType.objects.filter(domain=domain).values_list('id', 'last_modified')),
+        [field.slug for field in get_location_data_fields(domain)],
+    ]
+    key_hash = hashlib.md5(json.dumps(key_parts).encode('utf-8')).hexdigest()
+    return f'location-fixture:{domain}:{fixture_id}:{key_hash}'
+
+
 class HierarchicalLocationSerializer(object):
 
     def should_sync(self, restore_user, app):
@@ -14,6 +14,7 @@ from casexml.apps.phone.tests.utils import (
     call_fixture_generator,
     create_restore_user,
 )
+from casexml.apps.phone.utils import get_cached_items_with_count
 
 from corehq.apps.app_manager.tests.util import (
     TestXmlMixin,
@@ -31,6 +32,7 @@ from corehq.apps.users.models import CommCareUser, WebUser
 from corehq.util.test_utils import flag_enabled, generate_cases
 
 from ..fixtures import (
+    HierarchicalLocationSerializer,
     LocationSet,
     _location_to_fixture,
     get_location_data_fields,
@@ -197,6 +199,36 @@ class LocationFixturesTest(LocationHierarchyTestCase, FixtureHasLocationsMixin):
                  'Somerville', 'New York', 'New York City', 'Manhattan', 'Queens', 'Brooklyn']
             )
 
+    @flag_enabled('HIERARCHICAL_LOCATION_FIXTURE')
+    @flag_enabled('LOCATION_FIXTURE_CACHE')
+    def test_cached_fixture(self):
+        self.user._couch_user.set_location(self.locations['Suffolk'])
+        desired_fixture = self._assemble_expected_fixture(
+            'simple_fixture', ['Massachusetts', 'Suffolk', 'Boston', 'Revere'])
+
+        cached, = call_fixture_generator(location_fixture_generator, self.user)
+        self.assertXmlEqual(desired_fixture, get_cached_items_with_count(cached)[0])
+
+        other_user = create_restore_user(self.domain, 'other-user', '123')
+        self.addCleanup(other_user._couch_user.delete, self.domain, deleted_by=None)
+        other_user._couch_user.set_location(self.locations['Suffolk'])
+        with mock.patch.object(HierarchicalLocationSerializer, 'get_xml_nodes') as get_xml_nodes:
+            other_cached, = call_fixture_generator(location_fixture_generator, other_user)
+        get_xml_nodes.assert_not_called()
+        self.assertEqual(other_cached, cached.replace(
+            self.user.user_id.encode('utf-8'), other_user.user_id.encode('utf-8')))
+
+        boston = self.locations['Boston']
+        self.addCleanup(self._rename_location, boston, boston.name)
+        self._rename_location(boston, 'Beantown')
+        cached, = call_fixture_generator(location_fixture_generator, self.user)
+        self.assertIn(b'Beantown', cached)
+
+    @staticmethod
+    def _rename_location(location, name):
+        location.name = name
+        location.save()
+
     def test_expand_to_county(self):
         """
         expand to "county"
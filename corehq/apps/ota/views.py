@@ -24,6 +24,7 @@ from tastypie.http import HttpNotAcceptable, HttpTooManyRequests
 
 from casexml.apps.case.cleanup import claim_case, get_first_claims
 from casexml.apps.case.fixtures import CaseDBFixture
+from casexml.apps.phone.compression import accepts_gzip
 from casexml.apps.phone.data_providers.case.livequery import get_case_hierarchy
 from casexml.apps.phone.exceptions import MissingSyncLog
 from casexml.apps.phone.models import get_properly_wrapped_sync_log
@@ -262,6 +263,7 @@ def get_restore_params(request, domain):
         'skip_fixtures': skip_fixtures,
         'auth_type': getattr(request, 'auth_type', None),
         'fail_hard': request.GET.get('fail_hard') == 'true',
+        'accept_gzip': accepts_gzip(request),
     }
 
 
@@ -272,7 +274,7 @@ def get_restore_response(domain, couch_user, app_id=None, since=None, version='1
                          as_user=None, device_id=None, user_id=None,
                          openrosa_version=None,
                          skip_fixtures=False, auth_type=None,
-                         fail_hard=False):
+                         fail_hard=False, accept_gzip=False):
     """
     :param domain: Domain being restored from
     :param couch_user: User performing restore
@@ -293,6 +295,7 @@ def get_restore_response(domain, couch_user, app_id=None, since=None, version='1
         Used to determine if the request is coming from an actual user or as part of some automation.
     :param fail_hard: In case of exceptions, fail hardly by raising exception instead of logging
         silently.
+    :param accept_gzip: Send gzip-encoded response content if True
     :return: Tuple of (http response, timing context or None)
     """
     if user_id and user_id != couch_user.user_id:
@@ -362,6 +365,7 @@ def get_restore_response(domain, couch_user, app_id=None, since=None, version='1
             device_id=device_id,
             openrosa_version=openrosa_version,
             fail_hard=fail_hard,
+            accept_gzip=accept_gzip,
         ),
         cache_settings=RestoreCacheSettings(
             force_cache=force_cache or async_restore_enabled,
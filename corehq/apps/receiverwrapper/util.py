@@ -15,7 +15,7 @@ from corehq.apps.app_manager.models import ApplicationBase
 from corehq.apps.receiverwrapper.exceptions import LocalSubmissionError
 from corehq.apps.receiverwrapper.rate_limiter import rate_limit_submission
 from corehq.apps.users.models import CommCareUser
-from corehq.form_processor.submission_post import SubmissionPost
+from corehq.form_processor.submission_post import BulkSubmissionPost, SubmissionPost
 from corehq.form_processor.utils import convert_xform_to_json
 from corehq.util.quickcache import quickcache
 from corehq.util.soft_assert import soft_assert
@@ -58,6 +58,36 @@ def submit_form_locally(instance, domain, max_wait=..., **kwargs):
     return result
 
 
+def submit_forms_locally(instances, domain, max_wait=..., **kwargs):
+    """Submit an ordered batch of forms from the same user
+
+    See `BulkSubmissionPost`.
+
+    :param instances: List of XML instances (as strings) to submit
+    :param domain: The domain to submit the forms to
+    :param max_wait: See `submit_form_locally`
+    :returns: List of `FormProcessingResult`, one for each instance.
+    """
+    if max_wait is ...:
+        max_wait = 0.1
+    if max_wait is not None:
+        for _ in instances:
+            rate_limit_submission(domain, delay_rather_than_reject=True, max_wait=max_wait)
+    kwargs['auth_context'] = kwargs.get('auth_context') or DefaultAuthContext()
+    results = BulkSubmissionPost(
+        [(instance, None) for instance in instances],
+        domain=domain,
+        **kwargs
+    ).run()
+    for result in results:
+        if not 200 <= result.response.status_code < 300:
+            raise LocalSubmissionError('Error submitting (status code %s): %s' % (
+                result.response.status_code,
+                result.response.content.decode('utf-8', errors='backslashreplace'),
+            ))
+    return results
+
+
 def get_meta_appversion_text(form_metadata):
     try:
         text = form_metadata['appVersion']
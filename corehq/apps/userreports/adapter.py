@@ -46,6 +46,29 @@ class IndicatorAdapter(object):
         else:
             self._best_effort_save_rows(indicator_rows, doc)
 
+    def best_effort_bulk_save(self, docs):
+        """
+        Like `best_effort_save`, but saves the rows of all the documents together.
+
+        If saving the rows together fails, the rows of each document are saved
+        separately so that errors are handled per document.
+        """
+        rows_by_doc = []
+        for doc in docs:
+            try:
+                indicator_rows = self.get_all_values(doc)
+            except Exception as e:
+                self.handle_exception(doc, e)
+            else:
+                if indicator_rows:
+                    rows_by_doc.append((doc, indicator_rows))
+
+        try:
+            self.save_rows([row for doc, rows in rows_by_doc for row in rows])
+        except Exception:
+            for doc, rows in rows_by_doc:
+                self._best_effort_save_rows(rows, doc)
+
     def _best_effort_save_rows(self, rows, doc):
         """
         Like save rows, but should catch errors and log them
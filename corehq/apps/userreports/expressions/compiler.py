@@ -0,0 +1,497 @@
+"""Compile configured expressions and filters into plain functions
+
+Expressions and filters built by ``ExpressionFactory`` and
+``FilterFactory`` are trees of spec objects that are evaluated by
+calling each other. Every call pays for attribute lookups on the
+JsonObject specs and for resolving things like datatype transforms that
+do not change between documents.
+
+``ExpressionCompiler`` turns those trees into nested closures with all
+of that resolved up front. Expression types that the compiler does not
+know about are left as they are, so compiled and uncompiled expressions
+can be mixed freely.
+
+All expressions and filters of a data source are compiled with one
+compiler so that identical subexpressions are shared. Subexpressions
+that appear more than once and are not trivial to evaluate are only
+evaluated once per item in each iteration (the same way named
+expressions are cached).
+"""
+import json
+from collections import Counter
+from copy import copy
+
+from corehq.apps.userreports.exceptions import BadSpecError
+from corehq.apps.userreports.expressions.getters import (
+    TransformedGetter,
+    transform_for_datatype,
+)
+from corehq.apps.userreports.expressions.specs import (
+    ArrayIndexExpressionSpec,
+    CoalesceExpressionSpec,
+    ConditionalExpressionSpec,
+    ConstantGetterSpec,
+    DictExpressionSpec,
+    IdentityExpressionSpec,
+    IterationNumberExpressionSpec,
+    IteratorExpressionSpec,
+    NamedExpressionSpec,
+    NestedExpressionSpec,
+    PropertyNameGetterSpec,
+    PropertyPathGetterSpec,
+    RootDocExpressionSpec,
+    SwitchExpressionSpec,
+)
+from corehq.apps.userreports.filters import (
+    ANDFilter,
+    NamedFilter,
+    NOTFilter,
+    ORFilter,
+    SinglePropertyValueFilter,
+)
+from corehq.apps.userreports.indicators import (
+    BooleanIndicator,
+    CompoundIndicator,
+    RawIndicator,
+)
+
+
+class ExpressionCompiler(object):
+    """Compile expressions and filters, sharing identical subexpressions
+
+    All expressions and filters must be added with `add()` before any of
+    them are compiled with `compile()`, so that repeated subexpressions
+    can be found.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._compiled = {}
+        self._compiling = set()
+
+    def add(self, expression):
+        """Add an expression or filter to be compiled"""
+        key = _get_key(expression)
+        self._counts[key] += 1
+        if self._counts[key] == 1:
+            for child in _get_children(expression):
+                self.add(child)
+
+    def compile(self, expression):
+        """Get a function equivalent to the given expression or filter
+
+        :returns: A function with the signature
+        ``(item, evaluation_context=None)``.
+        """
+        key = _get_key(expression)
+        if key in self._compiled:
+            return self._compiled[key]
+        if key in self._compiling:
+            # circular named expressions fail when they are evaluated
+            return expression
+        self._compiling.add(key)
+        builder = _BUILDERS.get(type(expression))
+        if builder is None:
+            compiled = expression
+        else:
+            compiled = builder(self, expression)
+            if self._counts[key] > 1 and not _is_trivial(expression):
+                compiled = _memoize(compiled)
+        self._compiling.discard(key)
+        self._compiled[key] = compiled
+        return compiled
+
+    def add_indicator(self, indicator):
+        """Add the expressions and filters of an indicator to be compiled"""
+        for expression in _get_indicator_expressions(indicator):
+            self.add(expression)
+
+    def compile_indicator(self, indicator):
+        """Get a copy of the indicator that uses compiled expressions
+
+        Indicators without compilable expressions are returned unchanged.
+        """
+        if isinstance(indicator, CompoundIndicator):
+            compiled = copy(indicator)
+            compiled.indicators = [self.compile_indicator(ind) for ind in indicator.indicators]
+        elif isinstance(indicator, RawIndicator):
+            compiled = copy(indicator)
+            compiled.getter = self.compile(indicator.getter)
+        elif isinstance(indicator, BooleanIndicator):
+            compiled = copy(indicator)
+            compiled.filter = self.compile(indicator.filter)
+        else:
+            compiled = indicator
+        return compiled
+
+
+def _get_indicator_expressions(indicator):
+    if isinstance(indicator, CompoundIndicator):
+        return [e for ind in indicator.indicators for e in _get_indicator_expressions(ind)]
+    if isinstance(indicator, RawIndicator):
+        return [indicator.getter]
+    if isinstance(indicator, BooleanIndicator):
+        return [indicator.filter]
+    return []
+
+
+def _get_key(expression):
+    if hasattr(expression, 'to_json'):
+        return ('spec', json.dumps(expression.to_json(), sort_keys=True, default=str))
+    if isinstance(expression, SinglePropertyValueFilter):
+        return (
+            'value_filter',
+            _get_key(expression.expression),
+            id(expression.operator),
+            _get_key(expression.reference_expression),
+        )
+    if isinstance(expression, (ANDFilter, ORFilter)):
+        return (type(expression).__name__, tuple(_get_key(f) for f in expression.filters))
+    if isinstance(expression, NOTFilter):
+        return ('not', _get_key(expression._filter))
+    if isinstance(expression, NamedFilter):
+        return ('named_filter', expression.filter_name)
+    if isinstance(expression, TransformedGetter):
+        return ('transformed', _get_key(expression.getter), id(expression.transform))
+    return ('object', id(expression))
+
+
+def _get_children(expression):
+    if isinstance(expression, PropertyNameGetterSpec):
+        return [expression._property_name_expression]
+    if isinstance(expression, NamedExpressionSpec):
+        return [_get_named_expression(expression)]
+    if isinstance(expression, ConditionalExpressionSpec):
+        return [expression._test_function, expression._true_expression, expression._false_expression]
+    if isinstance(expression, SwitchExpressionSpec):
+        return [expression._switch_on_expression, expression._default_expression] + [
+            expression._case_expressions[case] for case in expression.cases
+        ]
+    if isinstance(expression, ArrayIndexExpressionSpec):
+        return [expression._array_expression, expression._index_expression]
+    if isinstance(expression, NestedExpressionSpec):
+        return [expression._argument_expression, expression._value_expression]
+    if isinstance(expression, CoalesceExpressionSpec):
+        return [expression._expression, expression._default_expression]
+    if isinstance(expression, RootDocExpressionSpec):
+        return [expression._expression_fn]
+    if isinstance(expression, DictExpressionSpec):
+        return list(expression._compiled_properties.values())
+    if isinstance(expression, IteratorExpressionSpec):
+        return list(expression._expression_fns) + [expression._test]
+    if isinstance(expression, SinglePropertyValueFilter):
+        return [expression.expression, expression.reference_expression]
+    if isinstance(expression, (ANDFilter, ORFilter)):
+        return list(expression.filters)
+    if isinstance(expression, NOTFilter):
+        return [expression._filter]
+    if isinstance(expression, NamedFilter):
+        return [expression.filter]
+    if isinstance(expression, TransformedGetter):
+        return [expression.getter]
+    return []
+
+
+def _get_named_expression(expression):
+    named_expression = expression._factory_context.get_named_expression(expression.name)
+    # named expressions from the data source are wrapped lazily
+    try:
+        return getattr(named_expression, 'wrapped_expression', named_expression)
+    except BadSpecError:
+        # leave the error to be raised when the expression is evaluated
+        return named_expression
+
+
+def _is_trivial(expression):
+    if isinstance(expression, (
+        ConstantGetterSpec,
+        IdentityExpressionSpec,
+        IterationNumberExpressionSpec,
+        PropertyPathGetterSpec,
+    )):
+        return True
+    if isinstance(expression, PropertyNameGetterSpec):
+        return isinstance(expression._property_name_expression, ConstantGetterSpec)
+    if isinstance(expression, SinglePropertyValueFilter):
+        return _is_trivial(expression.expression) and _is_trivial(expression.reference_expression)
+    return False
+
+
+def _memoize(fn):
+    token = object()
+
+    def memoized(item, evaluation_context=None):
+        if evaluation_context is None:
+            return fn(item, evaluation_context)
+        cache = evaluation_context.iteration_cache
+        key = (token, id(item))
+        cached = cache.get(key)
+        # the item is kept in the cache so its id cannot be reused
+        if cached is not None and cached[0] is item:
+            return cached[1]
+        value = fn(item, evaluation_context)
+        cache[key] = (item, value)
+        return value
+    return memoized
+
+
+def _compile_identity(compiler, expression):
+    def identity(item, evaluation_context=None):
+        return item
+    return identity
+
+
+def _compile_constant(compiler, expression):
+    constant = expression.constant
+
+    def constant_value(item, evaluation_context=None):
+        return constant
+    return constant_value
+
+
+def _compile_iteration_number(compiler, expression):
+    def iteration_number(item, evaluation_context=None):
+        return evaluation_context.iteration
+    return iteration_number
+
+
+def _compile_property_name(compiler, expression):
+    transform = transform_for_datatype(expression.datatype)
+    name_expression = expression._property_name_expression
+    if isinstance(name_expression, ConstantGetterSpec):
+        property_name = name_expression.constant
+
+        def property_value(item, evaluation_context=None):
+            if isinstance(item, dict):
+                return transform(item.get(property_name))
+            return transform(None)
+    else:
+        name_fn = compiler.compile(name_expression)
+
+        def property_value(item, evaluation_context=None):
+            if isinstance(item, dict):
+                return transform(item.get(name_fn(item, evaluation_context)))
+            return transform(None)
+    return property_value
+
+
+def _compile_property_path(compiler, expression):
+    transform = transform_for_datatype(expression.datatype)
+    path = list(expression.property_path)
+    if not path:
+        def property_value(item, evaluation_context=None):
+            return transform(None)
+        return property_value
+
+    def property_value(item, evaluation_context=None):
+        if not isinstance(item, dict):
+            return transform(None)
+        try:
+            for key in path:
+                item = item[key]
+        except (KeyError, TypeError, ValueError):
+            return transform(None)
+        return transform(item)
+    return property_value
+
+
+def _compile_named(compiler, expression):
+    target = compiler.compile(_get_named_expression(expression))
+    key_template = 'named_expression-{}-{{}}'.format(expression.name)
+
+    def named(item, evaluation_context=None):
+        if evaluation_context is None:
+            return target(item, evaluation_context)
+        key = key_template.format(id(item))
+        if evaluation_context.exists_in_cache(key):
+            return evaluation_context.get_cache_value(key)
+        result = target(item, evaluation_context)
+        evaluation_context.set_iteration_cache_value(key, result)
+        return result
+    return named
+
+
+def _compile_conditional(compiler, expression):
+    test = compiler.compile(expression._test_function)
+    if_true = compiler.compile(expression._true_expression)
+    if_false = compiler.compile(expression._false_expression)
+
+    def conditional(item, evaluation_context=None):
+        if test(item, evaluation_context):
+            return if_true(item, evaluation_context)
+        return if_false(item, evaluation_context)
+    return conditional
+
+
+def _compile_switch(compiler, expression):
+    switch_on = compiler.compile(expression._switch_on_expression)
+    default = compiler.compile(expression._default_expression)
+    cases = list(expression.cases)
+    case_fns = {case: compiler.compile(expression._case_expressions[case]) for case in cases}
+    string_cases = all(isinstance(case, str) for case in cases)
+
+    def switch(item, evaluation_context=None):
+        value = switch_on(item, evaluation_context)
+        if string_cases:
+            # only strings are equal to string case values
+            fn = case_fns.get(value, default) if isinstance(value, str) else default
+            return fn(item, evaluation_context)
+        for case in cases:
+            if value == case:
+                return case_fns[case](item, evaluation_context)
+        return default(item, evaluation_context)
+    return switch
+
+
+def _compile_array_index(compiler, expression):
+    array_fn = compiler.compile(expression._array_expression)
+    index_fn = compiler.compile(expression._index_expression)
+
+    def array_index(item, evaluation_context=None):
+        array_value = array_fn(item, evaluation_context)
+        if not isinstance(array_value, list):
+            return None
+        index_value = index_fn(item, evaluation_context)
+        if not isinstance(index_value, int):
+            return None
+        try:
+            return array_value[index_value]
+        except IndexError:
+            return None
+    return array_index
+
+
+def _compile_nested(compiler, expression):
+    argument_fn = compiler.compile(expression._argument_expression)
+    value_fn = compiler.compile(expression._value_expression)
+
+    def nested(item, evaluation_context=None):
+        return value_fn(argument_fn(item, evaluation_context), evaluation_context)
+    return nested
+
+
+def _compile_coalesce(compiler, expression):
+    expression_fn = compiler.compile(expression._expression)
+    default_fn = compiler.compile(expression._default_expression)
+
+    def coalesce(item, evaluation_context=None):
+        value = expression_fn(item, evaluation_context)
+        default_value = default_fn(item, evaluation_context)
+        if value is None or value == '':
+            return default_value
+        return value
+    return coalesce
+
+
+def _compile_root_doc(compiler, expression):
+    expression_fn = compiler.compile(expression._expression_fn)
+
+    def root_doc(item, evaluation_context=None):
+        if evaluation_context is None:
+            return None
+        return expression_fn(evaluation_context.root_doc, evaluation_context)
+    return root_doc
+
+
+def _compile_dict(compiler, expression):
+    property_fns = [
+        (name, compiler.compile(property_expression))
+        for name, property_expression in expression._compiled_properties.items()
+    ]
+
+    def dict_value(item, evaluation_context=None):
+        return {name: fn(item, evaluation_context) for name, fn in property_fns}
+    return dict_value
+
+
+def _compile_iterator(compiler, expression):
+    expression_fns = [compiler.compile(e) for e in expression._expression_fns]
+    test = compiler.compile(expression._test)
+
+    def iterator(item, evaluation_context=None):
+        values = []
+        for fn in expression_fns:
+            value = fn(item, evaluation_context)
+            if test(value):
+                values.append(value)
+        return values
+    return iterator
+
+
+def _compile_value_filter(compiler, filter_):
+    expression_fn = compiler.compile(filter_.expression)
+    reference_fn = compiler.compile(filter_.reference_expression)
+    operator = filter_.operator
+
+    def value_filter(item, evaluation_context=None):
+        return operator(expression_fn(item, evaluation_context), reference_fn(item, evaluation_context))
+    return value_filter
+
+
+def _compile_and(compiler, filter_):
+    filter_fns = [compiler.compile(f) for f in filter_.filters]
+
+    def and_filter(item, evaluation_context=None):
+        for fn in filter_fns:
+            if not fn(item, evaluation_context):
+                return False
+        return True
+    return and_filter
+
+
+def _compile_or(compiler, filter_):
+    filter_fns = [compiler.compile(f) for f in filter_.filters]
+
+    def or_filter(item, evaluation_context=None):
+        for fn in filter_fns:
+            if fn(item, evaluation_context):
+                return True
+        return False
+    return or_filter
+
+
+def _compile_not(compiler, filter_):
+    filter_fn = compiler.compile(filter_._filter)
+
+    def not_filter(item, evaluation_context=None):
+        return not filter_fn(item, evaluation_context)
+    return not_filter
+
+
+def _compile_named_filter(compiler, filter_):
+    return compiler.compile(filter_.filter)
+
+
+def _compile_transformed_getter(compiler, getter):
+    getter_fn = compiler.compile(getter.getter)
+    transform = getter.transform
+    if not transform:
+        return getter_fn
+
+    def transformed(item, evaluation_context=None):
+        return transform(getter_fn(item, evaluation_context))
+    return transformed
+
+
+_BUILDERS = {
+    ANDFilter: _compile_and,
+    ArrayIndexExpressionSpec: _compile_array_index,
+    CoalesceExpressionSpec: _compile_coalesce,
+    ConditionalExpressionSpec: _compile_conditional,
+    ConstantGetterSpec: _compile_constant,
+    DictExpressionSpec: _compile_dict,
+    IdentityExpressionSpec: _compile_identity,
+    IterationNumberExpressionSpec: _compile_iteration_number,
+    IteratorExpressionSpec: _compile_iterator,
+    NamedExpressionSpec: _compile_named,
+    NamedFilter: _compile_named_filter,
+    NestedExpressionSpec: _compile_nested,
+    NOTFilter: _compile_not,
+    ORFilter: _compile_or,
+    PropertyNameGetterSpec: _compile_property_name,
+    PropertyPathGetterSpec: _compile_property_path,
+    RootDocExpressionSpec: _compile_root_doc,
+    SinglePropertyValueFilter: _compile_value_filter,
+    SwitchExpressionSpec: _compile_switch,
+    TransformedGetter: _compile_transformed_getter,
+}
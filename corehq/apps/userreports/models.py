@@ -84,6 +84,7 @@ from corehq.apps.userreports.exceptions import (
     StaticDataSourceConfigurationNotFoundError,
     ValidationError,
 )
+from corehq.apps.userreports.expressions.compiler import ExpressionCompiler
 from corehq.apps.userreports.expressions.factory import ExpressionFactory
 from corehq.apps.userreports.extension_points import (
     static_ucr_data_source_paths,
@@ -374,11 +375,13 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
         if eval_context is None:
             eval_context = EvaluationContext(document)
 
-        filter_fn = self._get_main_filter()
+        compiled = self._get_compiled_expressions()
+        filter_fn = compiled.main_filter if compiled else self._get_main_filter()
         return filter_fn(document, eval_context)
 
     def deleted_filter(self, document):
-        filter_fn = self._get_deleted_filter()
+        compiled = self._get_compiled_expressions()
+        filter_fn = compiled.deleted_filter if compiled else self._get_deleted_filter()
         return filter_fn and filter_fn(document, EvaluationContext(document, 0))
 
     @property
@@ -540,6 +543,31 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
             return ExpressionFactory.from_spec(self.base_item_expression, self.get_factory_context())
         return None
 
+    @memoized
+    def _get_compiled_expressions(self):
+        """Get the filters, base item expression and indicators of this data
+        source compiled together with `ExpressionCompiler`, or None if
+        they should be evaluated as they are.
+        """
+        if not toggles.UCR_COMPILED_EXPRESSIONS.enabled(self.domain):
+            return None
+
+        main_filter = self._get_main_filter()
+        deleted_filter = self._get_deleted_filter()
+        compiler = ExpressionCompiler()
+        for expression in [main_filter, deleted_filter, self.parsed_expression]:
+            if expression is not None:
+                compiler.add(expression)
+        compiler.add_indicator(self.indicators)
+        return _CompiledExpressions(
+            main_filter=compiler.compile(main_filter),
+            deleted_filter=compiler.compile(deleted_filter) if deleted_filter else None,
+            base_item_expression=(
+                compiler.compile(self.parsed_expression) if self.parsed_expression else None
+            ),
+            indicators=compiler.compile_indicator(self.indicators),
+        )
+
     @memoized
     def get_columns(self):
         return self.indicators.get_columns()
@@ -557,7 +585,9 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
             if not self.base_item_expression:
                 return [document]
             else:
-                result = self.parsed_expression(document, eval_context)
+                compiled = self._get_compiled_expressions()
+                expression = compiled.base_item_expression if compiled else self.parsed_expression
+                result = expression(document, eval_context)
                 if result is None:
                     return []
                 elif isinstance(result, list):
@@ -588,9 +618,11 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
                     )
                 return []
 
+        compiled = self._get_compiled_expressions()
+        indicators = compiled.indicators if compiled else self.indicators
         rows = []
         for item in self.get_items(doc, eval_context):
-            values = self.indicators.get_values(item, eval_context)
+            values = indicators.get_values(item, eval_context)
             rows.append(values)
             eval_context.increment_iteration()
 
@@ -1689,6 +1721,9 @@ def _filter_by_server_env(configs):
 
 
 _Validation = namedtuple('_Validation', 'name error_message validation_function')
+_CompiledExpressions = namedtuple(
+    '_CompiledExpressions', 'main_filter deleted_filter base_item_expression indicators'
+)
 
 
 class FilterValueEncoder(DjangoJSONEncoder):
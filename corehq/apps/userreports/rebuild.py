@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from collections import defaultdict
 
@@ -28,10 +29,12 @@ def get_redis_key_for_config(config):
 
 class DataSourceResumeHelper(object):
 
-    def __init__(self, config):
+    def __init__(self, config, range_index=None):
         self.config = config
         self._client = get_redis_client().client.get_client()
         self._key = get_redis_key_for_config(config)
+        if range_index is not None:
+            self._key = '{}:range-{}'.format(self._key, range_index)
 
     def get_completed_iterations(self):
         return [
@@ -51,6 +54,84 @@ class DataSourceResumeHelper(object):
         return self._client.exists(self._key)
 
 
+def get_doc_range_index(doc_id, range_count):
+    """Get the range of a parallel build that a document belongs to"""
+    return int(hashlib.md5(doc_id.encode('utf-8')).hexdigest()[:8], 16) % range_count
+
+
+class DataSourceBuildProgress(object):
+    """Progress of a data source build that is split into ranges of
+    documents that are built in parallel
+
+    Each range keeps its own resume information (see
+    `DataSourceResumeHelper`), so only the ranges that did not complete
+    are built again when a build is resumed.
+    """
+    # keep progress around for a while after the build has finished
+    TIMEOUT = 7 * 24 * 60 * 60
+
+    def __init__(self, config):
+        self.config = config
+        self._client = get_redis_client().client.get_client()
+        key = get_redis_key_for_config(config)
+        self._progress_key = '{}:progress'.format(key)
+        self._completed_key = '{}:completed-ranges'.format(key)
+
+    def start(self, range_count):
+        """Start (or resume) a build
+
+        :returns: List of the indexes of ranges that have not completed.
+        """
+        self._client.hset(self._progress_key, 'range_count', range_count)
+        completed = self._get_completed_ranges()
+        return [index for index in range(range_count) if index not in completed]
+
+    def is_started(self):
+        return self._client.exists(self._progress_key)
+
+    def add_docs_processed(self, count):
+        self._client.hincrby(self._progress_key, 'docs_processed', count)
+
+    def complete_range(self, range_index):
+        """Record that a range has completed
+
+        :returns: True if this completed the build.
+        """
+        pipe = self._client.pipeline()
+        pipe.sadd(self._completed_key, range_index)
+        pipe.scard(self._completed_key)
+        pipe.hget(self._progress_key, 'range_count')
+        added, completed_count, range_count = pipe.execute()
+        return bool(added) and completed_count == int(range_count)
+
+    def finish(self):
+        for range_index in self._get_completed_ranges():
+            DataSourceResumeHelper(self.config, range_index).clear_resume_info()
+        self._client.expire(self._progress_key, self.TIMEOUT)
+        self._client.expire(self._completed_key, self.TIMEOUT)
+
+    def clear(self):
+        range_count = int(self._client.hget(self._progress_key, 'range_count') or 0)
+        for range_index in range(range_count):
+            DataSourceResumeHelper(self.config, range_index).clear_resume_info()
+        self._client.delete(self._progress_key, self._completed_key)
+
+    def get_progress(self):
+        """
+        :returns: dict with the number of ranges of the build, how many
+        of them have completed, and how many documents have been processed.
+        """
+        progress = self._client.hgetall(self._progress_key)
+        return {
+            'range_count': int(progress.get(b'range_count', 0)),
+            'ranges_completed': len(self._get_completed_ranges()),
+            'docs_processed': int(progress.get(b'docs_processed', 0)),
+        }
+
+    def _get_completed_ranges(self):
+        return {int(value) for value in self._client.smembers(self._completed_key)}
+
+
 @attr.s
 class MigrateRebuildTables(object):
     migrate = attr.ib()
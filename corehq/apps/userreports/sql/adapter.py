@@ -6,10 +6,13 @@ from django.utils.translation import gettext as _
 import psycopg2
 import sqlalchemy
 from memoized import memoized
+from psycopg2 import sql
+from psycopg2.extras import execute_values
 from sqlalchemy.exc import ProgrammingError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import Index, PrimaryKeyConstraint
 
+from corehq import toggles
 from corehq.apps.userreports.adapter import IndicatorAdapter
 from corehq.apps.userreports.exceptions import (
     ColumnNotFoundError,
@@ -26,6 +29,8 @@ logger = logging.getLogger(__name__)
 
 engine_metadata = {}
 
+BULK_WRITE_PAGE_SIZE = 1000
+
 
 def get_metadata(engine_id):
     return engine_metadata.setdefault(engine_id, sqlalchemy.MetaData())
@@ -167,23 +172,28 @@ class IndicatorSqlAdapter(IndicatorAdapter):
         ]
         doc_ids = set(row['doc_id'] for row in formatted_rows)
         table = self.get_table()
-        if self.supports_upsert() and use_shard_col:
-            queries = [self._upsert_query(table, formatted_rows)]
+        upsert = self.supports_upsert() and use_shard_col
+        if toggles.UCR_BULK_WRITES.enabled(self.config.domain):
+            with self.session_context() as session:
+                self._bulk_write_rows(session, table, formatted_rows, doc_ids, upsert)
         else:
-            delete = table.delete().where(table.c.doc_id.in_(doc_ids))
-            # Using session.bulk_insert_mappings below might seem more inline
-            #   with sqlalchemy API, but it results in
-            #   appending an empty row which results in a postgres
-            #   not-null constraint error, which has been hard to debug.
-            # In addition, bulk_insert_mappings is less performant than
-            #   the plain INSERT INTO VALUES statement resulting from below line
-            #   because bulk_insert_mappings is meant for multi-table insertion
-            #   so it has overhead of format conversions and multiple statements
-            insert = table.insert().values(formatted_rows)
-            queries = [delete, insert]
-        with self.session_context() as session:
-            for query in queries:
-                session.execute(query)
+            if upsert:
+                queries = [self._upsert_query(table, formatted_rows)]
+            else:
+                delete = table.delete().where(table.c.doc_id.in_(doc_ids))
+                # Using session.bulk_insert_mappings below might seem more inline
+                #   with sqlalchemy API, but it results in
+                #   appending an empty row which results in a postgres
+                #   not-null constraint error, which has been hard to debug.
+                # In addition, bulk_insert_mappings is less performant than
+                #   the plain INSERT INTO VALUES statement resulting from below line
+                #   because bulk_insert_mappings is meant for multi-table insertion
+                #   so it has overhead of format conversions and multiple statements
+                insert = table.insert().values(formatted_rows)
+                queries = [delete, insert]
+            with self.session_context() as session:
+                for query in queries:
+                    session.execute(query)
 
         register_data_source_row_change(
             domain=self.config.domain,
@@ -209,6 +219,48 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             }
         )
 
+    def _bulk_write_rows(self, session, table, rows, doc_ids, upsert):
+        """Write rows with paged multi-row statements
+
+        Rows are sent with psycopg2's ``execute_values`` rather than as
+        one SQLAlchemy statement, which avoids compiling a statement
+        with a parameter per value and stays below the limit on the
+        number of parameters in a statement.
+        """
+        if upsert:
+            # a statement cannot update the same row twice
+            rows = list({row['doc_id']: row for row in rows}.values())
+        column_names = list(rows[0])
+        cursor = session.connection().connection.cursor()
+        try:
+            table_name = _quote(cursor, table.name, table.schema)
+            columns = ', '.join(_quote(cursor, name) for name in column_names)
+            insert = f'INSERT INTO {table_name} ({columns}) VALUES %s'
+            if upsert:
+                pk_names = [col.name for col in table.primary_key]
+                conflict = ', '.join(_quote(cursor, name) for name in pk_names)
+                updates = ', '.join(
+                    '{0} = EXCLUDED.{0}'.format(_quote(cursor, name))
+                    for name in column_names if name not in pk_names
+                )
+                if updates:
+                    insert += f' ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+                else:
+                    insert += f' ON CONFLICT ({conflict}) DO NOTHING'
+            else:
+                cursor.execute(
+                    f'DELETE FROM {table_name} WHERE {_quote(cursor, "doc_id")} = ANY(%s)',
+                    [list(doc_ids)]
+                )
+            execute_values(
+                cursor,
+                insert,
+                [tuple(row.get(name) for name in column_names) for row in rows],
+                page_size=BULK_WRITE_PAGE_SIZE,
+            )
+        finally:
+            cursor.close()
+
     def bulk_save(self, docs):
         rows = []
         for doc in docs:
@@ -327,6 +379,10 @@ class MultiDBSqlAdapter(object):
         for adapter in self.all_adapters:
             adapter.bulk_save(docs)
 
+    def best_effort_bulk_save(self, docs):
+        for adapter in self.all_adapters:
+            adapter.best_effort_bulk_save(docs)
+
     def bulk_delete(self, docs, use_shard_col=True):
         for adapter in self.all_adapters:
             adapter.bulk_delete(docs, use_shard_col)
@@ -368,6 +424,12 @@ class ErrorRaisingMultiDBAdapter(MultiDBSqlAdapter):
     mirror_adapter_cls = ErrorRaisingIndicatorSqlAdapter
 
 
+def _quote(cursor, name, schema=None):
+    # '%' must be escaped because the query is formatted with parameters
+    names = [schema, name] if schema else [name]
+    return sql.Identifier(*names).as_string(cursor).replace('%', '%%')
+
+
 def get_indicator_table(indicator_config, metadata, override_table_name=None):
     sql_columns = [column_to_sql(col) for col in indicator_config.get_columns()]
     table_name = override_table_name or get_table_name(indicator_config.domain, indicator_config.table_id)
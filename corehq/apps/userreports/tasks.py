@@ -22,6 +22,7 @@ from dimagi.utils.logging import notify_exception
 from pillowtop.dao.couch import ID_CHUNK_SIZE
 from soil.util import expose_download, get_download_file_path
 
+from corehq import toggles
 from corehq.apps.celery import periodic_task, task
 from corehq.apps.change_feed.data_sources import (
     get_document_store_for_doc_type,
@@ -42,7 +43,12 @@ from corehq.apps.userreports.models import (
     DataSourceActionLog,
     id_is_static,
 )
-from corehq.apps.userreports.rebuild import DataSourceResumeHelper
+from corehq.apps.userreports.rebuild import (
+    DataSourceBuildProgress,
+    DataSourceResumeHelper,
+    get_doc_range_index,
+    get_redis_key_for_config,
+)
 from corehq.apps.userreports.specs import EvaluationContext
 from corehq.apps.userreports.util import (
     get_async_indicator_modify_lock_key,
@@ -65,11 +71,21 @@ from corehq.util.view_utils import reverse
 
 celery_task_logger = logging.getLogger('celery.task')
 
+BULK_SAVE_CHUNK_SIZE = 1000
+PARALLEL_BUILD_RANGE_COUNT = 8
+
 
 def _build_indicators(config, document_store, relevant_ids):
     adapter = get_indicator_adapter(config, raise_errors=True, load_source='build_indicators')
 
-    for doc in document_store.iter_documents(relevant_ids):
+    docs = document_store.iter_documents(relevant_ids)
+    if not config.asynchronous and toggles.UCR_BULK_WRITES.enabled(config.domain):
+        for docs_chunk in chunked(docs, BULK_SAVE_CHUNK_SIZE, list):
+            # docs that the filter doesn't match have no rows
+            adapter.best_effort_bulk_save(docs_chunk)
+        return
+
+    for doc in docs:
         if config.asynchronous:
             AsyncIndicator.update_record(
                 doc.get('_id'), config.referenced_doc_type, config.domain, [config._id]
@@ -97,7 +113,8 @@ def rebuild_indicators(
 
     success = _('Your UCR table {} has finished rebuilding in {}').format(config.table_id, config.domain)
     failure = _('There was an error rebuilding Your UCR table {} in {}.').format(config.table_id, config.domain)
-    send = limit == -1
+    # parallel builds notify when the last range has been built
+    send = limit == -1 and not _use_parallel_build(config)
     with notify_someone(initiated_by, success_message=success, error_message=failure, send=send):
         adapter = get_indicator_adapter(config)
 
@@ -122,7 +139,7 @@ def rebuild_indicators(
         rows_count_before_rebuild = _get_rows_count_from_existing_table(adapter)
         try:
             adapter.rebuild_table(initiated_by=initiated_by, source=source, skip_log=skip_log, diffs=diffs)
-            _iteratively_build_table(config, limit=limit)
+            _iteratively_build_table(config, limit=limit, initiated_by=initiated_by)
         except Exception:
             _report_ucr_rebuild_metrics(config, source, 'rebuild_datasource', adapter,
                                         rows_count_before_rebuild, error=True)
@@ -138,7 +155,8 @@ def rebuild_indicators_in_place(indicator_config_id, initiated_by=None, source=N
     config = get_ucr_datasource_config_by_id(indicator_config_id)
     success = _('Your UCR table {} has finished rebuilding in {}').format(config.table_id, config.domain)
     failure = _('There was an error rebuilding Your UCR table {} in {}.').format(config.table_id, config.domain)
-    with notify_someone(initiated_by, success_message=success, error_message=failure, send=True):
+    send = not _use_parallel_build(config)
+    with notify_someone(initiated_by, success_message=success, error_message=failure, send=send):
         adapter = get_indicator_adapter(config)
         if not id_is_static(indicator_config_id):
             config.meta.build.initiated_in_place = datetime.utcnow()
@@ -149,7 +167,7 @@ def rebuild_indicators_in_place(indicator_config_id, initiated_by=None, source=N
         rows_count_before_rebuild = _get_rows_count_from_existing_table(adapter)
         try:
             adapter.build_table(initiated_by=initiated_by, source=source)
-            _iteratively_build_table(config, in_place=True)
+            _iteratively_build_table(config, in_place=True, initiated_by=initiated_by)
         except Exception:
             _report_ucr_rebuild_metrics(config, source, 'rebuild_datasource_in_place', adapter,
                                         rows_count_before_rebuild, error=True)
@@ -216,19 +234,36 @@ def resume_building_indicators(indicator_config_id, initiated_by=None):
     config = get_ucr_datasource_config_by_id(indicator_config_id)
     success = _('Your UCR table {} has finished rebuilding in {}').format(config.table_id, config.domain)
     failure = _('There was an error rebuilding Your UCR table {} in {}.').format(config.table_id, config.domain)
-    with notify_someone(initiated_by, success_message=success, error_message=failure, send=True):
+    send = not _use_parallel_build(config)
+    with notify_someone(initiated_by, success_message=success, error_message=failure, send=send):
         resume_helper = DataSourceResumeHelper(config)
         adapter = get_indicator_adapter(config)
         adapter.log_table_build(
             initiated_by=initiated_by,
             source='resume_building_indicators',
         )
-        _iteratively_build_table(config, resume_helper)
+        _iteratively_build_table(config, resume_helper, initiated_by=initiated_by)
 
 
-def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-1):
+def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-1, initiated_by=None):
+    if _use_parallel_build(config, limit):
+        _start_parallel_build(config, in_place, initiated_by, resume=resume_helper is not None)
+        return
+
     resume_helper = resume_helper or DataSourceResumeHelper(config)
-    indicator_config_id = config._id
+    _build_iterations(config, resume_helper, limit=limit)
+    resume_helper.clear_resume_info()
+    _mark_build_finished(config, in_place)
+
+
+def _build_iterations(config, resume_helper, limit=-1, range_index=None, range_count=None, progress=None):
+    """Build the rows for the documents of a data source
+
+    :param range_index: Only build the documents in this range of
+    documents (see `get_doc_range_index`).
+    :param progress: `DataSourceBuildProgress` to add the number of
+    processed documents to.
+    """
     case_type_or_xmlns_list = config.get_case_type_or_xmlns_filter()
     domains = config.data_domains
 
@@ -237,6 +272,11 @@ def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-
     if completed_iterations:
         loop_iterations = list(set(loop_iterations) - set(completed_iterations))
 
+    def build(relevant_ids):
+        _build_indicators(config, document_store, relevant_ids)
+        if progress is not None:
+            progress.add_docs_processed(len(relevant_ids))
+
     for domain, case_type_or_xmlns in loop_iterations:
         relevant_ids = []
         document_store = get_document_store_for_doc_type(
@@ -248,18 +288,21 @@ def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-
         for i, relevant_id in enumerate(document_store.iter_document_ids()):
             if i >= limit > -1:
                 break
+            if range_index is not None and get_doc_range_index(relevant_id, range_count) != range_index:
+                continue
             relevant_ids.append(relevant_id)
             if len(relevant_ids) >= ID_CHUNK_SIZE:
-                _build_indicators(config, document_store, relevant_ids)
+                build(relevant_ids)
                 relevant_ids = []
 
         if relevant_ids:
-            _build_indicators(config, document_store, relevant_ids)
+            build(relevant_ids)
 
         resume_helper.add_completed_iteration(domain, case_type_or_xmlns)
 
-    resume_helper.clear_resume_info()
-    if not id_is_static(indicator_config_id):
+
+def _mark_build_finished(config, in_place):
+    if not id_is_static(config._id):
         if in_place:
             config.meta.build.finished_in_place = True
         else:
@@ -278,6 +321,50 @@ def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-
             current_config.save()
 
 
+def _use_parallel_build(config, limit=-1):
+    return limit == -1 and toggles.UCR_PARALLEL_REBUILD.enabled(config.domain)
+
+
+def _start_parallel_build(config, in_place, initiated_by, resume=False):
+    progress = DataSourceBuildProgress(config)
+    if not resume:
+        progress.clear()
+    build_key = get_redis_key_for_config(config)
+    for range_index in progress.start(PARALLEL_BUILD_RANGE_COUNT):
+        build_indicators_range.delay(
+            config._id, build_key, range_index, PARALLEL_BUILD_RANGE_COUNT, in_place, initiated_by
+        )
+
+
+@task(serializer='pickle', queue=UCR_CELERY_QUEUE, ignore_result=True, acks_late=True)
+def build_indicators_range(indicator_config_id, build_key, range_index, range_count,
+                           in_place=False, initiated_by=None):
+    """Build one range of documents of a parallel data source build
+
+    The range that completes the build marks the data source as built.
+    Ranges that fail can be built again by resuming the build.
+    """
+    config = get_ucr_datasource_config_by_id(indicator_config_id)
+    if get_redis_key_for_config(config) != build_key:
+        # the data source has changed, so this build is out of date
+        return
+
+    success = _('Your UCR table {} has finished rebuilding in {}').format(config.table_id, config.domain)
+    failure = _('There was an error rebuilding Your UCR table {} in {}.').format(config.table_id, config.domain)
+    progress = DataSourceBuildProgress(config)
+    resume_helper = DataSourceResumeHelper(config, range_index)
+    # the task that started the build does not notify of parallel builds,
+    # so each range notifies if it fails
+    with notify_someone(initiated_by, success_message=None, error_message=failure):
+        _build_iterations(
+            config, resume_helper, range_index=range_index, range_count=range_count, progress=progress)
+
+    if progress.complete_range(range_index):
+        with notify_someone(initiated_by, success_message=success, error_message=failure):
+            progress.finish()
+            _mark_build_finished(config, in_place)
+
+
 @task(serializer='pickle', queue=UCR_CELERY_QUEUE, ignore_result=True)
 def delete_data_source_task(domain, config_id):
     from corehq.apps.userreports.views import delete_data_source_shared
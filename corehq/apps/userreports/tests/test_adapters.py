@@ -4,6 +4,7 @@ from unittest.mock import patch
 from corehq.apps.userreports.sql.adapter import IndicatorSqlAdapter
 from corehq.apps.userreports.models import DataSourceConfiguration
 from corehq.apps.userreports.app_manager.helpers import clean_table_name
+from corehq.util.test_utils import flag_enabled
 
 
 class TestIndicatorSqlAdapter(TestCase):
@@ -51,3 +52,27 @@ class TestIndicatorSqlAdapter(TestCase):
 
         adapter.bulk_delete(docs)
         register_data_source_row_change_mock.assert_called()
+
+    @flag_enabled('UCR_BULK_WRITES')
+    @patch("corehq.apps.userreports.sql.adapter.register_data_source_row_change")
+    def test_bulk_write_rows(self, register_data_source_row_change_mock):
+        config = self._create_data_source_config("test-domain3")
+        adapter = IndicatorSqlAdapter(config)
+        adapter.build_table()
+        self.addCleanup(adapter.drop_table)
+
+        docs = [self._get_doc(str(i), 'name{}'.format(i)) for i in range(3)]
+        adapter.save_rows([row for doc in docs for row in adapter.get_all_values(doc)])
+        self.assertEqual(adapter.get_rows_by_doc_id('1')[0]['name'], 'name1')
+
+        updated = self._get_doc('1', 'updated')
+        adapter.save_rows(adapter.get_all_values(updated) * 2)
+        self.assertEqual([row['name'] for row in adapter.get_rows_by_doc_id('1')], ['updated'])
+
+        adapter.save_rows(adapter.get_all_values(self._get_doc('2', 'replaced')), use_shard_col=False)
+        self.assertEqual([row['name'] for row in adapter.get_rows_by_doc_id('2')], ['replaced'])
+        self.assertEqual(adapter.get_query_object().count(), 3)
+
+    @staticmethod
+    def _get_doc(doc_id, name):
+        return {'_id': doc_id, 'doc_type': 'CommCareCase', 'domain': 'test-domain3', 'name': name}
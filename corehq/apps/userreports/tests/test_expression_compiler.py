@@ -0,0 +1,171 @@
+import datetime
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from corehq.apps.userreports.expressions.compiler import ExpressionCompiler
+from corehq.apps.userreports.expressions.factory import ExpressionFactory
+from corehq.apps.userreports.filters.factory import FilterFactory
+from corehq.apps.userreports.specs import EvaluationContext, FactoryContext
+from corehq.apps.userreports.tests.utils import (
+    get_sample_data_source,
+    get_sample_doc_and_indicators,
+)
+from corehq.util.test_utils import (
+    flag_disabled,
+    flag_enabled,
+    generate_cases,
+)
+
+DOC = {
+    'name': 'bob',
+    'age': '32',
+    'child': {'name': 'alice', 'age': 5, 'toys': ['ball', 'kite']},
+    'siblings': ['carol', 'dave'],
+    'status': 'open',
+    'empty': '',
+}
+
+
+def _compile(expression):
+    compiler = ExpressionCompiler()
+    compiler.add(expression)
+    return compiler.compile(expression)
+
+
+class ExpressionCompilerTest(SimpleTestCase):
+
+    def test_identical_expressions_are_shared(self):
+        spec = {'type': 'property_path', 'property_path': ['child', 'name']}
+        first = ExpressionFactory.from_spec(spec)
+        second = ExpressionFactory.from_spec(spec)
+        compiler = ExpressionCompiler()
+        compiler.add(first)
+        compiler.add(second)
+        self.assertIs(compiler.compile(first), compiler.compile(second))
+
+    def test_repeated_expression_is_evaluated_once_per_item(self):
+        spec = {
+            'type': 'conditional',
+            'test': {
+                'type': 'boolean_expression',
+                'expression': {'type': 'property_name', 'property_name': 'status'},
+                'operator': 'eq',
+                'property_value': 'open',
+            },
+            'expression_if_true': {'type': 'property_name', 'property_name': 'name'},
+            'expression_if_false': {'type': 'constant', 'constant': None},
+        }
+        first = ExpressionFactory.from_spec(spec)
+        second = ExpressionFactory.from_spec(spec)
+        compiler = ExpressionCompiler()
+        compiler.add(first)
+        compiler.add(second)
+        test_function = first._test_function
+        with patch.object(test_function, 'operator', wraps=test_function.operator) as operator:
+            compiled = compiler.compile(first)
+            context = EvaluationContext(DOC)
+            self.assertEqual(compiled(DOC, context), 'bob')
+            self.assertEqual(compiler.compile(second)(DOC, context), 'bob')
+        self.assertEqual(operator.call_count, 1)
+
+    def test_uncompiled_expression_is_kept(self):
+        expression = ExpressionFactory.from_spec({'type': 'jsonpath', 'jsonpath': 'child.name'})
+        self.assertIs(_compile(expression), expression)
+
+    def test_named_expression(self):
+        child_name = ExpressionFactory.from_spec({'type': 'property_path', 'property_path': ['child', 'name']})
+        context = FactoryContext({'child_name': child_name}, {})
+        expression = ExpressionFactory.from_spec({'type': 'named', 'name': 'child_name'}, context)
+        evaluation_context = EvaluationContext(DOC)
+        self.assertEqual(_compile(expression)(DOC, evaluation_context), 'alice')
+        self.assertIn('named_expression-child_name-{}'.format(id(DOC)), evaluation_context.iteration_cache)
+
+    @patch('corehq.apps.userreports.specs.datetime')
+    def test_data_source(self, datetime_mock):
+        datetime_mock.utcnow.return_value = datetime.datetime(2015, 4, 24, 12, 30, 8, 24886)
+        sample_doc, _ = get_sample_doc_and_indicators()
+        with flag_disabled('UCR_COMPILED_EXPRESSIONS'):
+            expected = _get_values(get_sample_data_source(), sample_doc)
+
+        config = get_sample_data_source()
+        with flag_enabled('UCR_COMPILED_EXPRESSIONS'):
+            self.assertIsNotNone(config._get_compiled_expressions())
+            self.assertEqual(_get_values(config, sample_doc), expected)
+            self.assertFalse(config.filter(dict(sample_doc, domain='other-domain')))
+
+
+def _get_values(config, doc):
+    return [
+        [(value.column.id, value.value) for value in row]
+        for row in config.get_all_values(doc)
+    ]
+
+
+@generate_cases([
+    ({'type': 'identity'},),
+    ({'type': 'constant', 'constant': 3},),
+    ({'type': 'property_name', 'property_name': 'age', 'datatype': 'integer'},),
+    ({'type': 'property_name', 'property_name': {'type': 'constant', 'constant': 'name'}},),
+    ({'type': 'property_name', 'property_name': 'missing'},),
+    ({'type': 'property_path', 'property_path': ['child', 'age'], 'datatype': 'string'},),
+    ({'type': 'property_path', 'property_path': ['child', 'toys', 'x']},),
+    ({'type': 'property_path', 'property_path': ['name', 'first']},),
+    ({'type': 'array_index', 'array_expression': {'type': 'property_name', 'property_name': 'siblings'},
+      'index_expression': {'type': 'constant', 'constant': 1}},),
+    ({'type': 'array_index', 'array_expression': {'type': 'property_name', 'property_name': 'siblings'},
+      'index_expression': {'type': 'constant', 'constant': 5}},),
+    ({'type': 'switch', 'switch_on': {'type': 'property_name', 'property_name': 'status'},
+      'cases': {'open': {'type': 'constant', 'constant': 1}, 'closed': {'type': 'constant', 'constant': 2}},
+      'default': {'type': 'constant', 'constant': 0}},),
+    ({'type': 'switch', 'switch_on': {'type': 'property_path', 'property_path': ['child', 'age']},
+      'cases': {'5': {'type': 'constant', 'constant': 1}},
+      'default': {'type': 'constant', 'constant': 0}},),
+    ({'type': 'nested', 'argument_expression': {'type': 'property_name', 'property_name': 'child'},
+      'value_expression': {'type': 'property_name', 'property_name': 'name'}},),
+    ({'type': 'coalesce', 'expression': {'type': 'property_name', 'property_name': 'empty'},
+      'default_expression': {'type': 'constant', 'constant': 'default'}},),
+    ({'type': 'root_doc', 'expression': {'type': 'property_name', 'property_name': 'name'}},),
+    ({'type': 'dict', 'properties': {
+        'name': {'type': 'property_name', 'property_name': 'name'},
+        'child': {'type': 'property_path', 'property_path': ['child', 'name']},
+    }},),
+    ({'type': 'iterator', 'expressions': [
+        {'type': 'property_name', 'property_name': 'name'},
+        {'type': 'property_name', 'property_name': 'missing'},
+    ], 'test': {'type': 'not', 'filter': {
+        'type': 'boolean_expression',
+        'expression': {'type': 'identity'},
+        'operator': 'eq',
+        'property_value': None,
+    }}},),
+], ExpressionCompilerTest)
+def test_compiled_expression(self, spec):
+    expression = ExpressionFactory.from_spec(spec)
+    self.assertEqual(_compile(expression)(DOC, EvaluationContext(DOC)), expression(DOC, EvaluationContext(DOC)))
+
+
+@generate_cases([
+    ({'type': 'boolean_expression', 'expression': {'type': 'property_name', 'property_name': 'age'},
+      'operator': 'eq', 'property_value': '32'},),
+    ({'type': 'boolean_expression', 'expression': {'type': 'property_path', 'property_path': ['child', 'age']},
+      'operator': 'gt', 'property_value': 3},),
+    ({'type': 'boolean_expression', 'expression': {'type': 'property_name', 'property_name': 'status'},
+      'operator': 'in', 'property_value': ['closed', 'pending']},),
+    ({'type': 'and', 'filters': [
+        {'type': 'boolean_expression', 'expression': {'type': 'property_name', 'property_name': 'status'},
+         'operator': 'eq', 'property_value': 'open'},
+        {'type': 'not', 'filter': {'type': 'boolean_expression',
+                                   'expression': {'type': 'property_name', 'property_name': 'name'},
+                                   'operator': 'eq', 'property_value': 'bob'}},
+    ]},),
+    ({'type': 'or', 'filters': [
+        {'type': 'boolean_expression', 'expression': {'type': 'property_name', 'property_name': 'status'},
+         'operator': 'eq', 'property_value': 'closed'},
+        {'type': 'boolean_expression', 'expression': {'type': 'property_name', 'property_name': 'name'},
+         'operator': 'eq', 'property_value': 'bob'},
+    ]},),
+], ExpressionCompilerTest)
+def test_compiled_filter(self, spec):
+    filter_ = FilterFactory.from_spec(spec)
+    self.assertEqual(_compile(filter_)(DOC, EvaluationContext(DOC)), filter_(DOC, EvaluationContext(DOC)))
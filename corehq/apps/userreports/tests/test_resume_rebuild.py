@@ -1,6 +1,13 @@
+from unittest.mock import patch
+
 from django.test import SimpleTestCase
 
-from corehq.apps.userreports.rebuild import DataSourceResumeHelper
+from corehq.apps.userreports import tasks
+from corehq.apps.userreports.rebuild import (
+    DataSourceBuildProgress,
+    DataSourceResumeHelper,
+    get_doc_range_index,
+)
 from corehq.apps.userreports.tests.utils import get_sample_data_source
 from corehq.tests.locks import real_redis_client
 
@@ -43,3 +50,82 @@ class DataSourceResumeBuildTest(SimpleTestCase):
     def test_has_resume_info_true(self):
         self._resume_helper.add_completed_iteration("domain1", 'type1')
         self.assertEqual(True, self._resume_helper.has_resume_info())
+
+
+class DataSourceBuildProgressTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._data_source = get_sample_data_source()
+        with real_redis_client():
+            cls._progress = DataSourceBuildProgress(cls._data_source)
+            cls._range_helper = DataSourceResumeHelper(cls._data_source, 1)
+            cls._resume_helper = DataSourceResumeHelper(cls._data_source)
+
+    def setUp(self):
+        super().setUp()
+        self._progress.start(3)
+        self._progress.clear()
+
+    def test_start(self):
+        self.assertEqual(self._progress.start(3), [0, 1, 2])
+        self.assertTrue(self._progress.is_started())
+
+    def test_resume_skips_completed_ranges(self):
+        self._progress.start(3)
+        self.assertFalse(self._progress.complete_range(1))
+        self.assertEqual(self._progress.start(3), [0, 2])
+
+    def test_last_range_completes_build(self):
+        self._progress.start(2)
+        self.assertFalse(self._progress.complete_range(0))
+        self.assertTrue(self._progress.complete_range(1))
+        # completing a range again does not complete the build again
+        self.assertFalse(self._progress.complete_range(1))
+
+    def test_progress(self):
+        self._progress.start(3)
+        self._progress.add_docs_processed(10)
+        self._progress.add_docs_processed(5)
+        self._progress.complete_range(2)
+        self.assertEqual(self._progress.get_progress(), {
+            'range_count': 3,
+            'ranges_completed': 1,
+            'docs_processed': 15,
+        })
+
+    def test_clear_removes_range_resume_info(self):
+        self._progress.start(3)
+        self._range_helper.add_completed_iteration("domain1", 'type1')
+        self._progress.clear()
+        self.assertFalse(self._range_helper.has_resume_info())
+        self.assertFalse(self._progress.is_started())
+
+    def test_range_resume_info_is_separate(self):
+        self._resume_helper.clear_resume_info()
+        self._range_helper.add_completed_iteration("domain1", 'type1')
+        self.assertFalse(self._resume_helper.has_resume_info())
+
+
+class BuildIndicatorsRangeTest(SimpleTestCase):
+
+    def test_failed_range_notifies(self):
+        data_source = get_sample_data_source()
+        with patch.object(tasks, 'get_ucr_datasource_config_by_id', return_value=data_source), \
+                patch.object(tasks, 'get_redis_key_for_config', return_value='build-key'), \
+                patch.object(tasks, 'DataSourceBuildProgress') as progress, \
+                patch.object(tasks, 'DataSourceResumeHelper'), \
+                patch.object(tasks, '_build_iterations', side_effect=ValueError('boom')), \
+                patch('corehq.util.context_managers.soft_assert') as soft_assert, \
+                self.assertRaises(ValueError):
+            tasks.build_indicators_range(data_source._id, 'build-key', 1, 4, initiated_by='user@example.com')
+
+        soft_assert.assert_called_once_with(to='user@example.com', notify_admins=False, send_to_ops=False)
+        progress.return_value.complete_range.assert_not_called()
+
+
+def test_doc_range_index():
+    indexes = {get_doc_range_index(str(i), 4) for i in range(100)}
+    assert indexes == {0, 1, 2, 3}, indexes
+    assert get_doc_range_index('abc', 4) == get_doc_range_index('abc', 4)
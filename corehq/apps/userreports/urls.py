@@ -18,6 +18,7 @@ from corehq.apps.userreports.views import (
     UserConfigReportsHomeView,
     build_data_source_in_place,
     choice_list_api,
+    data_source_build_status,
     data_source_json,
     delete_data_source,
     delete_report,
@@ -53,6 +54,8 @@ urlpatterns = [
     url(r'^data_sources/edit/(?P<config_id>[\w-]+)/$', EditDataSourceView.as_view(),
         name=EditDataSourceView.urlname),
     url(r'^data_sources/source/(?P<config_id>[\w-]+)/$', data_source_json, name='configurable_data_source_json'),
+    url(r'^data_sources/build_status/(?P<config_id>[\w-]+)/$', data_source_build_status,
+        name='configurable_data_source_build_status'),
     url(r'^data_sources/delete/(?P<config_id>[\w-]+)/$', delete_data_source,
         name='delete_configurable_data_source'),
     url(r'^data_sources/undelete/(?P<config_id>[\w-]+)/$', undelete_data_source,
@@ -127,7 +127,10 @@ from corehq.apps.userreports.models import (
     is_data_registry_report,
     report_config_id_is_static,
 )
-from corehq.apps.userreports.rebuild import DataSourceResumeHelper
+from corehq.apps.userreports.rebuild import (
+    DataSourceBuildProgress,
+    DataSourceResumeHelper,
+)
 from corehq.apps.userreports.reports.builder.forms import (
     ConfigureListReportForm,
     ConfigureMapReportForm,
@@ -1440,7 +1443,7 @@ def resume_building_data_source(request, domain, config_id):
                 config.display_name
             )
         )
-    elif not DataSourceResumeHelper(config).has_resume_info():
+    elif not (DataSourceResumeHelper(config).has_resume_info() or DataSourceBuildProgress(config).is_started()):
         messages.warning(
             request,
             _('Table "{}" did not finish building but resume information is not available. '
@@ -1485,6 +1488,17 @@ def build_data_source_in_place(request, domain, config_id):
     ))
 
 
+@login_and_domain_required
+@toggles.USER_CONFIGURABLE_REPORTS.required_decorator()
+def data_source_build_status(request, domain, config_id):
+    config, is_static = get_datasource_config_or_404(config_id, domain)
+    return json_response({
+        'finished': config.meta.build.finished,
+        'finished_in_place': config.meta.build.finished_in_place,
+        'progress': DataSourceBuildProgress(config).get_progress(),
+    })
+
+
 @login_and_domain_required
 @toggles.USER_CONFIGURABLE_REPORTS.required_decorator()
 def data_source_json(request, domain, config_id):
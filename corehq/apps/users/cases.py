@@ -2,6 +2,8 @@ import numbers
 
 from couchdbkit import ResourceNotFound
 
+from dimagi.utils.couch.database import iter_docs
+
 from corehq.apps.groups.models import Group
 from corehq.apps.locations.models import SQLLocation
 from corehq.apps.users.models import CommCareUser, CouchUser, WebUser
@@ -26,18 +28,6 @@ def get_wrapped_owner(owner_id, support_deleted=False):
     if isinstance(owner_id, numbers.Number):
         return None
 
-    def _get_class(doc_type):
-        return {
-            'CommCareUser': CommCareUser,
-            'WebUser': WebUser,
-            'Group': Group,
-        }.get(doc_type)
-
-    def _get_deleted_class(doc_type):
-        return {
-            'Group-Deleted': Group,
-        }.get(doc_type)
-
     try:
         return SQLLocation.objects.get(location_id=owner_id)
     except SQLLocation.DoesNotExist:
@@ -48,9 +38,38 @@ def get_wrapped_owner(owner_id, support_deleted=False):
     except ResourceNotFound:
         pass
     else:
-        cls = _get_class(owner_doc['doc_type'])
-        if support_deleted and cls is None:
-            cls = _get_deleted_class(owner_doc['doc_type'])
-        return cls.wrap(owner_doc) if cls else None
+        return _wrap_owner_doc(owner_doc, support_deleted)
 
     return None
+
+
+def get_wrapped_owners(owner_ids):
+    """
+    Bulk version of get_wrapped_owner
+
+    Returns a dict of the wrapped owners by owner ID. IDs that aren't
+    known owners are omitted.
+    """
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id and not isinstance(owner_id, numbers.Number)}
+    owners = {
+        location.location_id: location
+        for location in SQLLocation.objects.filter(location_id__in=owner_ids)
+    }
+    for owner_doc in iter_docs(user_db(), owner_ids - set(owners)):
+        owner = _wrap_owner_doc(owner_doc)
+        if owner is not None:
+            owners[owner_doc['_id']] = owner
+    return owners
+
+
+def _wrap_owner_doc(owner_doc, support_deleted=False):
+    cls = {
+        'CommCareUser': CommCareUser,
+        'WebUser': WebUser,
+        'Group': Group,
+    }.get(owner_doc['doc_type'])
+    if support_deleted and cls is None:
+        cls = {
+            'Group-Deleted': Group,
+        }.get(owner_doc['doc_type'])
+    return cls.wrap(owner_doc) if cls else None
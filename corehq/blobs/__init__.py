@@ -13,6 +13,9 @@ def get_blob_db():
             db = _get_migrating_db(db, _get_fs_db(settings))
         elif getattr(settings, "BLOB_DB_MIGRATING_FROM_S3_TO_S3", False):
             db = _get_migrating_db(db, _get_s3_db(settings, "OLD_S3_BLOB_DB_SETTINGS"))
+        cache_config = getattr(settings, "BLOB_DB_LOCAL_CACHE", None)
+        if cache_config is not None:
+            db = _get_caching_db(db, cache_config)
         _db.append(db)
     return _db[-1]
 
@@ -37,6 +40,16 @@ def _get_migrating_db(new_db, old_db):
     return MigratingBlobDB(new_db, old_db)
 
 
+def _get_caching_db(db, config):
+    """Wrap blob db with a local disk cache
+
+    :param config: A dict of `CachingBlobDB` arguments. `cache_dir`
+    is required.
+    """
+    from .cachingdb import CachingBlobDB
+    return CachingBlobDB(db, **config)
+
+
 class CODES:
     """Blob type codes.
 
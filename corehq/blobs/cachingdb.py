@@ -0,0 +1,209 @@
+"""Local disk cache for blobs that are read repeatedly
+
+Some blobs (form XML and attachments) are read many times within
+minutes of each other, for example by several pillows and repeaters
+processing the same form. `CachingBlobDB` keeps recently read blobs on
+local disk so they are not fetched from the backend each time.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from hashlib import md5
+from io import BytesIO
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from corehq.blobs import CODES
+from corehq.blobs.interface import AbstractBlobDB
+from corehq.blobs.util import BlobStream, get_many
+
+DEFAULT_MAX_SIZE = 1024 ** 3  # 1 GB
+DEFAULT_MAX_BLOB_SIZE = 1024 ** 2  # 1 MB
+DEFAULT_TIMEOUT = 10 * 60  # seconds
+
+# blobs of these types are never overwritten after they are saved
+DEFAULT_TYPE_CODES = frozenset([
+    CODES.form_xml,
+    CODES.form_attachment,
+    CODES.form_multimedia,
+])
+
+
+class CachingBlobDB(object):
+    """Adaptor that caches recently read blobs of another blob db
+
+    Blobs are cached uncompressed in a size-bounded LRU on local disk,
+    and expire after `timeout` seconds. Blobs larger than
+    `max_blob_size` are not cached. Each process has its own cache
+    directory in `cache_dir`.
+
+    Only blobs with a type code in `type_codes` are cached. These should
+    be types whose blobs are never overwritten, since blobs saved or
+    deleted through this blob db are removed from the cache of the
+    current process only. Other processes may read a stale copy from
+    their cache until it expires.
+
+    Cache hits and misses are reported with `report_timing` as the
+    `cache-hit` and `cache-miss` actions, so the hit rate can be
+    calculated from the counts of those timings.
+    """
+
+    def __init__(
+        self,
+        db,
+        cache_dir,
+        max_size=DEFAULT_MAX_SIZE,
+        max_blob_size=DEFAULT_MAX_BLOB_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        type_codes=DEFAULT_TYPE_CODES,
+    ):
+        self.db = db
+        self.metadb = db.metadb
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_blob_size = max_blob_size
+        self.timeout = timeout
+        self.type_codes = frozenset(type_codes)
+        self._cache = None
+        self._cache_lock = threading.Lock()
+
+    def report_timing(self, action, key):
+        report_timing = getattr(self.db, "report_timing", None)
+        if report_timing is None:
+            return nullcontext()
+        return report_timing(action, key)
+
+    def put(self, content, **blob_meta_args):
+        meta = self.db.put(content, **blob_meta_args)
+        self._get_cache().remove(meta.key)
+        return meta
+
+    def get(self, key=None, type_code=None, meta=None):
+        cache_key = AbstractBlobDB._validate_get_args(key, type_code, meta)
+        if (meta.type_code if meta is not None else type_code) not in self.type_codes:
+            return self.db.get(key=key, type_code=type_code, meta=meta)
+        if meta is not None and meta.is_compressed:
+            compressed_length = meta.compressed_length
+        else:
+            compressed_length = None
+        cache = self._get_cache()
+        fileobj = cache.open(cache_key)
+        if fileobj is not None:
+            with self.report_timing('cache-hit', cache_key):
+                content_length = os.fstat(fileobj.fileno()).st_size
+            return BlobStream(fileobj, self, cache_key, content_length, compressed_length)
+
+        with self.report_timing('cache-miss', cache_key):
+            blob = self.db.get(key=key, type_code=type_code, meta=meta)
+            if blob.content_length is None or blob.content_length > self.max_blob_size:
+                return blob
+            with blob:
+                content = blob.read()
+            cache.put(cache_key, content)
+        return BlobStream(BytesIO(content), self, cache_key, len(content), compressed_length)
+
+    def get_many(self, metas):
+        return get_many(self.get, metas)
+
+    def size(self, *args, **kw):
+        return self.db.size(*args, **kw)
+
+    def exists(self, *args, **kw):
+        return self.db.exists(*args, **kw)
+
+    def delete(self, key):
+        self._get_cache().remove(key)
+        return self.db.delete(key)
+
+    def bulk_delete(self, metas):
+        metas = list(metas)
+        cache = self._get_cache()
+        for meta in metas:
+            cache.remove(meta.key)
+        return self.db.bulk_delete(metas)
+
+    def expire(self, *args, **kw):
+        self.db.expire(*args, **kw)
+
+    def copy_blob(self, content, key):
+        self._get_cache().remove(key)
+        self.db.copy_blob(content, key)
+
+    def _get_cache(self):
+        # the cache is not shared with forked processes
+        pid = os.getpid()
+        with self._cache_lock:
+            if self._cache is None or self._cache.pid != pid:
+                self._cache = _DiskLRU(self.cache_dir, self.max_size, self.timeout)
+            return self._cache
+
+
+class _DiskLRU(object):
+
+    def __init__(self, cache_dir, max_size, timeout):
+        self.pid = os.getpid()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.root = mkdtemp(prefix=f"blobs-{self.pid}-", dir=cache_dir)
+        atexit.register(rmtree, self.root, ignore_errors=True)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (size, expires)
+        self.lock = threading.Lock()
+
+    def open(self, key):
+        """Open the cached blob with the given key
+
+        :returns: A file object or `None` if the blob is not cached.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            try:
+                return open(self._get_path(key), "rb")
+            except FileNotFoundError:
+                self._remove(key)
+                return None
+
+    def put(self, key, content):
+        size = len(content)
+        if size > self.max_size:
+            return
+        path = self._get_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(content)
+        with self.lock:
+            os.replace(tmp_path, path)
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[0]
+            self.entries[key] = (size, time.monotonic() + self.timeout)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[0]
+        try:
+            os.remove(self._get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _get_path(self, key):
+        return join(self.root, md5(key.encode("utf-8")).hexdigest())
@@ -2,6 +2,7 @@ from abc import ABCMeta, abstractmethod
 
 from . import CODES
 from .metadata import MetaDB
+from .util import get_many
 
 NOT_SET = object()
 
@@ -69,6 +70,17 @@ class AbstractBlobDB(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def get_many(self, metas):
+        """Get many blobs concurrently
+
+        :param metas: `BlobMeta` objects of the blobs to get.
+        :returns: A generator of `(meta, fileobj)` pairs, in the order
+        in which blobs are fetched. Blobs that are not found are
+        skipped. Each file object should be closed when finished
+        reading.
+        """
+        return get_many(self.get, metas)
+
     @staticmethod
     def _validate_get_args(key, type_code, meta):
         if key is not None or type_code is not None:
@@ -2,6 +2,7 @@
 """
 
 from corehq.blobs.exceptions import NotFound
+from corehq.blobs.util import get_many
 
 
 class MigratingBlobDB(object):
@@ -25,6 +26,9 @@ class MigratingBlobDB(object):
         except NotFound:
             return self.old_db.get(*args, **kw)
 
+    def get_many(self, metas):
+        return get_many(self.get, metas)
+
     def size(self, *args, **kw):
         try:
             return self.new_db.size(*args, **kw)
@@ -96,7 +96,8 @@ class S3BlobDB(AbstractBlobDB):
         key = self._validate_get_args(key, type_code, meta)
         check_safe_key(key)
         with maybe_not_found(throw=NotFound(key)), self.report_timing('get', key):
-            resp = self._s3_bucket().Object(key).get()
+            # use the client, which (unlike resources) is thread-safe (see get_many)
+            resp = self.db.meta.client.get_object(Bucket=self.s3_bucket_name, Key=key)
         reported_content_length = resp['ContentLength']
 
         body = resp["Body"]
@@ -0,0 +1,97 @@
+from io import BytesIO
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest.mock import patch
+
+from django.test import TestCase
+
+import corehq.blobs.cachingdb as mod
+from corehq.blobs import CODES, NotFound
+from corehq.blobs.tests.util import TemporaryFilesystemBlobDB, new_meta
+
+
+class TestCachingBlobDB(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fsdb = TemporaryFilesystemBlobDB()
+        cls.addClassCleanup(cls.fsdb.close)
+
+    def setUp(self):
+        cache_dir = mkdtemp(prefix="blobcache")
+        self.addCleanup(rmtree, cache_dir, ignore_errors=True)
+        self.db = mod.CachingBlobDB(self.fsdb, cache_dir, max_size=20, max_blob_size=10)
+
+    def put(self, content, **kw):
+        kw.setdefault("type_code", CODES.form_attachment)
+        return self.db.put(BytesIO(content), meta=new_meta(**kw))
+
+    def read(self, meta):
+        with self.db.get(meta=meta) as fh:
+            return fh.read()
+
+    def test_get_cached_blob(self):
+        meta = self.put(b"content")
+        self.assertEqual(self.read(meta), b"content")
+        with patch.object(self.fsdb, "get", blow_up):
+            self.assertEqual(self.read(meta), b"content")
+            with self.db.get(key=meta.key, type_code=meta.type_code) as fh:
+                self.assertEqual(fh.read(), b"content")
+
+    def test_large_blob_is_not_cached(self):
+        meta = self.put(b"large content")
+        self.assertEqual(self.read(meta), b"large content")
+        with patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.read(meta)
+
+    def test_least_recently_used_blob_is_evicted(self):
+        metas = [self.put(b"content%s" % i) for i in range(3)]
+        for meta in metas:
+            self.read(meta)
+        with patch.object(self.fsdb, "get", blow_up):
+            self.assertEqual(self.read(metas[2]), b"content2")
+            self.assertEqual(self.read(metas[1]), b"content1")
+            with self.assertRaises(Boom):
+                self.read(metas[0])
+
+    def test_cached_blob_expires(self):
+        meta = self.put(b"content")
+        self.read(meta)
+        with patch.object(mod.time, "monotonic", lambda: float("inf")), \
+                patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.read(meta)
+
+    def test_blob_with_mutable_type_code_is_not_cached(self):
+        meta = self.put(b"content", type_code=CODES.fixture)
+        self.assertEqual(self.read(meta), b"content")
+        with patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.read(meta)
+
+    def test_put_invalidates_cache(self):
+        meta = self.put(b"content")
+        self.read(meta)
+        new = self.put(b"changed", key=meta.key)
+        self.assertEqual(self.read(new), b"changed")
+
+    def test_delete_invalidates_cache(self):
+        meta = self.put(b"content")
+        self.read(meta)
+        self.assertTrue(self.db.delete(key=meta.key))
+        with self.assertRaises(NotFound):
+            self.read(meta)
+
+    def test_bulk_delete_invalidates_cache(self):
+        meta = self.put(b"content")
+        self.read(meta)
+        self.db.bulk_delete(metas=[meta])
+        with patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.read(meta)
+
+
+class Boom(Exception):
+    pass
+
+
+def blow_up(*args, **kw):
+    raise Boom("should not be called")
@@ -74,6 +74,15 @@ class _BlobDBTests(object):
         with self.db.get(meta=new) as fh:
             self.assertEqual(fh.read(), b"content")
 
+    def test_get_many(self):
+        metas = [self.db.put(BytesIO(b"content %s" % i), meta=self.new_meta()) for i in range(3)]
+        missing = self.new_meta()
+        contents = {}
+        for meta, fh in self.db.get_many(metas + [missing]):
+            with fh:
+                contents[meta.key] = fh.read()
+        self.assertEqual(contents, {meta.key: b"content %s" % i for i, meta in enumerate(metas)})
+
     def test_exists(self):
         meta = self.db.put(BytesIO(b"content"), meta=self.new_meta())
         self.assertTrue(self.db.exists(key=meta.key), 'not found')
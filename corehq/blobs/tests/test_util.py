@@ -7,7 +7,7 @@ from io import BytesIO
 from unittest import TestCase
 
 import corehq.blobs.util as mod
-from corehq.blobs.exceptions import GzipStreamError
+from corehq.blobs.exceptions import GzipStreamError, NotFound
 
 
 class TestRandomUrlId(TestCase):
@@ -113,3 +113,35 @@ class TestGzipStream(TestCase):
         zipper.read()
         zipper.close()
         self.assertEqual(zipper.content_length, 1)
+
+
+class TestGetMany(TestCase):
+
+    def test_open_streams_are_bounded_and_closed(self):
+        streams = []
+
+        def get(meta):
+            if meta == 3:
+                raise NotFound(meta)
+            streams.append(BytesIO(b"content %s" % meta))
+            return streams[-1]
+
+        contents = {}
+        for meta, fileobj in mod.get_many(get, range(20), max_workers=2):
+            self.assertLessEqual(sum(not s.closed for s in streams), 3)
+            contents[meta] = fileobj.read()
+
+        self.assertEqual(contents, {i: b"content %s" % i for i in range(20) if i != 3})
+        self.assertTrue(all(s.closed for s in streams))
+
+    def test_unconsumed_streams_are_closed(self):
+        streams = []
+
+        def get(meta):
+            streams.append(BytesIO(b"content"))
+            return streams[-1]
+
+        blobs = mod.get_many(get, range(20), max_workers=2)
+        next(blobs)
+        blobs.close()
+        self.assertTrue(all(s.closed for s in streams))
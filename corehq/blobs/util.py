@@ -1,16 +1,19 @@
 import weakref
 from base64 import urlsafe_b64encode, b64encode
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from gzip import GzipFile
 import hashlib
 import os
 import re
 from io import RawIOBase
+from itertools import islice
 
-from corehq.blobs.exceptions import BadName, GzipStreamError
+from corehq.blobs.exceptions import BadName, GzipStreamError, NotFound
 
 SAFENAME = re.compile("^[a-z0-9_./{}-]+$", re.IGNORECASE)
+GET_MANY_MAX_WORKERS = 8
 
 
 class GzipStream:
@@ -255,3 +258,47 @@ def get_content_size(fileobj, chunks_sent):
         return fileobj.content_length, sum(chunks_sent)
 
     return sum(chunks_sent), None
+
+
+def get_many(get, metas, max_workers=GET_MANY_MAX_WORKERS):
+    """Get many blobs concurrently with a bounded thread pool
+
+    At most `max_workers` blobs are requested ahead of the one being
+    read, so only that many streams are open at once.
+
+    :param get: Blob db `get` method, which must be thread-safe.
+    :param metas: `BlobMeta` objects of the blobs to get.
+    :param max_workers: Maximum number of blobs to get at once.
+    :returns: A generator of `(meta, fileobj)` pairs, in the order in
+    which blobs are fetched. Blobs that are not found are skipped.
+    Each file object is closed when the next pair is requested, so it
+    must be read before then.
+    """
+    def get_blob(meta):
+        try:
+            return meta, get(meta=meta)
+        except NotFound:
+            return meta, None
+
+    metas = iter(metas)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = done = set()
+        try:
+            while True:
+                for meta in islice(metas, max_workers - len(pending)):
+                    pending.add(pool.submit(get_blob, meta))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                while done:
+                    meta, fileobj = done.pop().result()
+                    if fileobj is not None:
+                        with fileobj:
+                            yield meta, fileobj
+        finally:
+            # close blobs that were fetched but not consumed
+            for future in pending | done:
+                if not future.cancel() and future.exception() is None:
+                    fileobj = future.result()[1]
+                    if fileobj is not None:
+                        fileobj.close()
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class PhoneAppConfig(AppConfig):
+    name = 'casexml.apps.phone'
+
+    def ready(self):
+        from corehq.form_processor.models import CommCareCase
+        from corehq.form_processor.signals import sql_case_post_save
+        from casexml.apps.phone.signals import case_reachability_receiver
+
+        sql_case_post_save.connect(case_reachability_receiver, CommCareCase,
+                                   dispatch_uid="phone_case_reachability_receiver")
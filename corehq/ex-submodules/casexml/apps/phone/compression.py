@@ -0,0 +1,157 @@
+"""Gzip compression of restore payloads
+
+Restore payloads are compressed as they are generated. The item count in
+the opening ``<OpenRosaResponse>`` tag is not known until all elements
+have been generated, so the body is compressed into a separate raw
+deflate stream and joined with the (separately compressed) opening and
+closing tags to form a single gzip member when the payload is complete.
+
+Deflate streams can be joined this way because each one except the last
+ends with a sync flush, which aligns the output to a byte boundary
+without marking the final block.
+"""
+import gzip
+import re
+import shutil
+import struct
+import zlib
+
+COMPRESS_LEVEL = 6
+GZIP_HEADER = (
+    b'\x1f\x8b'  # magic number
+    b'\x08'  # compression method: deflate
+    b'\x00'  # flags
+    b'\x00\x00\x00\x00'  # modification time: not set
+    b'\x00'  # extra flags
+    b'\xff'  # operating system: unknown
+)
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+class DeflateWriter(object):
+    """Write a raw deflate stream that can be joined with other streams
+
+    See `write_gzip()`.
+    """
+
+    def __init__(self, fileobj, level=COMPRESS_LEVEL):
+        self.fileobj = fileobj
+        self.crc = 0
+        self.size = 0
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.fileobj.write(self._compressor.compress(data))
+
+    def close(self, final=False):
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        self.fileobj.write(self._compressor.flush(mode))
+
+
+def write_gzip(fileobj, prefix, body, suffix):
+    """Write a gzip member containing ``prefix + body + suffix``
+
+    :param prefix: Bytes to be written before the body.
+    :param body: Closed (non-final) `DeflateWriter`. Its file object
+    must be positioned at the start of the compressed body.
+    :param suffix: Bytes to be written after the body.
+    """
+    fileobj.write(GZIP_HEADER)
+    head = DeflateWriter(fileobj)
+    head.write(prefix)
+    head.close()
+    shutil.copyfileobj(body.fileobj, fileobj)
+    tail = DeflateWriter(fileobj)
+    tail.write(suffix)
+    tail.close(final=True)
+    crc = zlib.crc32(suffix, crc32_combine(head.crc, body.crc, body.size))
+    size = head.size + body.size + tail.size
+    fileobj.write(struct.pack('<II', crc, size & 0xffffffff))
+
+
+def get_uncompressed_size(fileobj):
+    """Get the uncompressed size of seekable gzip content
+
+    Reads the size from the gzip trailer, which is only accurate for
+    single-member content smaller than 4GB (like restore payloads).
+    The file position is reset to the start of the file.
+    """
+    fileobj.seek(-4, 2)
+    size, = struct.unpack('<I', fileobj.read(4))
+    fileobj.seek(0)
+    return size
+
+
+def decompressed(fileobj):
+    """Get a file-like object that reads decompressed gzip content
+
+    Closing the returned object also closes `fileobj`.
+    """
+    return _GzipReader(fileobj)
+
+
+class _GzipReader(gzip.GzipFile):
+
+    def __init__(self, fileobj):
+        super().__init__(fileobj=fileobj, mode='rb')
+        self._source = fileobj
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._source.close()
+
+
+def crc32_combine(crc1, crc2, len2):
+    """Get the CRC-32 of two concatenated sequences of bytes
+
+    Port of ``crc32_combine`` from zlib, which is not exposed by Python.
+
+    :param crc1: CRC-32 of the first sequence.
+    :param crc2: CRC-32 of the second sequence.
+    :param len2: Length of the second sequence.
+    """
+    if len2 <= 0:
+        return crc1
+    # operator for one zero bit
+    odd = [0xedb88320] + [1 << n for n in range(31)]
+    even = _gf2_matrix_square(odd)  # two zero bits
+    odd = _gf2_matrix_square(even)  # four zero bits
+    # apply len2 zeros to crc1 (the first square puts the operator
+    # for one zero byte, eight zero bits, in even)
+    while True:
+        even = _gf2_matrix_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_matrix_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_matrix_square(even)
+        if len2 & 1:
+            crc1 = _gf2_matrix_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+def _gf2_matrix_times(mat, vec):
+    total = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            total ^= mat[i]
+        vec >>= 1
+        i += 1
+    return total
+
+
+def _gf2_matrix_square(mat):
+    return [_gf2_matrix_times(mat, row) for row in mat]
@@ -0,0 +1,153 @@
+"""Case block index for incremental restores
+
+The case block index holds the serialized case and ledger blocks sent
+to a user in previous restores, keyed by case id along with the
+``server_modified_on`` date of the case at the time it was serialized.
+Restores using the index only load and serialize the cases that have
+been modified (or were not in the index); blocks for all other cases
+are copied into the new payload as they are.
+
+The index is saved as a blob and referenced from redis, similarly to
+cached restore payloads. It is discarded and rebuilt from scratch when
+the user's owner ids or the restore version change, and it is
+invalidated along with cached payloads by ``invalidate_restore_cache``.
+Form submissions do not invalidate it.
+"""
+import gzip
+import json
+from datetime import timezone
+from io import BytesIO
+from uuid import uuid4
+
+from corehq import toggles
+from corehq.blobs import CODES, get_blob_db
+from corehq.blobs.exceptions import NotFound
+
+from casexml.apps.phone.restore_caching import CaseBlockIndexPathCache
+
+ITEMS_COMMENT_TEMPLATE = b'<!--items=%d-->'
+
+
+def should_use_case_block_index(restore_state, total_cases):
+    if not toggles.INCREMENTAL_RESTORE.enabled(restore_state.domain):
+        return False
+    # load test payloads include synthetic copies of each case
+    return not total_cases or restore_state.get_safe_loadtest_factor(total_cases) == 1
+
+
+class CaseBlockIndex(object):
+    """Serialized restore blocks for a user's cases
+
+    Only blocks that include the case ``create`` action are kept, so
+    that they can be reused in initial restores as well as for syncs
+    where the phone does not hold the case yet.
+    """
+
+    def __init__(self, owner_ids, version, blocks=None):
+        self.owner_ids = sorted(owner_ids)
+        self.version = version
+        # case_id -> [server_modified_on, xml]
+        self.blocks = blocks or {}
+
+    @classmethod
+    def for_restore(cls, restore_state, previous_index=None, live_ids=()):
+        """Get a new index for the given restore
+
+        :param previous_index: Index to copy blocks from. Only blocks for
+        cases in ``live_ids`` are copied.
+        """
+        index = cls(restore_state.owner_ids, restore_state.version)
+        if previous_index is not None and previous_index.is_valid_for(restore_state):
+            index.blocks = {
+                case_id: block for case_id, block in previous_index.blocks.items()
+                if case_id in live_ids
+            }
+        return index
+
+    def is_valid_for(self, restore_state):
+        return (
+            self.owner_ids == sorted(restore_state.owner_ids)
+            and self.version == restore_state.version
+        )
+
+    def get_block(self, case_id, modified_on):
+        """Get serialized blocks for the case
+
+        :returns: Case and ledger blocks as bytes prefixed with an item
+        count comment, or `None` if the case is not in the index or was
+        modified since it was indexed.
+        """
+        block = self.blocks.get(case_id)
+        if block is None or block[0] != _format_date(modified_on):
+            return None
+        return block[1].encode('utf-8')
+
+    def set_block(self, case_id, modified_on, items):
+        """Add serialized blocks for a case
+
+        :param items: List of serialized XML elements for the case.
+        :returns: The blocks as bytes prefixed with an item count comment.
+        """
+        block = ITEMS_COMMENT_TEMPLATE % len(items) + b''.join(items)
+        if modified_on is not None:
+            self.blocks[case_id] = [_format_date(modified_on), block.decode('utf-8')]
+        return block
+
+    def to_json(self):
+        return {
+            'owner_ids': self.owner_ids,
+            'version': self.version,
+            'blocks': self.blocks,
+        }
+
+    @classmethod
+    def wrap(cls, data):
+        return cls(data['owner_ids'], data['version'], data['blocks'])
+
+    @classmethod
+    def load(cls, restore_state):
+        """Load the index saved for the restore user
+
+        :returns: `CaseBlockIndex` or `None` if there is no usable index.
+        """
+        name = _get_path_cache(restore_state).get_value()
+        if not name:
+            return None
+        try:
+            with get_blob_db().get(key=name, type_code=CODES.restore) as fileobj:
+                data = json.loads(gzip.decompress(fileobj.read()))
+        except NotFound:
+            return None
+        index = cls.wrap(data)
+        return index if index.is_valid_for(restore_state) else None
+
+    def save(self, restore_state):
+        name = 'restore-case-blocks-{}.json.gz'.format(uuid4().hex)
+        content = gzip.compress(json.dumps(self.to_json()).encode('utf-8'))
+        path_cache = _get_path_cache(restore_state)
+        get_blob_db().put(
+            BytesIO(content),
+            domain=restore_state.domain,
+            parent_id=restore_state.restore_user.user_id,
+            type_code=CODES.restore,
+            key=name,
+            timeout=path_cache.timeout // 60,
+        )
+        path_cache.set_value(name)
+
+
+def _get_path_cache(restore_state):
+    return CaseBlockIndexPathCache(
+        domain=restore_state.domain,
+        user_id=restore_state.restore_user.user_id,
+        sync_log_id='',
+        device_id=None,
+    )
+
+
+def _format_date(value):
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
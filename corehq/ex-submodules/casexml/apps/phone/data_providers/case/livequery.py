@@ -26,6 +26,7 @@ from collections import defaultdict
 from functools import partial, wraps
 from itertools import chain, islice
 
+from casexml.apps.case.const import CASE_ACTION_CREATE
 from casexml.apps.case.const import CASE_INDEX_EXTENSION as EXTENSION
 from casexml.apps.phone.const import ASYNC_RETRY_AFTER
 from casexml.apps.phone.tasks import ASYNC_RESTORE_SENT
@@ -37,7 +38,15 @@ from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.metrics.load_counters import case_load_counter
 from corehq.util.timer import TimingContext
 
+from casexml.apps.phone.xml import tostring
+
+from .block_index import CaseBlockIndex, should_use_case_block_index
 from .load_testing import get_xml_for_response
+from .reachability import (
+    BatchIndexCaseAccessor,
+    get_live_case_ids_for_owners,
+    should_use_reachability_table,
+)
 from .stock import get_stock_payload
 from .utils import get_case_sync_updates
 
@@ -74,7 +83,12 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
                 domain, owner_ids, closed=False)
             debug("owned: %r", owned_ids)
 
-        live_ids, indices = get_live_case_ids_and_indices(domain, owned_ids, timing_context)
+        if should_use_reachability_table(domain):
+            live_ids = get_live_case_ids_for_owners(domain, owner_ids, timing_context)
+            iaccessor = BatchIndexCaseAccessor(domain)
+        else:
+            live_ids, indices = get_live_case_ids_and_indices(domain, owned_ids, timing_context)
+            iaccessor = PrefetchIndexCaseAccessor(domain, indices)
 
         if restore_state.last_sync_log:
             with timing_context("discard_already_synced_cases"):
@@ -90,7 +104,6 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
 
         total_cases = len(sync_ids)
         with timing_context("compile_response(%s cases)" % total_cases):
-            iaccessor = PrefetchIndexCaseAccessor(domain, indices)
             metrics_histogram(
                 'commcare.restore.case_load',
                 len(sync_ids),
@@ -102,14 +115,26 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
                 }
             )
             metrics_counter('commcare.restore.case_load.count', total_cases, {'domain': domain})
-            compile_response(
-                timing_context,
-                restore_state,
-                response,
-                batch_cases(iaccessor, sync_ids),
-                init_progress(async_task, total_cases),
-                total_cases,
-            )
+            if should_use_case_block_index(restore_state, total_cases):
+                compile_response_from_index(
+                    timing_context,
+                    restore_state,
+                    response,
+                    iaccessor,
+                    sync_ids,
+                    live_ids,
+                    init_progress(async_task, total_cases),
+                    total_cases,
+                )
+            else:
+                compile_response(
+                    timing_context,
+                    restore_state,
+                    response,
+                    batch_cases(iaccessor, sync_ids),
+                    init_progress(async_task, total_cases),
+                    total_cases,
+                )
 
 
 def get_case_hierarchy(domain, cases):
@@ -422,4 +447,84 @@ def compile_response(
         update_progress(done)
 
 
+def compile_response_from_index(
+    timing_context,
+    restore_state,
+    response,
+    accessor,
+    sync_ids,
+    live_ids,
+    update_progress,
+    total_cases,
+):
+    """Like `compile_response`, but reuse case and ledger blocks from
+    the user's `CaseBlockIndex` for cases that have not been modified
+    since they were indexed. Only the remaining cases are loaded.
+
+    The index is updated with the newly serialized blocks.
+    """
+    domain = restore_state.domain
+    last_sync_log = restore_state.last_sync_log
+    if last_sync_log and all(last_sync_log.phone_is_holding_case(case_id) for case_id in sync_ids):
+        # the phone has all of these cases, so none of the indexed blocks apply
+        return compile_response(
+            timing_context,
+            restore_state,
+            response,
+            batch_cases(accessor, sync_ids),
+            update_progress,
+            total_cases,
+        )
+
+    with timing_context("load_case_block_index"):
+        index = CaseBlockIndex.load(restore_state)
+        new_index = CaseBlockIndex.for_restore(restore_state, index, live_ids)
+
+    indexed_ids = [case_id for case_id in sync_ids if case_id in new_index.blocks]
+    with timing_context("get_last_modified_dates (%s cases)" % len(indexed_ids)):
+        modified_dates = CommCareCase.objects.get_last_modified_dates(domain, indexed_ids) or {}
+
+    load_ids = []
+    done = 0
+    with timing_context("copy_indexed_blocks"):
+        for case_id in sync_ids:
+            include_create = not last_sync_log or not last_sync_log.phone_is_holding_case(case_id)
+            block = new_index.get_block(case_id, modified_dates.get(case_id)) if include_create else None
+            if block is None:
+                load_ids.append(case_id)
+            else:
+                response.append(block)
+                done += 1
+    update_progress(done)
+    metrics_counter('commcare.restore.case_block_index.reused', done, {'domain': domain})
+    metrics_counter('commcare.restore.case_block_index.loaded', len(load_ids), {'domain': domain})
+
+    for cases in batch_cases(accessor, load_ids):
+        with timing_context("get_stock_payload"):
+            ledger_items = defaultdict(list)
+            for element in get_stock_payload(restore_state.project, restore_state.stock_settings, cases):
+                ledger_items[element.get('entity-id')].append(tostring(element))
+
+        with timing_context("get_case_sync_updates (%s cases)" % len(cases)):
+            updates = get_case_sync_updates(domain, cases, last_sync_log)
+
+        with timing_context("get_xml_for_response (%s updates)" % len(updates)):
+            for update in updates:
+                case_id = update.case.case_id
+                items = ledger_items.pop(case_id, [])
+                items.extend(get_xml_for_response(update, restore_state, total_cases))
+                if CASE_ACTION_CREATE in update.required_updates:
+                    response.append(new_index.set_block(case_id, update.case.server_modified_on, items))
+                else:
+                    response.extend(items)
+            response.extend(item for items in ledger_items.values() for item in items)
+
+        done += len(cases)
+        update_progress(done)
+
+    if load_ids or index is None or len(new_index.blocks) != len(index.blocks):
+        with timing_context("save_case_block_index"):
+            new_index.save(restore_state)
+
+
 RESTORE_CASE_LOAD_BUCKETS = [100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000]
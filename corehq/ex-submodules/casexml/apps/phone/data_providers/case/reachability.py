@@ -0,0 +1,239 @@
+"""Persistent per-owner livequery results
+
+Computing the live cases for a restore walks the case index graph
+outward from the owned cases, which takes one round of index queries
+per level of the graph. With the CASE_REACHABILITY_TABLE toggle enabled
+the result of that walk is saved per owner id in `OwnerCaseReachability`
+so that restores can read the live case ids with a single query.
+
+The live cases of a set of owners are the union of the live cases of
+each owner: liveness spreads from cases that are owned and available
+along index relationships, and availability does not depend on
+ownership.
+
+The saved result for an owner is marked as stale, in a background
+task, when a case owned by that owner is saved, or when a saved case (or
+any case it indexes) was visited while computing it. Stale results are
+recomputed by the next restore that needs them, with one walk of the
+case graph for all of its owners that need it. Since marking results as
+stale may be delayed, results that have not been checked recently are
+checked against the current state of their cases before they are used.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import router, transaction
+from django.db.models import F, Q
+
+from casexml.apps.case.const import CASE_INDEX_EXTENSION
+from casexml.apps.phone.models import OwnerCaseReachability, OwnerReachableCase
+from casexml.apps.phone.tasks import invalidate_case_reachability_task
+
+from corehq import toggles
+from corehq.form_processor.models import CommCareCase, CommCareCaseIndex
+from corehq.util.metrics import metrics_counter
+
+# check results that were not checked for longer than this against the
+# current state of their cases before using them
+REVALIDATE_AGE = timedelta(minutes=5)
+# recompute results older than this even if they were not invalidated,
+# to pick up changes that checking does not see (e.g. a case that was
+# not visited adding an index to one that was)
+MAX_AGE = timedelta(days=1)
+
+
+def should_use_reachability_table(domain):
+    return toggles.CASE_REACHABILITY_TABLE.enabled(domain)
+
+
+def get_live_case_ids_for_owners(domain, owner_ids, timing_context):
+    """Get the live case ids for the given owners
+
+    Results that are missing or stale are recomputed first.
+
+    :returns: set of live case ids
+    """
+    with timing_context("get_stale_owner_ids"):
+        stale_owner_ids = _get_stale_owner_ids(domain, owner_ids)
+    metrics_counter('commcare.restore.case_reachability.stale', len(stale_owner_ids), {'domain': domain})
+
+    if stale_owner_ids:
+        with timing_context("compute_case_reachability"):
+            _compute_reachability(domain, stale_owner_ids, timing_context)
+
+    with timing_context("get_live_case_ids"):
+        return set(OwnerReachableCase.objects.filter(
+            reachability__domain=domain,
+            reachability__owner_id__in=owner_ids,
+            is_live=True,
+        ).values_list('case_id', flat=True))
+
+
+def invalidate_case_reachability(domain, cases):
+    """Mark the results affected by changes to the given cases as stale
+
+    This is done in a background task so that it does not slow down
+    saving cases.
+    """
+    owner_ids = {case.owner_id for case in cases}
+    case_ids = {case.case_id for case in cases}
+    case_ids.update(index.referenced_id for case in cases for index in case.indices if index.referenced_id)
+    invalidate_case_reachability_task.delay(domain, list(owner_ids), list(case_ids))
+
+
+def mark_case_reachability_stale(domain, owner_ids, case_ids):
+    OwnerCaseReachability.objects.filter(
+        Q(owner_id__in=owner_ids) | Q(cases__case_id__in=case_ids),
+        domain=domain,
+    ).update(is_stale=True, version=F('version') + 1)
+
+
+def _get_stale_owner_ids(domain, owner_ids):
+    now = datetime.utcnow()
+    fresh_owner_ids = set()
+    for reachability in OwnerCaseReachability.objects.filter(
+        domain=domain,
+        owner_id__in=owner_ids,
+        is_stale=False,
+        computed_on__gt=now - MAX_AGE,
+        validated_on__isnull=False,
+    ):
+        if reachability.validated_on > now - REVALIDATE_AGE or _revalidate(reachability, now):
+            fresh_owner_ids.add(reachability.owner_id)
+    return [owner_id for owner_id in owner_ids if owner_id not in fresh_owner_ids]
+
+
+def _revalidate(reachability, now):
+    """Check that none of the cases of the result changed since it was
+    last checked, in case marking it as stale was delayed or failed
+
+    :returns: True if the result is still valid.
+    """
+    domain = reachability.domain
+    case_ids = set(reachability.cases.values_list('case_id', flat=True))
+    owned_ids = CommCareCase.objects.get_case_ids_in_domain_by_owners(
+        domain, [reachability.owner_id], closed=False)
+    if not case_ids.issuperset(owned_ids):
+        return False
+    if case_ids:
+        modified_dates = CommCareCase.objects.get_last_modified_dates(domain, list(case_ids))
+        # cases that are missing were deleted
+        if len(modified_dates) < len(case_ids):
+            return False
+        if any(modified_on > reachability.validated_on for modified_on in modified_dates.values()):
+            return False
+    OwnerCaseReachability.objects.filter(pk=reachability.pk, version=reachability.version).update(
+        validated_on=now,
+    )
+    return True
+
+
+def _compute_reachability(domain, owner_ids, timing_context):
+    """Compute and save the results of the given owners
+
+    The case graph is walked once, from the cases owned by all of the
+    owners, and the live cases of each owner are picked out of the
+    result.
+    """
+    from .livequery import get_live_case_ids_and_indices
+
+    started_on = datetime.utcnow()
+    versions = {}
+    owned_ids_by_owner = {}
+    for owner_id in owner_ids:
+        reachability, _ = OwnerCaseReachability.objects.get_or_create(domain=domain, owner_id=owner_id)
+        versions[reachability] = reachability.version
+        owned_ids_by_owner[owner_id] = CommCareCase.objects.get_case_ids_in_domain_by_owners(
+            domain, [owner_id], closed=False)
+
+    all_owned_ids = [case_id for owned_ids in owned_ids_by_owner.values() for case_id in owned_ids]
+    live_ids, indices = get_live_case_ids_and_indices(domain, all_owned_ids, timing_context)
+    spreads_to, related = _get_case_graph(indices)
+
+    for reachability, version in versions.items():
+        owned_ids = owned_ids_by_owner[reachability.owner_id]
+        owner_live_ids = _walk(
+            [case_id for case_id in owned_ids if case_id in live_ids],
+            spreads_to,
+            include=live_ids,
+        )
+        visited_ids = _walk(owned_ids, related) - owner_live_ids
+        _save_reachability(reachability, version, owner_live_ids, visited_ids, started_on)
+
+
+def _get_case_graph(indices):
+    """Get the case graph from the indices collected by livequery
+
+    :returns: Two dicts of case id to related case ids. The first has
+    the cases that liveness spreads to: a live case makes the cases it
+    indexes live, as well as its extensions, which are all open. The
+    second has all cases related by an index in either direction.
+    """
+    spreads_to = defaultdict(set)
+    related = defaultdict(set)
+    for case_indices in indices.values():
+        for index in case_indices:
+            if not index.referenced_id:
+                continue
+            spreads_to[index.case_id].add(index.referenced_id)
+            if index.relationship == CASE_INDEX_EXTENSION:
+                spreads_to[index.referenced_id].add(index.case_id)
+            related[index.case_id].add(index.referenced_id)
+            related[index.referenced_id].add(index.case_id)
+    return spreads_to, related
+
+
+def _walk(case_ids, graph, include=None):
+    """Get the case ids reached from the given ones in the graph
+
+    :param include: If given, only these cases are reached.
+    """
+    reached = set(case_ids)
+    next_ids = list(reached)
+    while next_ids:
+        case_id = next_ids.pop()
+        for related_id in graph.get(case_id, ()):
+            if related_id not in reached and (include is None or related_id in include):
+                reached.add(related_id)
+                next_ids.append(related_id)
+    return reached
+
+
+def _save_reachability(reachability, version, live_ids, visited_ids, computed_on):
+    rows = [
+        OwnerReachableCase(reachability=reachability, case_id=case_id, is_live=True)
+        for case_id in live_ids
+    ] + [
+        OwnerReachableCase(reachability=reachability, case_id=case_id, is_live=False)
+        for case_id in visited_ids
+    ]
+    with transaction.atomic(using=router.db_for_write(OwnerReachableCase)):
+        # concurrent restores for the same owner save their results one at a time
+        OwnerCaseReachability.objects.select_for_update().get(pk=reachability.pk)
+        OwnerReachableCase.objects.filter(reachability=reachability).delete()
+        OwnerReachableCase.objects.bulk_create(rows, batch_size=1000)
+        # only mark fresh if nothing was invalidated while computing
+        OwnerCaseReachability.objects.filter(pk=reachability.pk, version=version).update(
+            is_stale=False,
+            computed_on=computed_on,
+            validated_on=computed_on,
+        )
+
+
+class BatchIndexCaseAccessor:
+    """Case accessor that loads the indices for each batch of cases in
+    one query, for use when indices were not collected by walking the
+    case graph (see `PrefetchIndexCaseAccessor`)
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+
+    def get_cases(self, case_ids, **kw):
+        assert 'prefetched_indices' not in kw
+        case_id_set = set(case_ids)
+        kw['prefetched_indices'] = [
+            index for index in CommCareCaseIndex.objects.get_related_indices(self.domain, case_ids, set())
+            if index.case_id in case_id_set
+        ]
+        return CommCareCase.objects.get_cases(case_ids, self.domain, **kw)
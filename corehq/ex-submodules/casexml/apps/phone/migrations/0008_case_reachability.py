@@ -0,0 +1,44 @@
+# Generated by Django 4.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phone', '0007_delete_ownershipcleanlinessflag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerCaseReachability',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('owner_id', models.CharField(max_length=255)),
+                ('computed_on', models.DateTimeField(null=True)),
+                ('is_stale', models.BooleanField(default=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('domain', 'owner_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OwnerReachableCase',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(db_index=True, max_length=255)),
+                ('is_live', models.BooleanField()),
+                ('reachability', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='cases',
+                    to='phone.ownercasereachability',
+                )),
+            ],
+            options={
+                'unique_together': {('reachability', 'case_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phone', '0008_case_reachability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ownercasereachability',
+            name='validated_on',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
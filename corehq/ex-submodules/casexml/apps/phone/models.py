@@ -462,6 +462,42 @@ class SyncLogSQL(models.Model):
             )
 
 
+class OwnerCaseReachability(models.Model):
+    """Livequery result for a single case owner
+
+    Holds the live case ids for the owner (the cases a user owning only
+    this owner id would sync) along with the ids of all other cases
+    visited while computing them. The live cases for a restore user are
+    the union of the live cases of each of their owner ids.
+
+    Marked as stale when any of the cases changes (see
+    ``casexml.apps.phone.data_providers.case.reachability``) and
+    recomputed by the next restore that needs it.
+    """
+    domain = models.CharField(max_length=255)
+    owner_id = models.CharField(max_length=255)
+    computed_on = models.DateTimeField(null=True)
+    # when the cases were last checked for changes
+    validated_on = models.DateTimeField(null=True)
+    is_stale = models.BooleanField(default=True)
+    # incremented on every invalidation so that results computed
+    # concurrently with an invalidation are not marked fresh
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta(object):
+        unique_together = ('domain', 'owner_id')
+
+
+class OwnerReachableCase(models.Model):
+    reachability = models.ForeignKey(OwnerCaseReachability, on_delete=models.CASCADE, related_name='cases')
+    case_id = models.CharField(max_length=255, db_index=True)
+    # False for cases that were visited but are not live
+    is_live = models.BooleanField()
+
+    class Meta(object):
+        unique_together = ('reachability', 'case_id')
+
+
 class IndexTree(DocumentSchema):
     """
     Document type representing a case dependency tree (which is flattened to a single dict)
@@ -1,6 +1,4 @@
 import logging
-import os
-import shutil
 import tempfile
 import uuid
 from datetime import datetime, timedelta
@@ -12,6 +10,7 @@ from xml.etree import cElementTree as ElementTree
 
 from django.conf import settings
 from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.text import slugify
 
 from celery.exceptions import TimeoutError
@@ -37,6 +36,12 @@ from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.timer import TimingContext
 
 from .checksum import CaseStateHash
+from .compression import (
+    DeflateWriter,
+    decompressed,
+    get_uncompressed_size,
+    write_gzip,
+)
 from .const import (
     ASYNC_RETRY_AFTER,
     INITIAL_ASYNC_TIMEOUT_THRESHOLD,
@@ -84,6 +89,24 @@ def stream_response(payload, headers=None, status=200):
         return HttpResponse(e, status=500)
 
 
+def stream_gzip_response(payload, accept_gzip, headers=None):
+    """Stream gzip-compressed restore content
+
+    :param payload: File-like object with gzip-compressed content.
+    :param accept_gzip: Send compressed content with
+    ``Content-Encoding: gzip`` if true, otherwise decompress it.
+    :param headers: Headers for the response. ``Content-Length`` should
+    be the length of the content that is sent.
+    """
+    if not accept_gzip:
+        payload = decompressed(payload)
+    response = stream_response(payload, headers)
+    if accept_gzip and response.status_code == 200:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
 class StockSettings(object):
 
     def __init__(self, section_to_consumption_types=None, consumption_config=None,
@@ -119,6 +142,7 @@ class RestoreContent(object):
 
     def __enter__(self):
         self.response_body = tempfile.TemporaryFile('w+b')
+        self._body_writer = DeflateWriter(self.response_body)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -129,9 +153,9 @@ class RestoreContent(object):
         if isinstance(xml_element, bytes):
             xml_element, num = get_cached_items_with_count(xml_element)
             self.num_items += num - 1
-            self.response_body.write(xml_element)
+            self._body_writer.write(xml_element)
         else:
-            self.response_body.write(ElementTree.tostring(xml_element, encoding='utf-8'))
+            self._body_writer.write(ElementTree.tostring(xml_element, encoding='utf-8'))
 
     def extend(self, iterable):
         for element in iterable:
@@ -140,18 +164,20 @@ class RestoreContent(object):
     def _write_to_file(self, fileobj):
         # Add 1 to num_items to account for message element
         items = (self.items_template % ('%s' % (self.num_items + 1)).encode('utf-8')) if self.items else b''
-        fileobj.write(self.start_tag_template % {
+        start_tag = self.start_tag_template % {
             b"items": items,
             b"username": self.username.encode("utf8"),
             b"nature": ResponseNature.OTA_RESTORE_SUCCESS.encode("utf8"),
-        })
-
+        }
+        self._body_writer.close()
         self.response_body.seek(0)
-        shutil.copyfileobj(self.response_body, fileobj)
-
-        fileobj.write(self.closing_tag)
+        write_gzip(fileobj, start_tag, self._body_writer, self.closing_tag)
 
     def get_fileobj(self):
+        """Get gzip-compressed response content
+
+        Elements cannot be appended after this is called.
+        """
         fileobj = tempfile.TemporaryFile('w+b')
         try:
             self._write_to_file(fileobj)
@@ -165,10 +191,14 @@ class RestoreContent(object):
 class RestoreResponse(object):
 
     def __init__(self, fileobj):
+        """
+        :param fileobj: File-like object with gzip-compressed content.
+        """
         self.fileobj = fileobj
 
     def as_file(self):
-        return self.fileobj
+        """Get a file-like object with decompressed content"""
+        return decompressed(self.fileobj)
 
     def as_string(self):
         """Get content as utf8-encoded bytes
@@ -177,14 +207,18 @@ class RestoreResponse(object):
         Cannot be called more than once, and `self.as_file()` will
         return a closed file after this is called.
         """
-        with self.fileobj:
-            return self.fileobj.read()
+        with self.as_file() as fileobj:
+            return fileobj.read()
 
-    def get_http_response(self):
-        self.fileobj.seek(0, os.SEEK_END)
-        headers = {'Content-Length': self.fileobj.tell()}
-        self.fileobj.seek(0)
-        return stream_response(self.fileobj, headers)
+    def get_http_response(self, accept_gzip=False):
+        if accept_gzip:
+            self.fileobj.seek(0, 2)
+            length = self.fileobj.tell()
+            self.fileobj.seek(0)
+        else:
+            length = get_uncompressed_size(self.fileobj)
+        headers = {'Content-Length': length}
+        return stream_gzip_response(self.fileobj, accept_gzip, headers)
 
 
 class AsyncRestoreResponse(object):
@@ -211,7 +245,7 @@ class AsyncRestoreResponse(object):
 
         return ElementTree.tostring(root, encoding='utf-8')
 
-    def get_http_response(self):
+    def get_http_response(self, accept_gzip=False):
         headers = {"Retry-After": self.progress['retry_after']}
         response = stream_response(
             BytesIO(self.compile_response()),
@@ -232,16 +266,18 @@ class CachedResponse(object):
             # '_default' is the bucket name from the old blob db API.
             name = "_default/" + name
         self.name = name
+        # payloads were saved uncompressed before names ended with .gz
+        self.is_compressed = bool(name) and name.endswith(".gz")
 
     @classmethod
     def save_for_later(cls, fileobj, timeout, domain, restore_user_id):
         """Save restore response for later
 
-        :param fileobj: A file-like object.
+        :param fileobj: A file-like object with gzip-compressed content.
         :param timeout: Minimum content expiration in seconds.
         :returns: A new `CachedResponse` pointing to the saved content.
         """
-        name = 'restore-{}.xml'.format(uuid4().hex)
+        name = 'restore-{}.xml.gz'.format(uuid4().hex)
         get_blob_db().put(
             NoClose(fileobj),
             domain=domain,
@@ -254,7 +290,7 @@ class CachedResponse(object):
 
     def __bool__(self):
         try:
-            return bool(self.as_file())
+            return bool(self._get_blob())
         except NotFound:
             return False
 
@@ -265,6 +301,13 @@ class CachedResponse(object):
             return fileobj.read()
 
     def as_file(self):
+        """Get a file-like object with decompressed content"""
+        fileobj = self._get_blob()
+        if fileobj is not None and self.is_compressed:
+            return decompressed(fileobj)
+        return fileobj
+
+    def _get_blob(self):
         try:
             value = self._fileobj
         except AttributeError:
@@ -272,10 +315,14 @@ class CachedResponse(object):
             self._fileobj = value
         return value
 
-    def get_http_response(self):
-        file = self.as_file()
-        headers = {'Content-Length': file.content_length}
-        return stream_response(file, headers)
+    def get_http_response(self, accept_gzip=False):
+        file = self._get_blob()
+        if not self.is_compressed:
+            headers = {'Content-Length': file.content_length}
+            return stream_response(file, headers)
+        # the decompressed length is not known without reading the content
+        headers = {'Content-Length': file.content_length} if accept_gzip else None
+        return stream_gzip_response(file, accept_gzip, headers)
 
 
 class RestoreParams(object):
@@ -289,6 +336,7 @@ class RestoreParams(object):
     :param state_hash:          The case state hash string to use to verify the state of the phone
     :param include_item_count:  Set to `True` to include the item count in the response
     :param device_id:           The Device id of the device restoring
+    :param accept_gzip:         Set to `True` if the client accepts gzip-encoded responses
     """
 
     def __init__(self,
@@ -299,7 +347,8 @@ class RestoreParams(object):
             device_id=None,
             app=None,
             openrosa_version=None,
-            fail_hard=False):
+            fail_hard=False,
+            accept_gzip=False):
         self.sync_log_id = sync_log_id
         self.version = version
         self.state_hash = state_hash
@@ -309,6 +358,7 @@ class RestoreParams(object):
         self.openrosa_version = (LooseVersion(openrosa_version)
             if isinstance(openrosa_version, str) else openrosa_version)
         self.fail_hard = fail_hard
+        self.accept_gzip = accept_gzip
 
     @property
     def app_id(self):
@@ -591,7 +641,7 @@ class RestoreConfig(object):
         try:
             with self.timing_context:
                 payload = self.get_payload()
-            response = payload.get_http_response()
+            response = payload.get_http_response(accept_gzip=self.params.accept_gzip)
         except RestoreException as e:
             logger.exception(
                 "%s error during restore submitted by %s: %s" %
@@ -8,7 +8,11 @@ from corehq import privileges
 from corehq.apps.accounting.utils import domain_has_privilege
 from corehq.util.quickcache import quickcache
 
-from .const import ASYNC_RESTORE_CACHE_KEY_PREFIX, RESTORE_CACHE_KEY_PREFIX
+from .const import (
+    ASYNC_RESTORE_CACHE_KEY_PREFIX,
+    CASE_BLOCK_INDEX_CACHE_KEY_PREFIX,
+    RESTORE_CACHE_KEY_PREFIX,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -101,3 +105,8 @@ class RestorePayloadPathCache(_RestoreCache):
 class AsyncRestoreTaskIdCache(_RestoreCache):
     timeout = 24 * 60 * 60
     prefix = ASYNC_RESTORE_CACHE_KEY_PREFIX
+
+
+class CaseBlockIndexPathCache(_RestoreCache):
+    timeout = 24 * 60 * 60
+    prefix = CASE_BLOCK_INDEX_CACHE_KEY_PREFIX
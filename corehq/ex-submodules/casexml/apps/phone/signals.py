@@ -0,0 +1,9 @@
+from casexml.apps.phone.data_providers.case.reachability import (
+    invalidate_case_reachability,
+    should_use_reachability_table,
+)
+
+
+def case_reachability_receiver(sender, case, **kwargs):
+    if should_use_reachability_table(case.domain):
+        invalidate_case_reachability(case.domain, [case])
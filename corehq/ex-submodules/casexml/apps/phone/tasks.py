@@ -68,6 +68,12 @@ def update_celery_state(sender=None, headers=None, **kwargs):
     backend.store_result(headers['id'], None, ASYNC_RESTORE_SENT)
 
 
+@task(queue='background_queue', ignore_result=True)
+def invalidate_case_reachability_task(domain, owner_ids, case_ids):
+    from casexml.apps.phone.data_providers.case.reachability import mark_case_reachability_stale
+    mark_case_reachability_stale(domain, owner_ids, case_ids)
+
+
 @periodic_task(
     run_every=crontab(hour="1", minute="0"),
     queue=getattr(settings, 'CELERY_PERIODIC_QUEUE', 'celery')
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.data_providers.case.block_index import CaseBlockIndex
+from casexml.apps.phone.utils import get_cached_items_with_count
+
+
+class FakeRestoreState(object):
+
+    def __init__(self, owner_ids, version='2.0'):
+        self.owner_ids = set(owner_ids)
+        self.version = version
+
+
+class TestCaseBlockIndex(SimpleTestCase):
+    modified_on = datetime(2020, 1, 2, 3, 4, 5, 678)
+
+    def test_get_block(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        block = index.set_block('case1', self.modified_on, [b'<balance />', b'<case />'])
+        self.assertEqual(block, b'<!--items=2--><balance /><case />')
+        self.assertEqual(index.get_block('case1', self.modified_on), block)
+        self.assertEqual(get_cached_items_with_count(block), (b'<balance /><case />', 2))
+
+    def test_get_block_modified(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        self.assertIsNone(index.get_block('case1', self.modified_on + timedelta(seconds=1)))
+        self.assertIsNone(index.get_block('case2', self.modified_on))
+
+    def test_get_block_timezone_aware_date(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        aware = self.modified_on.replace(tzinfo=timezone.utc)
+        self.assertEqual(index.get_block('case1', aware), b'<!--items=1--><case />')
+
+    def test_wrap(self):
+        index = CaseBlockIndex(['b', 'a'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        wrapped = CaseBlockIndex.wrap(index.to_json())
+        self.assertEqual(wrapped.owner_ids, ['a', 'b'])
+        self.assertEqual(wrapped.get_block('case1', self.modified_on), b'<!--items=1--><case />')
+
+    def test_for_restore_drops_cases_that_are_not_live(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        index.set_block('case2', self.modified_on, [b'<case />'])
+        new_index = CaseBlockIndex.for_restore(FakeRestoreState(['owner']), index, {'case2'})
+        self.assertEqual(list(new_index.blocks), ['case2'])
+
+    def test_for_restore_with_changed_owners(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        new_index = CaseBlockIndex.for_restore(FakeRestoreState(['owner', 'location']), index, {'case1'})
+        self.assertEqual(new_index.blocks, {})
+
+    def test_for_restore_with_changed_version(self):
+        index = CaseBlockIndex(['owner'], '2.0')
+        index.set_block('case1', self.modified_on, [b'<case />'])
+        new_index = CaseBlockIndex.for_restore(FakeRestoreState(['owner'], '1.0'), index, {'case1'})
+        self.assertEqual(new_index.blocks, {})
@@ -0,0 +1,106 @@
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from casexml.apps.case.mock import CaseFactory, CaseIndex, CaseStructure
+from casexml.apps.phone.data_providers.case import livequery
+from casexml.apps.phone.data_providers.case.livequery import get_live_case_ids_and_indices
+from casexml.apps.phone.data_providers.case.reachability import (
+    get_live_case_ids_for_owners,
+    invalidate_case_reachability,
+)
+from casexml.apps.phone.models import OwnerCaseReachability
+
+from corehq.form_processor.models import CommCareCase
+from corehq.form_processor.tests.utils import FormProcessorTestUtils, sharded
+from corehq.util.timer import TimingContext
+
+DOMAIN = 'case-reachability'
+REACHABILITY = 'casexml.apps.phone.data_providers.case.reachability'
+
+
+@sharded
+class TestCaseReachability(TestCase):
+
+    def setUp(self):
+        self.owner_id = uuid.uuid4().hex
+        self.other_owner_id = uuid.uuid4().hex
+        self.factory = CaseFactory(DOMAIN, case_defaults={'owner_id': self.owner_id, 'create': True})
+        self.addCleanup(FormProcessorTestUtils.delete_all_cases_forms_ledgers, DOMAIN)
+
+    def _create_parent_and_child(self):
+        parent = CaseStructure(case_id=uuid.uuid4().hex, attrs={'owner_id': self.other_owner_id})
+        child = CaseStructure(case_id=uuid.uuid4().hex, indices=[CaseIndex(parent)])
+        self.factory.create_or_update_case(child)
+        return parent.case_id, child.case_id
+
+    def _get_live_ids(self, owner_ids):
+        return get_live_case_ids_for_owners(DOMAIN, owner_ids, TimingContext())
+
+    def test_same_as_livequery(self):
+        parent_id, child_id = self._create_parent_and_child()
+        owned_ids = CommCareCase.objects.get_case_ids_in_domain_by_owners(DOMAIN, [self.owner_id], closed=False)
+        expected, _ = get_live_case_ids_and_indices(DOMAIN, owned_ids, TimingContext())
+
+        self.assertEqual(self._get_live_ids([self.owner_id]), expected)
+        self.assertEqual(expected, {parent_id, child_id})
+
+    def test_result_is_saved(self):
+        self._create_parent_and_child()
+        self._get_live_ids([self.owner_id])
+        reachability = OwnerCaseReachability.objects.get(domain=DOMAIN, owner_id=self.owner_id)
+        self.assertFalse(reachability.is_stale)
+
+    def test_invalidated_by_indexed_case(self):
+        parent_id, _ = self._create_parent_and_child()
+        self._get_live_ids([self.owner_id])
+
+        parent = CommCareCase.objects.get_case(parent_id, DOMAIN)
+        invalidate_case_reachability(DOMAIN, [parent])
+        reachability = OwnerCaseReachability.objects.get(domain=DOMAIN, owner_id=self.owner_id)
+        self.assertTrue(reachability.is_stale)
+
+    def test_new_owned_case(self):
+        self._get_live_ids([self.owner_id])
+        case_id = uuid.uuid4().hex
+        self.factory.create_or_update_case(CaseStructure(case_id=case_id))
+        case = CommCareCase.objects.get_case(case_id, DOMAIN)
+        invalidate_case_reachability(DOMAIN, [case])
+
+        self.assertEqual(self._get_live_ids([self.owner_id]), {case_id})
+
+    def test_owners_computed_with_one_walk(self):
+        parent_id, child_id = self._create_parent_and_child()
+        with patch.object(
+            livequery, 'get_live_case_ids_and_indices', wraps=get_live_case_ids_and_indices,
+        ) as walk:
+            self._get_live_ids([self.owner_id, self.other_owner_id])
+
+        walk.assert_called_once()
+        # a child makes its parent live, but not the other way around
+        self.assertEqual(self._get_live_ids([self.owner_id]), {parent_id, child_id})
+        self.assertEqual(self._get_live_ids([self.other_owner_id]), {parent_id})
+
+    def test_old_result_is_revalidated(self):
+        self._get_live_ids([self.owner_id])
+        case_id = uuid.uuid4().hex
+        # the result is not marked as stale
+        with patch(f'{REACHABILITY}.invalidate_case_reachability_task'):
+            self.factory.create_or_update_case(CaseStructure(case_id=case_id))
+        self.assertEqual(self._get_live_ids([self.owner_id]), set())
+
+        with patch(f'{REACHABILITY}.REVALIDATE_AGE', timedelta(0)):
+            self.assertEqual(self._get_live_ids([self.owner_id]), {case_id})
+
+    def test_unchanged_result_is_not_recomputed(self):
+        self._create_parent_and_child()
+        self._get_live_ids([self.owner_id])
+        with patch(f'{REACHABILITY}.REVALIDATE_AGE', timedelta(0)), \
+                patch.object(livequery, 'get_live_case_ids_and_indices') as walk:
+            self._get_live_ids([self.owner_id])
+
+        walk.assert_not_called()
+        reachability = OwnerCaseReachability.objects.get(domain=DOMAIN, owner_id=self.owner_id)
+        self.assertGreater(reachability.validated_on, reachability.computed_on)
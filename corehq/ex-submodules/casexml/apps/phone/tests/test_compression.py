@@ -0,0 +1,50 @@
+import gzip
+import os
+import zlib
+from io import BytesIO
+
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.compression import (
+    DeflateWriter,
+    crc32_combine,
+    decompressed,
+    get_uncompressed_size,
+    write_gzip,
+)
+
+
+class TestCompression(SimpleTestCase):
+
+    def test_crc32_combine(self):
+        first = os.urandom(10)
+        for length in [0, 1, 100, 10000]:
+            second = os.urandom(length)
+            self.assertEqual(
+                crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second)),
+                zlib.crc32(first + second),
+            )
+
+    def test_write_gzip(self):
+        body = DeflateWriter(BytesIO())
+        for i in range(1000):
+            body.write(b'<elem>%d</elem>' % i)
+        body.close()
+        body.fileobj.seek(0)
+        fileobj = BytesIO()
+        write_gzip(fileobj, b'<root>', body, b'</root>')
+
+        expected = b'<root>' + b''.join(b'<elem>%d</elem>' % i for i in range(1000)) + b'</root>'
+        self.assertEqual(gzip.decompress(fileobj.getvalue()), expected)
+        self.assertEqual(get_uncompressed_size(fileobj), len(expected))
+        with decompressed(fileobj) as reader:
+            self.assertEqual(reader.read(), expected)
+        self.assertTrue(fileobj.closed)
+
+    def test_write_gzip_empty_body(self):
+        body = DeflateWriter(BytesIO())
+        body.close()
+        body.fileobj.seek(0)
+        fileobj = BytesIO()
+        write_gzip(fileobj, b'<root>', body, b'</root>')
+        self.assertEqual(gzip.decompress(fileobj.getvalue()), b'<root></root>')
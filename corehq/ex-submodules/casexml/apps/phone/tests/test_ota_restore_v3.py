@@ -1,3 +1,5 @@
+import gzip
+
 from django.test import TestCase
 from django.test.testcases import SimpleTestCase
 from corehq.apps.users.dbaccessors import delete_all_users
@@ -7,7 +9,7 @@ from casexml.apps.case.tests.util import (
     delete_all_sync_logs,
 )
 from casexml.apps.case.mock import CaseBlock
-from casexml.apps.phone.restore import RestoreContent
+from casexml.apps.phone.restore import RestoreContent, RestoreResponse
 from casexml.apps.phone.tests.utils import create_restore_user
 from casexml.apps.phone.utils import MockDevice
 
@@ -63,7 +65,7 @@ class TestRestoreContent(SimpleTestCase):
         with RestoreContent(user, False) as response:
             response.append(body.encode('utf-8'))
             with response.get_fileobj() as fileobj:
-                self.assertEqual(expected, fileobj.read().decode('utf-8'))
+                self.assertEqual(expected, gzip.decompress(fileobj.read()).decode('utf-8'))
 
     def test_items(self):
         user = 'user1'
@@ -72,4 +74,35 @@ class TestRestoreContent(SimpleTestCase):
         with RestoreContent(user, True) as response:
             response.append(body.encode('utf-8'))
             with response.get_fileobj() as fileobj:
-                self.assertEqual(expected, fileobj.read().decode('utf-8'))
+                self.assertEqual(expected, gzip.decompress(fileobj.read()).decode('utf-8'))
+
+    def test_many_items(self):
+        user = 'user1'
+        elements = ['<elem>data%s</elem>' % i for i in range(1000)]
+        expected = self._expected(user, ''.join(elements), items=1001)
+        with RestoreContent(user, True) as response:
+            response.extend(elem.encode('utf-8') for elem in elements)
+            with response.get_fileobj() as fileobj:
+                self.assertEqual(expected, gzip.decompress(fileobj.read()).decode('utf-8'))
+
+
+class TestRestoreResponse(SimpleTestCase):
+
+    def _get_response(self, body):
+        with RestoreContent('user1') as content:
+            content.append(body)
+            return RestoreResponse(content.get_fileobj())
+
+    def test_gzip_response(self):
+        response = self._get_response(b'<elem>data0</elem>').get_http_response(accept_gzip=True)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn(b'<elem>data0</elem>', gzip.decompress(content))
+
+    def test_decompressed_response(self):
+        response = self._get_response(b'<elem>data0</elem>').get_http_response()
+        content = b''.join(response.streaming_content)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn(b'<elem>data0</elem>', content)
@@ -80,7 +80,10 @@ def write_fixture_items_to_io(items):
     io.write(six.text_type(len(items)).encode('utf-8'))
     io.write(b'-->')
     for element in items:
-        io.write(ElementTree.tostring(element, encoding='utf-8'))
+        if isinstance(element, bytes):
+            io.write(element)
+        else:
+            io.write(ElementTree.tostring(element, encoding='utf-8'))
     io.seek(0)
     return io
 
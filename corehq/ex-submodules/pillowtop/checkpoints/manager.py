@@ -141,17 +141,24 @@ class PillowCheckpointEventHandler(ChangeEventHandler):
     def get_new_seq(self, change):
         return change['seq']
 
+    def _get_new_seq_for_context(self, change, context):
+        # pipelined pillows capture the sequence when the change is fetched
+        # since the change feed may have moved past it by the time it is processed
+        if getattr(context, 'checkpoint_sequence', None) is not None:
+            return context.checkpoint_sequence
+        return self.get_new_seq(change)
+
     def update_checkpoint(self, change, context):
         if self.should_update_checkpoint(context):
             context.reset()
-            self.checkpoint.update_to(self.get_new_seq(change))
+            self.checkpoint.update_to(self._get_new_seq_for_context(change, context))
             self.last_update = datetime.utcnow()
             if self.checkpoint_callback:
                 self.checkpoint_callback.checkpoint_updated()
             return True
         elif self.last_log is None or (datetime.utcnow() - self.last_log).total_seconds() > 10:
             self.last_log = datetime.utcnow()
-            pillow_logging.info("Heartbeat: %s", self.get_new_seq(change))
+            pillow_logging.info("Heartbeat: %s", self._get_new_seq_for_context(change, context))
 
         return False
 
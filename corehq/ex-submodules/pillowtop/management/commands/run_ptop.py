@@ -78,6 +78,15 @@ class Command(BaseCommand):
             help="The batch size for this pillow. Some pillows process changes in bulk, "
             "setting this value to 1 will process each change as it comes in.",
         )
+        parser.add_argument(
+            '--pipeline-queue-size',
+            action='store',
+            dest='pipeline_queue_size',
+            default=0,
+            type=int,
+            help="Fetch changes and their documents in the background while the current chunk "
+            "is processed, keeping at most this many chunks queued. Applicable for form/case pillows",
+        )
         parser.add_argument(
             '--dedicated-migration-process',
             action='store_true',
@@ -104,6 +113,7 @@ class Command(BaseCommand):
         processor_chunk_size = options['processor_chunk_size']
         dedicated_migration_process = options['dedicated_migration_process']
         exclude_ucrs = options['exclude_ucrs']
+        pipeline_queue_size = options['pipeline_queue_size']
         assert 0 <= process_number < num_processes
         assert processor_chunk_size
         if list_all:
@@ -131,6 +141,8 @@ class Command(BaseCommand):
             other_options = {}
             if exclude_ucrs:
                 other_options = {'exclude_ucrs': exclude_ucrs.split(",")}
+            if pipeline_queue_size:
+                other_options['pipeline_queue_size'] = pipeline_queue_size
             pillow = get_pillow_by_name(pillow_name, num_processes=num_processes, process_num=process_number,
             processor_chunk_size=processor_chunk_size, dedicated_migration_process=dedicated_migration_process,
             **other_options)
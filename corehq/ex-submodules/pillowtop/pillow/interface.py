@@ -1,3 +1,5 @@
+import queue
+import threading
 import time
 from abc import ABCMeta, abstractproperty, abstractmethod
 from collections import Counter, defaultdict
@@ -15,7 +17,7 @@ from dimagi.utils.logging import notify_exception
 from kafka.common import TopicPartition
 from pillowtop.const import CHECKPOINT_MIN_WAIT
 from pillowtop.dao.exceptions import DocumentMissingError
-from pillowtop.utils import force_seq_int
+from pillowtop.utils import force_seq_int, prefetch_changes_docs
 from pillowtop.exceptions import PillowtopCheckpointReset
 from pillowtop.logger import pillow_logging
 
@@ -38,11 +40,30 @@ class PillowRuntimeContext(object):
 
     def __init__(self, changes_seen=0):
         self.changes_seen = changes_seen
+        # checkpoint sequence captured by the fetch stage of a pipelined pillow,
+        # used instead of reading the (already advanced) change feed offsets
+        self.checkpoint_sequence = None
 
     def reset(self):
         self.changes_seen = 0
 
 
+class _PipelineChunk(object):
+    """
+    A chunk of changes handed from the fetch stage to the write stage of a
+    pipelined pillow, along with the checkpoint sequence the feed was at
+    when the last change of the chunk was read.
+    """
+
+    def __init__(self, changes, checkpoint_sequence):
+        self.changes = changes
+        self.checkpoint_sequence = checkpoint_sequence
+
+
+_PIPELINE_DONE = object()
+_PIPELINE_EMPTY_CHANGE = object()
+
+
 class PillowBase(metaclass=ABCMeta):
     """
     This defines the external pillowtop API. Everything else should be considered a specialization
@@ -53,6 +74,12 @@ class PillowBase(metaclass=ABCMeta):
     retry_errors = True
     # this will be the batch size for processors that support batch processing
     processor_chunk_size = 0
+    # number of fetched chunks that may be queued ahead of the chunk being written.
+    # A non-zero value enables pipelined processing for pillows with batch processors
+    pipeline_queue_size = 0
+    # set to true to load the documents for each chunk in bulk before the
+    # processors run. Pipelined pillows always do this in their fetch stage
+    prefetch_documents = False
 
     @abstractproperty
     def pillow_id(self):
@@ -145,6 +172,9 @@ class PillowBase(metaclass=ABCMeta):
             batch processors. If there are batch processors, checkpoint is updated
             at the end of the batch, otherwise is updated for every change.
         """
+        if self.pipeline_queue_size and self.batch_processors:
+            return self._process_changes_pipelined(since, forever)
+
         context = PillowRuntimeContext(changes_seen=0)
         min_wait_seconds = 30
 
@@ -190,6 +220,141 @@ class PillowBase(metaclass=ABCMeta):
             if context.changes_seen and change:
                 self._update_checkpoint(change, context)
 
+    def _process_changes_pipelined(self, since, forever):
+        """
+        Process changes in two overlapping stages:
+
+            - a fetch stage (background thread) reads changes from the change feed,
+              groups them into chunks and loads their documents
+            - a write stage (this thread) runs the processors on each chunk and
+              updates the checkpoint
+
+            Chunks are passed between the stages through a queue bounded by
+            ``pipeline_queue_size``, and are written (and checkpointed) strictly in
+            the order they were read from the feed.
+        """
+        context = PillowRuntimeContext(changes_seen=0)
+        chunks = queue.Queue(maxsize=self.pipeline_queue_size)
+        stop = threading.Event()
+        fetch_errors = []
+        fetcher = threading.Thread(
+            target=self._fetch_chunks,
+            args=(since, forever, chunks, stop, fetch_errors),
+            name='{}-fetch'.format(self.get_name()),
+            daemon=True,
+        )
+        fetcher.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is _PIPELINE_DONE:
+                    break
+                if item is _PIPELINE_EMPTY_CHANGE:
+                    context.changes_seen += 1
+                    self._update_checkpoint(None, None)
+                    continue
+                context.changes_seen += len(item.changes)
+                metrics_gauge('commcare.change_feed.pipeline.queued_chunks', chunks.qsize(), tags={
+                    'pillow_name': self.get_name(),
+                }, multiprocess_mode=MPM_MAX)
+                self._batch_process_with_error_handling(item.changes)
+                context.checkpoint_sequence = item.checkpoint_sequence
+                try:
+                    self._update_checkpoint(item.changes[-1], context)
+                finally:
+                    context.checkpoint_sequence = None
+        except PillowtopCheckpointReset:
+            # wait for the fetch stage to let go of the change feed before restarting
+            # from the new checkpoint. Changes already fetched are discarded and
+            # re-read from the feed.
+            self._stop_fetching(fetcher, chunks, stop)
+            self.process_changes(since=self.get_last_checkpoint_sequence(), forever=forever)
+            return
+        except BaseException:
+            stop.set()
+            raise
+        fetcher.join()
+        if fetch_errors:
+            raise fetch_errors[0]
+
+    def _stop_fetching(self, fetcher, chunks, stop):
+        stop.set()
+        # unblock the fetch stage if it is waiting for room in the queue
+        while fetcher.is_alive():
+            try:
+                chunks.get(timeout=1)
+            except queue.Empty:
+                pass
+        fetcher.join()
+
+    def _fetch_chunks(self, since, forever, chunks, stop, fetch_errors):
+        """Fetch stage of ``_process_changes_pipelined``"""
+        from django.db import connections
+        min_wait_seconds = 30
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def put_chunk(changes_chunk):
+            self._prefetch_documents(changes_chunk)
+            return put(_PipelineChunk(changes_chunk, self.get_checkpoint_sequence(changes_chunk[-1])))
+
+        changes_chunk = []
+        last_process_time = datetime.utcnow()
+        try:
+            for change in self.get_change_feed().iter_changes(since=since or None, forever=forever):
+                if stop.is_set():
+                    return
+                if not change:
+                    if not put(_PIPELINE_EMPTY_CHANGE):
+                        return
+                    continue
+                changes_chunk.append(change)
+                chunk_full = len(changes_chunk) == self.processor_chunk_size
+                time_elapsed = (datetime.utcnow() - last_process_time).seconds > min_wait_seconds
+                if chunk_full or time_elapsed:
+                    last_process_time = datetime.utcnow()
+                    if not put_chunk(changes_chunk):
+                        return
+                    changes_chunk = []
+            if changes_chunk and not put_chunk(changes_chunk):
+                return
+        except Exception as e:
+            fetch_errors.append(e)
+        finally:
+            put(_PIPELINE_DONE)
+            connections.close_all()
+
+    def _prefetch_documents(self, changes_chunk):
+        """
+        Load the documents for a chunk of changes ahead of processing. Failures are
+        ignored here since processors fetch (and report errors for) any documents
+        that are still missing.
+        """
+        timer = TimingContext()
+        try:
+            with timer:
+                fetched = prefetch_changes_docs(changes_chunk)
+        except Exception as e:
+            pillow_logging.warning("[%s] Error prefetching documents: %s", self.get_name(), e)
+            return
+        tags = {'pillow_name': self.get_name()}
+        metrics_counter('commcare.change_feed.prefetch.docs', fetched, tags=tags)
+        metrics_counter('commcare.change_feed.prefetch.time', timer.duration, tags=tags)
+
+    def get_checkpoint_sequence(self, change):
+        """
+        :return: the sequence to checkpoint to once ``change`` (and all changes
+                 before it) has been processed
+        """
+        return change['seq']
+
     def _batch_process_with_error_handling(self, changes_chunk):
         """
         Process given chunk in batch mode first on batch-processors
@@ -208,6 +373,9 @@ class PillowBase(metaclass=ABCMeta):
             for change in chunk:
                 self.process_with_error_handling(change, processor)
 
+        if self.prefetch_documents and not self.pipeline_queue_size and changes_chunk:
+            self._prefetch_documents(self._deduplicate_changes(changes_chunk))
+
         for processor in self.batch_processors:
             if not changes_chunk:
                 return set(), 0
@@ -440,11 +608,14 @@ class ConstructedPillow(PillowBase):
 
     def __init__(self, name, checkpoint, change_feed, processor, process_num=0,
                  change_processed_event_handler=None, processor_chunk_size=0,
-                 is_dedicated_migration_process=False):
+                 is_dedicated_migration_process=False, pipeline_queue_size=0,
+                 prefetch_documents=False):
         self._name = name
         self._checkpoint = checkpoint
         self._change_feed = change_feed
         self.processor_chunk_size = processor_chunk_size
+        self.pipeline_queue_size = pipeline_queue_size
+        self.prefetch_documents = prefetch_documents
         if isinstance(processor, list):
             self.processors = processor
         else:
@@ -484,6 +655,11 @@ class ConstructedPillow(PillowBase):
             return self._change_processed_event_handler.update_checkpoint(change, context)
         return False
 
+    def get_checkpoint_sequence(self, change):
+        if self._change_processed_event_handler is not None:
+            return self._change_processed_event_handler.get_new_seq(change)
+        return super().get_checkpoint_sequence(change)
+
 
 def handle_pillow_error(pillow, change, exception):
     from pillow_retry.models import PillowError, path_from_object
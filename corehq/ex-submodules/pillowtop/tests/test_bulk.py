@@ -6,7 +6,7 @@ from django.test import SimpleTestCase, TestCase
 from pillowtop.feed.interface import Change, ChangeMeta
 from pillowtop.pillow.interface import PillowBase
 from pillowtop.processors.elastic import BulkElasticProcessor
-from pillowtop.utils import bulk_fetch_changes_docs, get_errors_with_ids
+from pillowtop.utils import bulk_fetch_changes_docs, get_errors_with_ids, prefetch_changes_docs
 
 from corehq.apps.change_feed.data_sources import SOURCE_COUCH
 from corehq.apps.es.cases import case_adapter
@@ -47,6 +47,60 @@ class BulkTest(SimpleTestCase):
         ])
         self.assertEqual([(1, 'e1'), (2, 'e2')], errors)
 
+    def test_prefetch_changes_docs(self):
+        class FakeDocStore(object):
+            def __init__(self):
+                self.queries = []
+
+            def iter_documents(self, ids):
+                self.queries.append(sorted(ids))
+                return [{'_id': doc_id} for doc_id in ids if doc_id != 'missing']
+
+        def _change(doc_id, doc_store, document=None):
+            return Change(doc_id, None, document=document, document_store=doc_store, metadata=ChangeMeta(
+                document_id=doc_id, data_source_type='sql', data_source_name='case-sql'
+            ))
+
+        doc_store = FakeDocStore()
+        changes = [
+            _change('a', doc_store),
+            _change('b', doc_store),
+            _change('a', doc_store),
+            _change('c', doc_store, document={'_id': 'c'}),
+            _change('missing', doc_store),
+        ]
+        self.assertEqual(prefetch_changes_docs(changes), 2)
+        self.assertEqual(doc_store.queries, [['a', 'b', 'missing']])
+        self.assertEqual(
+            [change.document for change in changes],
+            [{'_id': 'a'}, {'_id': 'b'}, {'_id': 'a'}, {'_id': 'c'}, None]
+        )
+        self.assertTrue(changes[-1].should_fetch_document())
+
+    def test_prefetch_changes_docs_by_domain(self):
+        class FakeDocStore(object):
+            def __init__(self, domain):
+                self.domain = domain
+
+            def iter_documents(self, ids):
+                return [{'_id': doc_id, 'domain': self.domain} for doc_id in ids]
+
+        def _change(doc_id, domain):
+            return Change(doc_id, None, document_store=FakeDocStore(domain), metadata=ChangeMeta(
+                document_id=doc_id, data_source_type='sql', data_source_name='case-sql', domain=domain
+            ))
+
+        changes = [_change('a', 'domain1'), _change('b', 'domain2'), _change('c', 'domain1')]
+        self.assertEqual(prefetch_changes_docs(changes), 3)
+        self.assertEqual(
+            [change.document for change in changes],
+            [
+                {'_id': 'a', 'domain': 'domain1'},
+                {'_id': 'b', 'domain': 'domain2'},
+                {'_id': 'c', 'domain': 'domain1'},
+            ]
+        )
+
 
 @sharded
 @es_test(requires=[case_adapter], setup_class=True)
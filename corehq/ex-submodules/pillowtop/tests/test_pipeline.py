@@ -0,0 +1,97 @@
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from pillowtop.feed.interface import Change, ChangeMeta
+from pillowtop.feed.mock import MockChangeFeed
+from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors.interface import BulkPillowProcessor
+
+
+class RecordingBulkProcessor(BulkPillowProcessor):
+
+    def __init__(self):
+        self.chunks = []
+
+    def process_change(self, change):
+        raise AssertionError("should be processed in bulk")
+
+    def process_changes_chunk(self, changes_chunk):
+        self.chunks.append([change.id for change in changes_chunk])
+        return [], []
+
+
+class RecordingEventHandler(object):
+
+    def __init__(self):
+        self.sequences = []
+
+    def get_new_seq(self, change):
+        return change['seq']
+
+    def update_checkpoint(self, change, context):
+        self.sequences.append(context.checkpoint_sequence)
+        return False
+
+
+def _make_change(seq):
+    return Change(
+        id='doc{}'.format(seq),
+        sequence_id=seq,
+        metadata=ChangeMeta(
+            document_id='doc{}'.format(seq),
+            data_source_type='sql',
+            data_source_name='test',
+        ),
+    )
+
+
+class PipelinedPillowTest(SimpleTestCase):
+
+    def _get_pillow(self, changes, processor, event_handler, pipeline_queue_size=2):
+        return ConstructedPillow(
+            name='test-pipelined-pillow',
+            checkpoint=MagicMock(),
+            change_feed=MockChangeFeed(changes),
+            processor=processor,
+            change_processed_event_handler=event_handler,
+            processor_chunk_size=3,
+            pipeline_queue_size=pipeline_queue_size,
+        )
+
+    def test_chunks_processed_in_order(self):
+        processor = RecordingBulkProcessor()
+        event_handler = RecordingEventHandler()
+        pillow = self._get_pillow([_make_change(i) for i in range(8)], processor, event_handler)
+        pillow.process_changes(since=0, forever=False)
+        self.assertEqual(processor.chunks, [
+            ['doc0', 'doc1', 'doc2'],
+            ['doc3', 'doc4', 'doc5'],
+            ['doc6', 'doc7'],
+        ])
+        # checkpoint sequences are captured when each chunk is fetched
+        self.assertEqual(event_handler.sequences, [2, 5, 7])
+
+    def test_same_chunks_as_serial_processing(self):
+        serial_processor = RecordingBulkProcessor()
+        pillow = self._get_pillow(
+            [_make_change(i) for i in range(8)], serial_processor, RecordingEventHandler(), pipeline_queue_size=0
+        )
+        pillow.process_changes(since=0, forever=False)
+
+        pipelined_processor = RecordingBulkProcessor()
+        pillow = self._get_pillow(
+            [_make_change(i) for i in range(8)], pipelined_processor, RecordingEventHandler())
+        pillow.process_changes(since=0, forever=False)
+        self.assertEqual(serial_processor.chunks, pipelined_processor.chunks)
+
+    def test_fetch_error_is_raised(self):
+        class BrokenFeed(MockChangeFeed):
+            def iter_changes(self, since, forever=False):
+                yield _make_change(0)
+                raise ValueError('feed error')
+
+        pillow = self._get_pillow([], RecordingBulkProcessor(), RecordingEventHandler())
+        pillow._change_feed = BrokenFeed([])
+        with self.assertRaisesRegex(ValueError, 'feed error'):
+            pillow.process_changes(since=0, forever=False)
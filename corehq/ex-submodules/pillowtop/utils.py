@@ -354,6 +354,42 @@ def bulk_fetch_changes_docs(changes, domain=None):
     return bad_changes, docs
 
 
+def prefetch_changes_docs(changes):
+    """Load the documents for a chunk of changes in bulk and set them on the changes
+    so that processors don't have to look them up one at a time.
+
+    Changes are grouped by data source and domain, since document stores
+    are scoped to a domain, and each group is fetched from its document
+    store in a single bulk lookup.
+
+    Unlike ``bulk_fetch_changes_docs`` this does no validation of the fetched
+    documents. Changes whose documents can't be found are left untouched so that
+    processors can deal with them as usual.
+
+    :returns: number of documents fetched
+    """
+    changes_by_source = defaultdict(list)
+    for change in changes:
+        if change.metadata is not None and change.should_fetch_document():
+            source = (
+                change.metadata.data_source_type,
+                change.metadata.data_source_name,
+                change.metadata.domain,
+            )
+            changes_by_source[source].append(change)
+
+    fetched = 0
+    for _changes in changes_by_source.values():
+        doc_store = _changes[0].document_store
+        doc_ids = list({change.id for change in _changes})
+        docs_by_id = {doc['_id']: doc for doc in doc_store.iter_documents(doc_ids)}
+        fetched += len(docs_by_id)
+        for change in _changes:
+            if change.id in docs_by_id:
+                change.set_document(docs_by_id[change.id])
+    return fetched
+
+
 def get_errors_with_ids(es_action_errors):
     return [
         (item['_id'], item.get('error'))
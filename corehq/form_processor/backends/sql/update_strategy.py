@@ -386,7 +386,8 @@ class SqlCaseUpdateStrategy(UpdateStrategy):
         form_load_counter("rebuild_case", self.case.domain)(len(form_ids_to_fetch))
         xform_map = {
             form.form_id: form
-            for form in XFormInstance.objects.get_forms_with_attachments_meta(form_ids_to_fetch)
+            for form in XFormInstance.objects.get_forms_with_attachments_meta(
+                form_ids_to_fetch, prefetch_xml=True)
         }
 
         forms_missing_transactions = list(updated_xform_ids - form_ids)
@@ -134,6 +134,20 @@ class AbstractCaseDbCache(metaclass=ABCMeta):
     def clear_changed(self):
         self._changed = set()
 
+    def clear_cache(self):
+        """Discard all cached cases and release the locks acquired in the
+        current context
+
+        Use this if cached cases may have been modified without being
+        saved. Cases are locked again when they are next loaded.
+        """
+        self.cache = {}
+        self._changed = set()
+        for lock in self.locks:
+            if lock is not None:
+                release_lock(lock, True)
+        self.locks = []
+
     def get_cached_forms(self):
         """
         Get any in-memory forms being processed. These are only used by the Couch backend
@@ -1,5 +1,6 @@
 from collections import defaultdict
 
+from dimagi.utils.chunked import chunked
 from pillowtop.dao.exceptions import DocumentNotFoundError
 from pillowtop.dao.interface import DocumentStore
 
@@ -47,11 +48,17 @@ class FormDocumentStore(DocumentStore):
         return iter(XFormInstance.objects.iter_form_ids_by_xmlns(self.domain, self.xmlns))
 
     def iter_documents(self, ids):
-        for wrapped_form in XFormInstance.objects.iter_forms(ids, self.domain):
-            try:
-                yield self._to_json(wrapped_form)
-            except (DocumentNotFoundError, MissingFormXml):
-                pass
+        # fetch attachment metadata and XML along with the forms so that
+        # serializing the forms doesn't need a query and a blob request per form
+        for form_ids in chunked((x for x in ids if x), 100, list):
+            forms = XFormInstance.objects.get_forms_with_attachments_meta(form_ids, prefetch_xml=True)
+            for wrapped_form in forms:
+                if wrapped_form.domain != self.domain:
+                    continue
+                try:
+                    yield self._to_json(wrapped_form)
+                except (DocumentNotFoundError, MissingFormXml):
+                    pass
 
 
 class CaseDocumentStore(DocumentStore):
@@ -57,7 +57,11 @@ class PostSaveError(Exception):
 
 
 class KafkaPublishingError(Exception):
-    pass
+
+    def __init__(self, *args, change_metas=()):
+        super().__init__(*args)
+        # the changes that were not sent, if known
+        self.change_metas = change_metas
 
 
 class XFormLockError(Exception):
@@ -125,7 +125,11 @@ class XFormInstanceManager(RequireDBManager):
         meta = self.get_attachment_by_name(form_id, attachment_name)
         return AttachmentContent(meta.content_type, meta.open(), meta.content_length)
 
-    def get_forms_with_attachments_meta(self, form_ids, ordered=False):
+    def get_forms_with_attachments_meta(self, form_ids, ordered=False, prefetch_xml=False):
+        """Get forms with their attachment metadata
+
+        :param prefetch_xml: Also read the XML of the forms, concurrently.
+        """
         assert isinstance(form_ids, list)
         if not form_ids:
             return []
@@ -137,6 +141,13 @@ class XFormInstanceManager(RequireDBManager):
         )
         forms_by_id = {form.form_id: form for form in forms}
         attach_prefetch_models(forms_by_id, attachments, 'parent_id', 'attachments_list')
+        if prefetch_xml:
+            xml_metas = [meta for meta in attachments if meta.name == "form.xml"]
+            for meta, fileobj in get_blob_db().get_many(xml_metas):
+                with fileobj:
+                    xml = fileobj.read()
+                if meta.parent_id in forms_by_id:
+                    forms_by_id[meta.parent_id]._prefetched_xml = xml
 
         if ordered:
             sort_with_id_list(forms, form_ids, 'form_id')
@@ -515,6 +526,10 @@ class XFormInstance(PartitionedModel, models.Model, RedisLockableMixIn,
     # for compatability with corehq.blobs.mixin.DeferredBlobMixin interface
     persistent_blobs = None
 
+    # set on new forms by the submission parser
+    _parsed_form_data = None
+    _has_ledger_blocks = None
+
     # form meta properties
     time_end = models.DateTimeField(null=True, blank=True)
     time_start = models.DateTimeField(null=True, blank=True)
@@ -624,12 +639,17 @@ class XFormInstance(PartitionedModel, models.Model, RedisLockableMixIn,
         from couchforms import XMLSyntaxError
         from ..utils import convert_xform_to_json, adjust_datetimes
         from corehq.form_processor.utils.metadata import scrub_form_meta
-        xml = self.get_xml()
-        try:
-            form_json = convert_xform_to_json(xml)
-        except XMLSyntaxError:
-            return {}
-        adjust_datetimes(form_json)
+        form_json = self._parsed_form_data
+        if form_json is not None:
+            # set from the submission that created this form
+            self._parsed_form_data = None
+        else:
+            xml = self.get_xml()
+            try:
+                form_json = convert_xform_to_json(xml)
+            except XMLSyntaxError:
+                return {}
+            adjust_datetimes(form_json)
 
         scrub_form_meta(self.form_id, form_json)
         return form_json
@@ -713,6 +733,10 @@ class XFormInstance(PartitionedModel, models.Model, RedisLockableMixIn,
 
     @memoized
     def get_xml(self):
+        xml = getattr(self, '_prefetched_xml', None)
+        if xml is not None:
+            del self._prefetched_xml
+            return xml
         try:
             return self.get_attachment('form.xml')
         except (NotFound, AttachmentNotFound):
@@ -8,7 +8,11 @@ from django.conf import settings
 from corehq.form_processor.exceptions import MissingFormXml
 from corehq.form_processor.interfaces.processor import FormProcessorInterface
 from corehq.form_processor.models import Attachment, XFormInstance
-from corehq.form_processor.utils import convert_xform_to_json, adjust_datetimes
+from corehq.form_processor.utils import (
+    adjust_datetimes,
+    convert_xform_to_json,
+    has_ledger_blocks,
+)
 from corehq.util.soft_assert.api import soft_assert
 from couchforms import XMLSyntaxError
 from couchforms.exceptions import MissingXMLNSError
@@ -108,6 +112,9 @@ def _create_new_xform(domain, instance_xml, attachments=None, auth_context=None,
     xform = interface.new_xform(instance_json)
     xform.domain = domain
     xform.auth_context = auth_context
+    # avoid parsing the form XML again during processing
+    xform._parsed_form_data = instance_json
+    xform._has_ledger_blocks = has_ledger_blocks(instance_xml)
 
     # Maps all attachments to uniform format and adds form.xml to list before storing
     attachments = [
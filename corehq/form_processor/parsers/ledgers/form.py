@@ -112,6 +112,8 @@ def get_all_stock_report_helpers_from_form(xform):
     Given an instance of an XFormInstance, extract the ledger actions and convert
     them to StockReportHelper objects.
     """
+    if xform._has_ledger_blocks is False:
+        return
     form_xml = xform.get_xml_element()
     commtrack_node_names = ('{%s}balance' % COMMTRACK_REPORT_XMLNS,
                             '{%s}transfer' % COMMTRACK_REPORT_XMLNS)
@@ -1,5 +1,8 @@
 import logging
+import time
 from collections import namedtuple
+from contextlib import nullcontext
+from datetime import datetime
 
 from ddtrace import tracer
 from django.db import IntegrityError
@@ -23,13 +26,14 @@ from corehq.const import OPENROSA_VERSION_3
 from corehq.middleware import OPENROSA_VERSION_HEADER
 from corehq.toggles import ASYNC_RESTORE, BLOCK_SUMOLOGIC_LOGS, NAMESPACE_OTHER, SUMOLOGIC_LOGS
 from corehq.apps.app_manager.dbaccessors import get_current_app
+from corehq.apps.change_feed.producer import producer
 from corehq.apps.cloudcare.const import DEVICE_ID as FORMPLAYER_DEVICE_ID
 from corehq.apps.commtrack.exceptions import MissingProductId
 from corehq.apps.domain_migration_flags.api import any_migrations_in_progress
 from corehq.apps.es.client import BulkActionItem
 from corehq.apps.users.models import CouchUser
 from corehq.apps.users.permissions import has_permission_to_view_report
-from corehq.form_processor.exceptions import PostSaveError, XFormSaveError
+from corehq.form_processor.exceptions import KafkaPublishingError, PostSaveError, XFormSaveError
 from corehq.form_processor.interfaces.processor import FormProcessorInterface
 from corehq.form_processor.models import XFormInstance
 from corehq.form_processor.parsers.form import process_xform_xml
@@ -307,16 +311,7 @@ class SubmissionPost(object):
         with result.get_locked_forms() as xforms:
             if len(xforms) > 1:
                 self.track_load(len(xforms) - 1)
-            if self.case_db:
-                case_db_cache = self.case_db
-                case_db_cache.cached_xforms.extend(xforms)
-            else:
-                case_db_cache = self.interface.casedb_cache(
-                    domain=self.domain, lock=True, deleted_ok=True,
-                    xforms=xforms, load_src="form_submission",
-                )
-
-            with case_db_cache as case_db:
+            with self._get_case_db(xforms) as case_db:
                 instance = xforms[0]
 
                 if instance.is_duplicate:
@@ -378,6 +373,16 @@ class SubmissionPost(object):
             response = self._get_open_rosa_response(instance, **openrosa_kwargs)
             return FormProcessingResult(response, instance, cases, ledgers, submission_type)
 
+    def _get_case_db(self, xforms):
+        if self.case_db:
+            case_db_cache = self.case_db
+            case_db_cache.cached_xforms.extend(xforms)
+            return case_db_cache
+        return self.interface.casedb_cache(
+            domain=self.domain, lock=True, deleted_ok=True,
+            xforms=xforms, load_src="form_submission",
+        )
+
     def _log_form_details(self, form):
         attachments = form.attachments if hasattr(form, 'attachments') else {}
 
@@ -646,6 +651,155 @@ class SubmissionPost(object):
         return FormProcessingResult(response, device_log_form, [], [], 'device-log')
 
 
+class BulkSubmissionPost(object):
+    """Process an ordered batch of form submissions
+
+    All forms in the batch must be from the same user and domain, for
+    example the queue of forms a device sends after being offline. They
+    are processed in order, one at a time, as they would be if they were
+    submitted individually, except that:
+
+    - cases are loaded into one case db shared by the whole batch, and
+      case locks are held until the batch is finished rather than being
+      acquired and released for every form;
+    - changes are published to Kafka without waiting for each one to be
+      acknowledged, and flushed when the batch is finished. Forms with
+      changes that could not be sent get the same response as a form
+      whose post save operations failed, and will be published again
+      when unfinished submissions are reprocessed.
+
+    Each form is saved in its own transaction so that it gets its own
+    result. If a form cannot be processed the remaining forms are not
+    processed, and they get a response telling the device to send them
+    again. Forms that are not processed within ``MAX_BATCH_SECONDS`` get
+    the same response, so case locks are not held after they expire.
+
+    :param submissions: List of ``(instance, attachments)`` tuples.
+    :param kwargs: Other `SubmissionPost` arguments, which apply to all
+    forms in the batch.
+    """
+
+    # less than the timeout of case locks
+    MAX_BATCH_SECONDS = 60
+
+    def __init__(self, submissions, domain, **kwargs):
+        assert domain, "'domain' is required"
+        assert 'case_db' not in kwargs, kwargs
+        self.submissions = submissions
+        self.domain = domain
+        self.kwargs = kwargs
+        self.interface = FormProcessorInterface(domain)
+
+    def run(self):
+        """Process the forms in the batch
+
+        :returns: List of `FormProcessingResult`, one for each submission.
+        """
+        results = []
+        submissions = []
+        case_db = self.interface.casedb_cache(
+            domain=self.domain, lock=True, deleted_ok=True, load_src="bulk_form_submission",
+        )
+        deadline = time.monotonic() + self.MAX_BATCH_SECONDS
+        try:
+            with producer.batch(), case_db:
+                for instance, attachments in self.submissions:
+                    if results and (_must_resend(results[-1]) or time.monotonic() > deadline):
+                        submissions.append(None)
+                        results.append(self._get_unprocessed_result())
+                        continue
+                    submission = _BatchedSubmissionPost(
+                        instance=instance,
+                        attachments=attachments,
+                        domain=self.domain,
+                        case_db=case_db,
+                        **self.kwargs
+                    )
+                    submissions.append(submission)
+                    try:
+                        results.append(submission.run())
+                    except Exception:
+                        notify_exception(get_request(), "Error processing form in submission batch", {
+                            'domain': self.domain,
+                        })
+                        results.append(self._get_unprocessed_result())
+        except KafkaPublishingError as err:
+            self._handle_publishing_error(err, submissions, results)
+        metrics_counter('commcare.xform_submissions.batched', len(results), tags={'domain': self.domain})
+        return results
+
+    def get_responses(self):
+        return [result.response for result in self.run()]
+
+    @staticmethod
+    def _handle_publishing_error(error, submissions, results):
+        """Queue the forms whose changes were not sent to Kafka to be
+        published again, as `SubmissionPost.save_processed_models` does
+        when publishing fails
+        """
+        failed_ids = {change_meta.document_id for change_meta in error.change_metas}
+        for index, (submission, result) in enumerate(zip(submissions, results)):
+            if submission is None or result.submission_type != 'normal':
+                continue
+            doc_ids = {result.xform.form_id} | {case.case_id for case in result.cases}
+            if not doc_ids & failed_ids:
+                continue
+            notify_submission_error(result.xform, 'Error publishing to Kafka')
+            # a saved stub gets the form's changes published again
+            UnfinishedSubmissionStub.objects.create(
+                xform_id=result.xform.form_id,
+                timestamp=datetime.utcnow(),
+                saved=True,
+                domain=result.xform.domain,
+            )
+            response = submission._get_open_rosa_response(
+                result.xform,
+                error_message="Error performing post save operations",
+                error_nature=ResponseNature.POST_PROCESSING_FAILURE,
+            )
+            results[index] = result._replace(response=response)
+
+    @staticmethod
+    def _get_unprocessed_result():
+        response = OpenRosaResponse(
+            message="The form was not processed. Please send it again.",
+            nature=ResponseNature.SUBMIT_ERROR,
+            status=503,
+        ).response()
+        return FormProcessingResult(response, None, [], [], 'unprocessed')
+
+
+class _BatchedSubmissionPost(SubmissionPost):
+    """Process a form in a `BulkSubmissionPost` batch
+
+    Case locks acquired while processing the form are not released
+    until the batch is finished, unless the form is not processed
+    normally, in which case the cached cases are discarded and their
+    locks are released.
+    """
+
+    def run(self):
+        try:
+            result = super().run()
+        except Exception:
+            self.case_db.clear_cache()
+            raise
+        if result.submission_type != 'normal':
+            # cases may have been modified in memory without being
+            # saved, or saved without going through the case db
+            self.case_db.clear_cache()
+        return result
+
+    def _get_case_db(self, xforms):
+        # forms from earlier in the batch have been saved
+        self.case_db.cached_xforms = []
+        return nullcontext(super()._get_case_db(xforms))
+
+
+def _must_resend(result):
+    return result.response.status_code >= 500
+
+
 def _transform_instance_to_error(interface, exception, instance):
     error_message = '{}: {}'.format(type(exception).__name__, str(exception))
     return interface.xformerror_from_xform_instance(instance, error_message)
@@ -26,3 +26,15 @@ class AdjustDatetimesTest(SimpleTestCase):
             adjust_datetimes({'fake_datetime': fake_datetime}),
             {'fake_datetime': fake_datetime}
         )
+
+    def test_nested(self):
+        self.assertEqual(
+            adjust_datetimes({
+                'group': {'datetime': '2013-03-09T06:30:09.007'},
+                'repeat': [{'datetime': '2013-03-09T06:30:09.007+03'}, '2013-03-09T06:30'],
+            }),
+            {
+                'group': {'datetime': '2013-03-09T06:30:09.007000Z'},
+                'repeat': [{'datetime': '2013-03-09T03:30:09.007000Z'}, '2013-03-09T06:30:00.000000Z'],
+            }
+        )
@@ -0,0 +1,137 @@
+import uuid
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+from kafka.errors import KafkaError
+from kafka.future import Future
+from redis.exceptions import RedisError
+
+from casexml.apps.case.mock import CaseBlock
+from couchforms.models import UnfinishedSubmissionStub
+from couchforms.openrosa_response import ResponseNature
+
+from corehq.apps.change_feed.producer import producer
+from corehq.apps.receiverwrapper.util import submit_form_locally, submit_forms_locally
+from corehq.form_processor.models import CommCareCase, XFormInstance
+from corehq.form_processor.submission_post import BulkSubmissionPost
+from corehq.form_processor.tests.utils import FormProcessorTestUtils, sharded
+from corehq.form_processor.utils.xform import FormSubmissionBuilder
+
+DOMAIN = 'bulk-submission'
+
+
+def _get_form_xml(form_id, case_blocks):
+    return FormSubmissionBuilder(form_id=form_id, case_blocks=case_blocks).as_xml_string()
+
+
+@sharded
+class BulkSubmissionPostTest(TestCase):
+
+    def tearDown(self):
+        FormProcessorTestUtils.delete_all_cases_forms_ledgers(DOMAIN)
+        UnfinishedSubmissionStub.objects.filter(domain=DOMAIN).delete()
+        super().tearDown()
+
+    def test_forms_processed_in_order(self):
+        case_id = uuid.uuid4().hex
+        form_ids = [uuid.uuid4().hex for _ in range(3)]
+        instances = [
+            _get_form_xml(form_ids[0], [CaseBlock(case_id=case_id, create=True, update={'count': '1'})]),
+            _get_form_xml(form_ids[1], [CaseBlock(case_id=case_id, update={'count': '2'})]),
+            _get_form_xml(form_ids[2], [CaseBlock(case_id=case_id, update={'count': '3'})]),
+        ]
+        results = submit_forms_locally(instances, DOMAIN)
+
+        self.assertEqual([result.xform.form_id for result in results], form_ids)
+        self.assertEqual([result.submission_type for result in results], ['normal'] * 3)
+        case = CommCareCase.objects.get_case(case_id, DOMAIN)
+        self.assertEqual(case.get_case_property('count'), '3')
+        self.assertEqual(case.xform_ids, form_ids)
+
+    def test_duplicate_form_in_batch(self):
+        form_id = uuid.uuid4().hex
+        case_id = uuid.uuid4().hex
+        instance = _get_form_xml(form_id, [CaseBlock(case_id=case_id, create=True)])
+        results = BulkSubmissionPost([(instance, None), (instance, None)], DOMAIN).run()
+
+        self.assertEqual([result.submission_type for result in results], ['normal', 'duplicate'])
+        self.assertEqual(XFormInstance.objects.get_form(form_id).form_id, form_id)
+        self.assertEqual(CommCareCase.objects.get_case(case_id, DOMAIN).xform_ids, [form_id])
+
+    def test_error_form_does_not_affect_later_forms(self):
+        case_id = uuid.uuid4().hex
+        bad_form_id = uuid.uuid4().hex
+        instances = [
+            _get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, create=True)]),
+            # an index to a case that does not exist is an error
+            _get_form_xml(bad_form_id, [
+                CaseBlock(case_id=case_id, update={'p': 'bad'}, index={'parent': ('t', 'missing')}),
+            ]),
+            _get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, update={'q': 'good'})]),
+        ]
+        results = BulkSubmissionPost([(instance, None) for instance in instances], DOMAIN).run()
+
+        self.assertEqual([result.submission_type for result in results], ['normal', 'error', 'normal'])
+        case = CommCareCase.objects.get_case(case_id, DOMAIN)
+        self.assertEqual(case.get_case_property('q'), 'good')
+        self.assertIsNone(case.get_case_property('p'))
+        self.assertNotIn(bad_form_id, case.xform_ids)
+
+    def test_existing_case_after_error_form(self):
+        case_id = uuid.uuid4().hex
+        submit_form_locally(_get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, create=True)]), DOMAIN)
+        instances = [
+            _get_form_xml(uuid.uuid4().hex, [
+                CaseBlock(case_id=case_id, update={'p': 'bad'}, index={'parent': ('t', 'missing')}),
+            ]),
+            _get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, update={'q': 'good'})]),
+        ]
+        # the lock of the case must be released with the cache, or the
+        # second form would wait for the lock held by the batch
+        locks_held = []
+
+        def acquire_lock_without_waiting(lock, degrade_gracefully, **kwargs):
+            if not lock.acquire(blocking=False):
+                locks_held.append(lock)
+                raise RedisError("Lock is held")
+            return lock
+
+        with patch('dimagi.utils.couch.acquire_lock', acquire_lock_without_waiting):
+            results = BulkSubmissionPost([(instance, None) for instance in instances], DOMAIN).run()
+
+        self.assertEqual(locks_held, [])
+        self.assertEqual([result.submission_type for result in results], ['error', 'normal'])
+        case = CommCareCase.objects.get_case(case_id, DOMAIN)
+        self.assertEqual(case.get_case_property('q'), 'good')
+        self.assertIsNone(case.get_case_property('p'))
+
+    def test_forms_after_time_limit_are_not_processed(self):
+        case_id = uuid.uuid4().hex
+        instances = [
+            _get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, create=True)]),
+            _get_form_xml(uuid.uuid4().hex, [CaseBlock(case_id=case_id, update={'p': 'late'})]),
+        ]
+        with patch.object(BulkSubmissionPost, 'MAX_BATCH_SECONDS', -1):
+            results = BulkSubmissionPost([(instance, None) for instance in instances], DOMAIN).run()
+
+        self.assertEqual([result.submission_type for result in results], ['normal', 'unprocessed'])
+        self.assertEqual(results[1].response.status_code, 503)
+        self.assertIsNone(CommCareCase.objects.get_case(case_id, DOMAIN).get_case_property('p'))
+
+    def test_forms_not_published_are_queued_for_reprocessing(self):
+        form_ids = [uuid.uuid4().hex for _ in range(2)]
+        instances = [
+            _get_form_xml(form_id, [CaseBlock(case_id=uuid.uuid4().hex, create=True)])
+            for form_id in form_ids
+        ]
+        kafka_producer = Mock()
+        kafka_producer.send.return_value = Future().failure(KafkaError("broker unavailable"))
+        with patch.object(producer, '_producer', kafka_producer):
+            results = BulkSubmissionPost([(instance, None) for instance in instances], DOMAIN).run()
+
+        self.assertEqual([result.submission_type for result in results], ['normal', 'normal'])
+        for result in results:
+            self.assertIn(ResponseNature.POST_PROCESSING_FAILURE.encode('utf-8'), result.response.content)
+        stubs = UnfinishedSubmissionStub.objects.filter(domain=DOMAIN)
+        self.assertEqual({stub.xform_id for stub in stubs}, set(form_ids))
+        self.assertTrue(all(stub.saved for stub in stubs))
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from unittest.mock import patch
 
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
@@ -146,6 +147,14 @@ class XFormInstanceManagerTest(TestCase):
             self.assertEqual(1, len(attachments))
             self.assertEqual(expected, {att.name: att.content_type for att in attachments})
 
+    def test_get_forms_with_attachments_meta_prefetch_xml(self):
+        form = create_form_for_test(DOMAIN)
+        expected_xml = form.get_xml()
+
+        forms = XFormInstance.objects.get_forms_with_attachments_meta([form.form_id], prefetch_xml=True)
+        with patch.object(get_blob_db(), "get", side_effect=AssertionError("blob not prefetched")):
+            self.assertEqual(forms[0].get_xml(), expected_xml)
+
     def test_get_forms_by_type(self):
         form1 = create_form_for_test(DOMAIN)
         form2 = create_form_for_test(DOMAIN)
@@ -3,7 +3,12 @@ from collections import OrderedDict
 from django.test import SimpleTestCase
 
 from corehq.form_processor.exceptions import XFormQuestionValueNotFound
-from corehq.form_processor.utils.xform import build_form_xml_from_property_dict, get_node, RE_DATETIME_MATCH
+from corehq.form_processor.utils.xform import (
+    RE_DATETIME_MATCH,
+    build_form_xml_from_property_dict,
+    get_node,
+    has_ledger_blocks,
+)
 from lxml import etree
 
 
@@ -97,3 +102,11 @@ class TestDateTimeRegexMatch(SimpleTestCase):
         ]
         for candidate, expected in cases:
             self.assertEqual(bool(RE_DATETIME_MATCH.match(candidate)), expected, candidate)
+
+
+class TestHasLedgerBlocks(SimpleTestCase):
+    def test_has_ledger_blocks(self):
+        ledger_xml = '<data><balance xmlns="http://commcarehq.org/ledger/v1" entity-id="c1"/></data>'
+        self.assertTrue(has_ledger_blocks(ledger_xml))
+        self.assertTrue(has_ledger_blocks(ledger_xml.encode('utf-8')))
+        self.assertFalse(has_ledger_blocks(b'<data><question>answer</question></data>'))
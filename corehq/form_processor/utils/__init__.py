@@ -7,6 +7,7 @@ from .xform import (  # noqa: F401
     extract_meta_user_id,
     convert_xform_to_json,
     adjust_datetimes,
+    has_ledger_blocks,
     get_simple_form_xml,
     get_simple_wrapped_form,
     TestFormMetadata,
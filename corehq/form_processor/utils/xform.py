@@ -6,6 +6,7 @@ import iso8601
 import pytz
 
 import xml2json
+from casexml.apps.stock.const import COMMTRACK_REPORT_XMLNS
 from corehq.form_processor.interfaces.processor import XFormQuestionValueIterator
 from corehq.form_processor.models import Attachment, XFormInstance
 from corehq.form_processor.exceptions import XFormQuestionValueNotFound
@@ -201,32 +202,53 @@ def adjust_text_to_datetime(text):
     return matching_datetime.astimezone(pytz.utc).replace(tzinfo=None)
 
 
-def adjust_datetimes(data, parent=None, key=None):
+def adjust_datetimes(data):
     """
     find all datetime-like strings within data (deserialized json)
     and format them uniformly, in place.
     """
     # this strips the timezone like we've always done
     # todo: in the future this will convert to UTC
-    if isinstance(data, str) and RE_DATETIME_MATCH.match(data):
-        try:
-            parent[key] = str(json_format_datetime(
-                adjust_text_to_datetime(data)
-            ))
-        except (iso8601.ParseError, ValueError):
-            pass
-    elif isinstance(data, dict):
-        for key, value in data.items():
-            adjust_datetimes(value, parent=data, key=key)
-    elif isinstance(data, list):
-        for i, value in enumerate(data):
-            adjust_datetimes(value, parent=data, key=i)
+    # iterate rather than recurse: large repeat groups make for deep, wide trees
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            if isinstance(value, str):
+                if _could_be_datetime(value) and RE_DATETIME_MATCH.match(value):
+                    try:
+                        node[key] = str(json_format_datetime(
+                            adjust_text_to_datetime(value)
+                        ))
+                    except (iso8601.ParseError, ValueError):
+                        pass
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
 
     # return data, just for convenience in testing
     # this is the original input, modified, not a new data structure
     return data
 
 
+def _could_be_datetime(value):
+    # cheap check to avoid running the regex on most values
+    return len(value) >= 13 and value[:4].isdigit()
+
+
+def has_ledger_blocks(instance_xml):
+    """Check whether form XML may contain ledger blocks
+
+    This is a substring check for the ledger namespace, so it may return
+    true for forms that mention the namespace without using it, but
+    never returns false for a form that has ledger blocks.
+    """
+    xmlns = COMMTRACK_REPORT_XMLNS
+    if isinstance(instance_xml, bytes):
+        xmlns = xmlns.encode('utf-8')
+    return xmlns in instance_xml
+
+
 def resave_form(domain, form):
     from corehq.form_processor.change_publishers import publish_form_saved
     publish_form_saved(form)
@@ -1,7 +1,11 @@
-from corehq.apps.domain_migration_flags.api import any_migrations_in_progress
+from corehq.apps.domain_migration_flags.api import (
+    all_domains_with_migrations_in_progress,
+    any_migrations_in_progress,
+)
 from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     get_active_schedule_instance_ids,
     get_active_case_schedule_instance_ids,
+    get_due_schedule_instance_buckets,
 )
 from corehq.messaging.scheduling.scheduling_partitioned.models import (
     AlertScheduleInstance,
@@ -10,15 +14,26 @@ from corehq.messaging.scheduling.scheduling_partitioned.models import (
     CaseTimedScheduleInstance,
 )
 from corehq.messaging.scheduling.tasks import (
+    SCHEDULE_BUCKET_CLAIM_TIMEOUT,
+    SCHEDULE_INSTANCE_CLASSES,
+    get_schedule_bucket_claim_key,
     handle_alert_schedule_instance,
     handle_timed_schedule_instance,
     handle_case_alert_schedule_instance,
     handle_case_timed_schedule_instance,
+    handle_schedule_instance_bucket,
+)
+from corehq.sql_db.util import (
+    get_db_aliases_for_partitioned_query,
+    get_default_and_partitioned_db_aliases,
+    handle_connection_failure,
 )
-from corehq.sql_db.util import handle_connection_failure, get_default_and_partitioned_db_aliases
 from datetime import datetime
 from dimagi.utils.couch import get_redis_lock
+from dimagi.utils.couch.cache.cache_core import get_redis_client
 from dimagi.utils.logging import notify_exception
+from dimagi.utils.parsing import json_format_datetime
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from time import sleep
 
@@ -65,6 +80,10 @@ class Command(BaseCommand):
 
     @handle_connection_failure(get_db_aliases=get_default_and_partitioned_db_aliases)
     def create_tasks(self):
+        if settings.SCHEDULE_INSTANCE_TIME_WHEEL_ENABLED:
+            self.create_bucket_tasks()
+            return
+
         for cls in (AlertScheduleInstance, TimedScheduleInstance):
             for domain, schedule_instance_id, next_event_due in get_active_schedule_instance_ids(
                     cls, datetime.utcnow()):
@@ -88,6 +107,28 @@ class Command(BaseCommand):
                 if enqueue_lock.acquire(blocking=False):
                     self.get_task(cls).delay(case_id, schedule_instance_id.hex, domain)
 
+    def create_bucket_tasks(self):
+        """
+        Spawns one task for each minute in which schedule instances are due
+        on each shard. A non-blocking claim makes sure that each bucket is
+        only queued once at a time. The claim is released when the last
+        batch of the bucket is done, and times out after
+        SCHEDULE_BUCKET_CLAIM_TIMEOUT in case its tasks never complete.
+        Instances of skipped domains do not make a bucket due, so buckets
+        holding only those are not claimed and queued again and again.
+        """
+        client = get_redis_client()
+        now = datetime.utcnow()
+        domains_to_skip = all_domains_with_migrations_in_progress()
+        for cls in SCHEDULE_INSTANCE_CLASSES:
+            for db_alias in get_db_aliases_for_partitioned_query():
+                for bucket in get_due_schedule_instance_buckets(cls, db_alias, now, domains_to_skip):
+                    claim_key = get_schedule_bucket_claim_key(cls, db_alias, bucket)
+                    if client.add(claim_key, True, timeout=SCHEDULE_BUCKET_CLAIM_TIMEOUT):
+                        handle_schedule_instance_bucket.delay(
+                            cls.__name__, db_alias, json_format_datetime(bucket), claim_key
+                        )
+
     def handle(self, **options):
         while True:
             try:
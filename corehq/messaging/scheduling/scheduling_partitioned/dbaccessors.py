@@ -1,10 +1,13 @@
+from datetime import timedelta
 from uuid import UUID
 
 from django.db.models import Q
+from django.db.models.functions import TruncMinute
 
 from corehq.sql_db.util import (
     get_db_aliases_for_partitioned_query,
     paginate_query_across_partitioned_databases,
+    split_list_by_db_partition,
 )
 from corehq.util.metrics.load_counters import load_counter_for_model
 
@@ -118,6 +121,37 @@ def get_active_schedule_instance_ids(cls, due_before, due_after=None):
         yield domain, schedule_instance_id, next_event_due
 
 
+def get_due_schedule_instance_buckets(cls, db_alias, due_before, exclude_domains=()):
+    """
+    Returns the minutes in which the active schedule instances of one shard
+    are due, as a sorted list of the datetimes that the minutes start at.
+    Instances in exclude_domains are ignored.
+    """
+    return list(
+        cls.objects.using(db_alias)
+        .filter(active=True, next_event_due__lte=due_before)
+        .exclude(domain__in=exclude_domains)
+        .annotate(bucket=TruncMinute('next_event_due'))
+        .order_by('bucket')
+        .values_list('bucket', flat=True)
+        .distinct()
+    )
+
+
+def get_schedule_instances_in_bucket(cls, db_alias, bucket, due_before, exclude_domains=()):
+    """
+    Returns a queryset of the active schedule instances of one shard that
+    are due in the minute that starts at bucket, and no later than due_before.
+    Instances in exclude_domains are left out.
+    """
+    return cls.objects.using(db_alias).filter(
+        active=True,
+        next_event_due__gte=bucket,
+        next_event_due__lt=bucket + timedelta(minutes=1),
+        next_event_due__lte=due_before,
+    ).exclude(domain__in=exclude_domains)
+
+
 def get_active_case_schedule_instance_ids(cls, due_before, due_after=None):
     from corehq.messaging.scheduling.scheduling_partitioned.models import (
         CaseAlertScheduleInstance,
@@ -260,6 +294,28 @@ def get_case_timed_schedule_instances_for_schedule_id(case_id, schedule_id):
     )
 
 
+def get_case_schedule_instances_for_cases(cls, schedule_id, case_ids):
+    """
+    Returns the case schedule instances of the schedule for all of the given
+    cases, with one query per shard.
+    """
+    from corehq.messaging.scheduling.scheduling_partitioned.models import (
+        CaseAlertScheduleInstance,
+        CaseTimedScheduleInstance,
+    )
+
+    if cls is CaseAlertScheduleInstance:
+        schedule_filter = Q(alert_schedule_id=schedule_id)
+    elif cls is CaseTimedScheduleInstance:
+        schedule_filter = Q(timed_schedule_id=schedule_id)
+    else:
+        raise TypeError("Expected CaseAlertScheduleInstance or CaseTimedScheduleInstance")
+
+    _validate_uuid(schedule_id)
+    for db_name, db_case_ids in split_list_by_db_partition(case_ids):
+        yield from cls.objects.using(db_name).filter(schedule_filter, case_id__in=db_case_ids)
+
+
 def get_case_alert_schedule_instances_for_schedule(case_id, schedule):
     from corehq.messaging.scheduling.models import AlertSchedule
 
@@ -58,6 +58,9 @@ class ScheduleInstance(PartitionedModel):
     RECIPIENT_TYPE_USER_GROUP = 'Group'
     RECIPIENT_TYPE_LOCATION = 'Location'
 
+    # Set by prefetch_schedule_instance_data() to avoid a lookup per instance
+    _prefetched_schedule = None
+
     class Meta(object):
         abstract = True
         index_together = (
@@ -414,6 +417,8 @@ class ScheduleInstance(PartitionedModel):
         This is named with a memoized_ prefix to be clear that it should only be used
         when the schedule is not changing.
         """
+        if self._prefetched_schedule is not None:
+            return self._prefetched_schedule
         return self.schedule
 
     def additional_deactivation_condition_reached(self):
@@ -595,9 +600,15 @@ class CaseScheduleInstanceMixin(object):
     RECIPIENT_TYPE_CASE_PROPERTY_USER_ID = 'CasePropertyUserId'
     RECIPIENT_TYPE_CASE_PROPERTY_EMAIL = 'CasePropertyEmail'
 
+    # Set by prefetch_schedule_instance_data() to avoid lookups per instance
+    _prefetched_case = None
+    _prefetched_case_owner = None
+
     @property
     @memoized
     def case(self):
+        if self._prefetched_case is not None:
+            return self._prefetched_case
         try:
             return CommCareCase.objects.get_case(self.case_id, self.domain)
         except CaseNotFound:
@@ -606,6 +617,8 @@ class CaseScheduleInstanceMixin(object):
     @property
     @memoized
     def case_owner(self):
+        if self._prefetched_case_owner is not None:
+            return self._prefetched_case_owner
         if self.case:
             return get_wrapped_owner(get_owner_id(self.case))
 
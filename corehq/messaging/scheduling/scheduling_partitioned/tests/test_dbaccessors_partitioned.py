@@ -10,6 +10,8 @@ from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     delete_timed_schedule_instance,
     get_active_schedule_instance_ids,
     get_alert_schedule_instances_for_schedule,
+    get_due_schedule_instance_buckets,
+    get_schedule_instances_in_bucket,
     get_timed_schedule_instances_for_schedule,
 )
 from corehq.messaging.scheduling.models import (
@@ -228,6 +230,30 @@ class TestSchedulingPartitionedDBAccessorsDeleteAndFilter(BaseSchedulingPartitio
             []
         )
 
+    def test_get_due_schedule_instance_buckets(self):
+        self.assertEqual(
+            get_due_schedule_instance_buckets(AlertScheduleInstance, self.db1, datetime(2017, 4, 1)),
+            [datetime(2017, 3, 1)]
+        )
+        self.assertEqual(
+            get_due_schedule_instance_buckets(AlertScheduleInstance, self.db1, datetime(2017, 2, 1)),
+            []
+        )
+
+    def test_get_schedule_instances_in_bucket(self):
+        self.assertEqual(
+            list(get_schedule_instances_in_bucket(
+                AlertScheduleInstance, self.db1, datetime(2017, 3, 1), datetime(2017, 4, 1)
+            )),
+            [self.alert_instance1_p1]
+        )
+        self.assertEqual(
+            list(get_schedule_instances_in_bucket(
+                AlertScheduleInstance, self.db1, datetime(2017, 2, 28, 23, 59), datetime(2017, 4, 1)
+            )),
+            []
+        )
+
     def test_get_active_timed_schedule_instance_ids(self):
         self.assertItemsEqual(
             get_active_schedule_instance_ids(
@@ -1,4 +1,5 @@
 import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from django.conf import settings
@@ -6,10 +7,19 @@ from django.conf import settings
 from bs4 import BeautifulSoup
 from celery.schedules import crontab
 
+from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import CriticalSection
+from dimagi.utils.couch.cache.cache_core import get_redis_client
+from dimagi.utils.logging import notify_exception
 
 from corehq.apps.celery import task
 from corehq.apps.celery.periodic import periodic_task
+from corehq.apps.domain_migration_flags.api import (
+    all_domains_with_migrations_in_progress,
+    any_migrations_in_progress,
+)
+from corehq.apps.users.cases import get_owner_id, get_wrapped_owners
+from corehq.form_processor.models import CommCareCase
 from corehq.messaging.scheduling.models import (
     AlertSchedule,
     ImmediateBroadcast,
@@ -28,7 +38,9 @@ from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     get_alert_schedule_instances_for_schedule,
     get_case_alert_schedule_instances_for_schedule,
     get_case_schedule_instance,
+    get_case_schedule_instances_for_cases,
     get_case_timed_schedule_instances_for_schedule,
+    get_schedule_instances_in_bucket,
     get_timed_schedule_instance,
     get_timed_schedule_instances_for_schedule,
     save_alert_schedule_instance,
@@ -42,12 +54,18 @@ from corehq.messaging.scheduling.scheduling_partitioned.models import (
     CaseTimedScheduleInstance,
     TimedScheduleInstance,
 )
+from corehq.sql_db.util import get_db_alias_for_partitioned_doc
 from corehq.util.celery_utils import no_result_task
-from corehq.util.dates import iso_string_to_date
+from corehq.util.dates import iso_string_to_date, iso_string_to_datetime
+from corehq.util.metrics import metrics_counter, metrics_histogram
 
 
 class ScheduleInstanceRefresher(object):
 
+    # When set, the refreshed instances are saved and deleted by the batch
+    # instead of one at a time
+    batch = None
+
     def __init__(self, schedule, new_recipients, existing_instances):
         self.schedule = schedule
         self.new_recipients = set(self._convert_to_tuple_of_tuples(new_recipients))
@@ -152,6 +170,8 @@ class ScheduleInstanceRefresher(object):
             if recipient_type_and_id in self.new_recipients:
                 needs_saving = self.handle_existing_instance(instance)
                 refreshed_list.append((instance, needs_saving))
+            elif self.batch is not None:
+                self.batch.delete_instance(instance)
             else:
                 self.delete_instance(instance)
 
@@ -160,7 +180,10 @@ class ScheduleInstanceRefresher(object):
                 needs_saving = True
 
             if needs_saving:
-                self.save_instance(instance)
+                if self.batch is not None:
+                    self.batch.save_instance(instance)
+                else:
+                    self.save_instance(instance)
 
 
 class AlertScheduleInstanceRefresher(ScheduleInstanceRefresher):
@@ -211,8 +234,9 @@ class TimedScheduleInstanceRefresher(ScheduleInstanceRefresher):
 
 class CaseAlertScheduleInstanceRefresher(ScheduleInstanceRefresher):
 
-    def __init__(self, case, action_definition, rule, schedule, new_recipients, existing_instances):
+    def __init__(self, case, action_definition, rule, schedule, new_recipients, existing_instances, batch=None):
         super(CaseAlertScheduleInstanceRefresher, self).__init__(schedule, new_recipients, existing_instances)
+        self.batch = batch
         self.case = case
         self.action_definition = action_definition
         self.rule = rule
@@ -252,8 +276,9 @@ class CaseAlertScheduleInstanceRefresher(ScheduleInstanceRefresher):
 class CaseTimedScheduleInstanceRefresher(ScheduleInstanceRefresher):
 
     def __init__(self, case, action_definition, rule, schedule,
-                 new_recipients, existing_instances, start_date=None):
+                 new_recipients, existing_instances, start_date=None, batch=None):
         super(CaseTimedScheduleInstanceRefresher, self).__init__(schedule, new_recipients, existing_instances)
+        self.batch = batch
         self.case = case
         self.action_definition = action_definition
         self.rule = rule
@@ -396,7 +421,7 @@ def handle_case_alert_schedule_instance_reset(instance, schedule, reset_case_pro
     return False
 
 
-def refresh_case_alert_schedule_instances(case, schedule, action_definition, rule):
+def refresh_case_alert_schedule_instances(case, schedule, action_definition, rule, batch=None):
     """
     :param case: the CommCareCase/SQL
     :param schedule: the AlertSchedule
@@ -404,18 +429,25 @@ def refresh_case_alert_schedule_instances(case, schedule, action_definition, rul
     causing the schedule instances to be refreshed
     :param rule: the AutomaticUpdateRule that is causing the schedule instances
     to be refreshed
+    :param batch: the CaseScheduleInstanceBatch to use to get and save the
+    schedule instances, if any
     """
+    if batch is not None:
+        existing_instances = batch.get_instances(case.case_id)
+    else:
+        existing_instances = get_case_alert_schedule_instances_for_schedule(case.case_id, schedule)
     CaseAlertScheduleInstanceRefresher(
         case,
         action_definition,
         rule,
         schedule,
         action_definition.recipients,
-        get_case_alert_schedule_instances_for_schedule(case.case_id, schedule)
+        existing_instances,
+        batch=batch,
     ).refresh()
 
 
-def refresh_case_timed_schedule_instances(case, schedule, action_definition, rule, start_date=None):
+def refresh_case_timed_schedule_instances(case, schedule, action_definition, rule, start_date=None, batch=None):
     """
     :param case: the CommCareCase/SQL
     :param schedule: the TimedSchedule
@@ -424,18 +456,119 @@ def refresh_case_timed_schedule_instances(case, schedule, action_definition, rul
     :param rule: the AutomaticUpdateRule that is causing the schedule instances
     to be refreshed
     :param start_date: the date to start the TimedSchedule
+    :param batch: the CaseScheduleInstanceBatch to use to get and save the
+    schedule instances, if any
     """
+    if batch is not None:
+        existing_instances = batch.get_instances(case.case_id)
+    else:
+        existing_instances = get_case_timed_schedule_instances_for_schedule(case.case_id, schedule)
     CaseTimedScheduleInstanceRefresher(
         case,
         action_definition,
         rule,
         schedule,
         action_definition.recipients,
-        get_case_timed_schedule_instances_for_schedule(case.case_id, schedule),
-        start_date=start_date
+        existing_instances,
+        start_date=start_date,
+        batch=batch,
     ).refresh()
 
 
+class CaseScheduleInstanceBatch(object):
+    """
+    Refreshes the case schedule instances of one schedule for a batch of
+    cases in bulk. The existing instances of all the cases are loaded in one
+    query per shard, and are refreshed in memory. When the batch is flushed,
+    only the instances which were created, changed or deleted are written,
+    with one bulk create, update and delete per shard.
+    """
+
+    def __init__(self, schedule, case_ids):
+        if isinstance(schedule, AlertSchedule):
+            self.cls = CaseAlertScheduleInstance
+        elif isinstance(schedule, TimedSchedule):
+            self.cls = CaseTimedScheduleInstance
+        else:
+            raise TypeError("Expected an instance of AlertSchedule or TimedSchedule")
+
+        self.instances_by_case_id = defaultdict(dict)
+        # The field values of the instances as they were loaded, to tell
+        # which instances and fields changed
+        self.loaded_values = {}
+        for instance in get_case_schedule_instances_for_cases(self.cls, schedule.schedule_id, case_ids):
+            self.instances_by_case_id[instance.case_id][instance.schedule_instance_id] = instance
+            self.loaded_values[instance.schedule_instance_id] = self._get_field_values(instance)
+        self.to_save = {}
+        self.to_delete = {}
+
+    @staticmethod
+    def _get_field_values(instance):
+        return {
+            field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+            if not field.primary_key
+        }
+
+    def get_instances(self, case_id):
+        return list(self.instances_by_case_id[case_id].values())
+
+    def save_instance(self, instance):
+        self.instances_by_case_id[instance.case_id][instance.schedule_instance_id] = instance
+        self.to_save[instance.schedule_instance_id] = instance
+
+    def delete_instance(self, instance):
+        self.instances_by_case_id[instance.case_id].pop(instance.schedule_instance_id, None)
+        self.to_save.pop(instance.schedule_instance_id, None)
+        if instance.schedule_instance_id in self.loaded_values:
+            self.to_delete[instance.schedule_instance_id] = instance
+
+    def delete_instances_for_case(self, case_id):
+        for instance in self.get_instances(case_id):
+            self.delete_instance(instance)
+
+    def flush(self):
+        to_create = []
+        to_update = []
+        updated_fields = set()
+        for schedule_instance_id, instance in self.to_save.items():
+            loaded_values = self.loaded_values.get(schedule_instance_id)
+            if loaded_values is None:
+                to_create.append(instance)
+                continue
+
+            changed_fields = {
+                name for name, value in self._get_field_values(instance).items()
+                if value != loaded_values[name]
+            }
+            if changed_fields:
+                to_update.append(instance)
+                updated_fields |= changed_fields
+
+        for db_alias, instances in self._split_by_db(to_create):
+            self.cls.objects.using(db_alias).bulk_create(instances)
+        for db_alias, instances in self._split_by_db(to_update):
+            self.cls.objects.using(db_alias).bulk_update(instances, sorted(updated_fields))
+        for db_alias, instances in self._split_by_db(self.to_delete.values()):
+            self.cls.objects.using(db_alias).filter(
+                schedule_instance_id__in=[instance.schedule_instance_id for instance in instances]
+            ).delete()
+
+        for instance in to_create + to_update:
+            self.loaded_values[instance.schedule_instance_id] = self._get_field_values(instance)
+        for schedule_instance_id in self.to_delete:
+            del self.loaded_values[schedule_instance_id]
+        self.to_save = {}
+        self.to_delete = {}
+
+    @staticmethod
+    def _split_by_db(instances):
+        instances_by_db = defaultdict(list)
+        for instance in instances:
+            instances_by_db[get_db_alias_for_partitioned_doc(instance.case_id)].append(instance)
+        return instances_by_db.items()
+
+
 def _handle_schedule_instance(instance, save_function):
     """
     :return: True if the event was handled, otherwise False
@@ -481,10 +614,23 @@ def update_broadcast_last_sent_timestamp(broadcast_class, schedule_id):
     broadcast_class.objects.filter(schedule_id=schedule_id).update(last_sent_timestamp=datetime.utcnow())
 
 
+def get_handle_schedule_instance_lock_key(cls, schedule_instance_uuid, case_id=None):
+    if cls is AlertScheduleInstance:
+        return 'handle-alert-schedule-instance-%s' % schedule_instance_uuid.hex
+    elif cls is TimedScheduleInstance:
+        return 'handle-timed-schedule-instance-%s' % schedule_instance_uuid.hex
+    elif cls in (CaseAlertScheduleInstance, CaseTimedScheduleInstance):
+        # Use the same lock key as the tasks which refresh case schedule instances
+        from corehq.messaging.tasks import get_sync_key
+        return get_sync_key(case_id)
+    else:
+        raise TypeError("Unexpected type: %s" % cls)
+
+
 @no_result_task(queue='reminder_queue')
 def handle_alert_schedule_instance(schedule_instance_id, domain):
     schedule_instance_uuid = uuid.UUID(schedule_instance_id)
-    with CriticalSection(['handle-alert-schedule-instance-%s' % schedule_instance_uuid.hex]):
+    with CriticalSection([get_handle_schedule_instance_lock_key(AlertScheduleInstance, schedule_instance_uuid)]):
         try:
             instance = get_alert_schedule_instance(schedule_instance_uuid)
         except AlertScheduleInstance.DoesNotExist:
@@ -497,7 +643,7 @@ def handle_alert_schedule_instance(schedule_instance_id, domain):
 @no_result_task(queue='reminder_queue')
 def handle_timed_schedule_instance(schedule_instance_id, domain):
     schedule_instance_uuid = uuid.UUID(schedule_instance_id)
-    with CriticalSection(['handle-timed-schedule-instance-%s' % schedule_instance_uuid.hex]):
+    with CriticalSection([get_handle_schedule_instance_lock_key(TimedScheduleInstance, schedule_instance_uuid)]):
         try:
             instance = get_timed_schedule_instance(schedule_instance_uuid)
         except TimedScheduleInstance.DoesNotExist:
@@ -510,9 +656,8 @@ def handle_timed_schedule_instance(schedule_instance_id, domain):
 @no_result_task(queue='reminder_queue')
 def handle_case_alert_schedule_instance(case_id, schedule_instance_id, domain):
     schedule_instance_uuid = uuid.UUID(schedule_instance_id)
-    # Use the same lock key as the tasks which refresh case schedule instances
-    from corehq.messaging.tasks import get_sync_key
-    with CriticalSection([get_sync_key(case_id)], timeout=5 * 60):
+    lock_key = get_handle_schedule_instance_lock_key(CaseAlertScheduleInstance, schedule_instance_uuid, case_id)
+    with CriticalSection([lock_key], timeout=5 * 60):
         try:
             instance = get_case_schedule_instance(CaseAlertScheduleInstance, case_id, schedule_instance_uuid)
         except CaseAlertScheduleInstance.DoesNotExist:
@@ -524,9 +669,8 @@ def handle_case_alert_schedule_instance(case_id, schedule_instance_id, domain):
 @no_result_task(queue='reminder_queue')
 def handle_case_timed_schedule_instance(case_id, schedule_instance_id, domain):
     schedule_instance_uuid = uuid.UUID(schedule_instance_id)
-    # Use the same lock key as the tasks which refresh case schedule instances
-    from corehq.messaging.tasks import get_sync_key
-    with CriticalSection([get_sync_key(case_id)], timeout=5 * 60):
+    lock_key = get_handle_schedule_instance_lock_key(CaseTimedScheduleInstance, schedule_instance_uuid, case_id)
+    with CriticalSection([lock_key], timeout=5 * 60):
         try:
             instance = get_case_schedule_instance(CaseTimedScheduleInstance, case_id, schedule_instance_uuid)
         except CaseTimedScheduleInstance.DoesNotExist:
@@ -535,6 +679,197 @@ def handle_case_timed_schedule_instance(case_id, schedule_instance_id, domain):
         _handle_schedule_instance(instance, save_case_schedule_instance)
 
 
+SCHEDULE_INSTANCE_CLASSES = (
+    AlertScheduleInstance,
+    TimedScheduleInstance,
+    CaseAlertScheduleInstance,
+    CaseTimedScheduleInstance,
+)
+
+
+# How long a bucket of schedule instances is claimed for. The claim is
+# extended whenever one of its batches is handled.
+SCHEDULE_BUCKET_CLAIM_TIMEOUT = 60 * 60
+
+
+def get_schedule_bucket_claim_key(cls, db_alias, bucket):
+    return "claim-schedule-bucket-%s-%s-%s" % (cls.__name__, db_alias, bucket.strftime('%Y-%m-%d %H:%M'))
+
+
+def _get_pending_batches_key(claim_key):
+    return "%s-pending-batches" % claim_key
+
+
+def _get_schedule_instance_class(cls_name):
+    return {cls.__name__: cls for cls in SCHEDULE_INSTANCE_CLASSES}[cls_name]
+
+
+@no_result_task(queue='reminder_queue')
+def handle_schedule_instance_bucket(cls_name, db_alias, bucket_iso_string, claim_key):
+    """
+    Splits the schedule instances of one shard that are due in one minute
+    into batches of SCHEDULE_INSTANCE_BATCH_SIZE, which are handled by
+    separate tasks. The bucket was claimed by queue_schedule_instances with
+    claim_key. The claim is extended while its batches are handled, and is
+    released when the last one is done so that instances which become due
+    in the same minute later on are handled too.
+    """
+    cls = _get_schedule_instance_class(cls_name)
+    bucket = iso_string_to_datetime(bucket_iso_string)
+    tags = {'instance_type': cls_name, 'shard': db_alias}
+    client = get_redis_client()
+    try:
+        now = datetime.utcnow()
+        metrics_histogram(
+            'commcare.messaging.schedule_bucket.lag', (now - bucket).total_seconds(),
+            bucket_tag='lag', buckets=[60, 5 * 60, 15 * 60, 60 * 60, 6 * 60 * 60], bucket_unit='s',
+            tags=tags,
+            documentation="Seconds between the start of a minute of due schedule instances "
+                          "and when they are handled",
+        )
+        fields = ['schedule_instance_id']
+        if issubclass(cls, CaseScheduleInstanceMixin):
+            fields.append('case_id')
+        instances = get_schedule_instances_in_bucket(
+            cls, db_alias, bucket, now, exclude_domains=all_domains_with_migrations_in_progress())
+        rows = [[row[0].hex] + list(row[1:]) for row in instances.values_list(*fields)]
+        metrics_counter('commcare.messaging.schedule_bucket.instances', len(rows), tags=tags)
+        batches = list(chunked(rows, settings.SCHEDULE_INSTANCE_BATCH_SIZE, list))
+        if batches:
+            client.set(_get_pending_batches_key(claim_key), len(batches), timeout=SCHEDULE_BUCKET_CLAIM_TIMEOUT)
+            client.expire(claim_key, SCHEDULE_BUCKET_CLAIM_TIMEOUT)
+    except Exception:
+        client.delete(claim_key)
+        raise
+
+    if not batches:
+        client.delete(claim_key)
+    for batch in batches:
+        handle_schedule_instance_batch_task.delay(cls_name, db_alias, batch, claim_key)
+
+
+@no_result_task(queue='reminder_queue')
+def handle_schedule_instance_batch_task(cls_name, db_alias, rows, claim_key):
+    """
+    Handles one batch of the schedule instances of a bucket (see
+    handle_schedule_instance_bucket), and releases the claim of the bucket
+    if it was the last batch.
+
+    :param rows: [schedule_instance_id hex, [case_id]] lists
+    """
+    cls = _get_schedule_instance_class(cls_name)
+    client = get_redis_client()
+    client.expire(claim_key, SCHEDULE_BUCKET_CLAIM_TIMEOUT)
+    try:
+        handle_schedule_instance_batch(cls, db_alias, [(uuid.UUID(row[0]), *row[1:]) for row in rows])
+    finally:
+        pending_key = _get_pending_batches_key(claim_key)
+        try:
+            pending_batches = client.decr(pending_key)
+        except ValueError:
+            # the count of pending batches expired along with the claim
+            pending_batches = 0
+        if pending_batches <= 0:
+            client.delete_many([claim_key, pending_key])
+
+
+def handle_schedule_instance_batch(cls, db_alias, rows):
+    """
+    Handles a batch of schedule instances of one shard. The schedules, cases
+    and case owners of the instances are loaded for the whole batch. Each
+    instance is then locked with the same key as the task that handles one
+    instance, and is loaded again and handled while it is locked, so only
+    one lock is held at a time.
+
+    :param rows: (schedule_instance_id, [case_id]) tuples
+    """
+    instances = list(
+        cls.objects.using(db_alias).filter(schedule_instance_id__in=[row[0] for row in rows])
+    )
+    domains_to_skip = {
+        domain for domain in {instance.domain for instance in instances}
+        if any_migrations_in_progress(domain)
+    }
+    instances = [instance for instance in instances if instance.domain not in domains_to_skip]
+    prefetch_schedule_instance_data(instances)
+
+    handled_schedule_ids = set()
+    for prefetched in instances:
+        lock_key = get_handle_schedule_instance_lock_key(
+            cls, prefetched.schedule_instance_id, getattr(prefetched, 'case_id', None))
+        with CriticalSection([lock_key], timeout=5 * 60):
+            try:
+                instance = cls.objects.using(db_alias).get(schedule_instance_id=prefetched.schedule_instance_id)
+            except cls.DoesNotExist:
+                continue
+            for attr in ('_prefetched_schedule', '_prefetched_case', '_prefetched_case_owner'):
+                if hasattr(prefetched, attr):
+                    setattr(instance, attr, getattr(prefetched, attr))
+            try:
+                if _handle_schedule_instance(instance, _get_save_function(cls)):
+                    handled_schedule_ids.add(instance.memoized_schedule.schedule_id)
+            except Exception:
+                notify_exception(None, "Error handling schedule instance", details={
+                    'instance_type': cls.__name__,
+                    'schedule_instance_id': instance.schedule_instance_id.hex,
+                })
+
+    broadcast_class = {
+        AlertScheduleInstance: ImmediateBroadcast,
+        TimedScheduleInstance: ScheduledBroadcast,
+    }.get(cls)
+    if broadcast_class:
+        for schedule_id in handled_schedule_ids:
+            update_broadcast_last_sent_timestamp(broadcast_class, schedule_id)
+
+
+def _get_save_function(cls):
+    if cls is AlertScheduleInstance:
+        return save_alert_schedule_instance
+    elif cls is TimedScheduleInstance:
+        return save_timed_schedule_instance
+    return save_case_schedule_instance
+
+
+def prefetch_schedule_instance_data(instances):
+    """
+    Loads the schedules, cases and case owners of schedule instances in bulk
+    so that they are not looked up for each instance.
+    """
+    schedules = {}
+    for schedule_class, id_attr in (
+        (AlertSchedule, 'alert_schedule_id'),
+        (TimedSchedule, 'timed_schedule_id'),
+    ):
+        schedule_ids = {getattr(instance, id_attr) for instance in instances if hasattr(instance, id_attr)}
+        if schedule_ids:
+            schedules.update(
+                (schedule.schedule_id, schedule)
+                for schedule in schedule_class.objects.filter(schedule_id__in=schedule_ids)
+            )
+    for instance in instances:
+        schedule_id = getattr(instance, 'alert_schedule_id', None) or getattr(instance, 'timed_schedule_id')
+        instance._prefetched_schedule = schedules.get(schedule_id)
+
+    case_instances = [instance for instance in instances if isinstance(instance, CaseScheduleInstanceMixin)]
+    cases = {}
+    case_ids_by_domain = defaultdict(set)
+    for instance in case_instances:
+        case_ids_by_domain[instance.domain].add(instance.case_id)
+    for domain, case_ids in case_ids_by_domain.items():
+        cases.update((case.case_id, case) for case in CommCareCase.objects.get_cases(list(case_ids), domain))
+    for instance in case_instances:
+        instance._prefetched_case = cases.get(instance.case_id)
+
+    owner_instances = [
+        instance for instance in case_instances
+        if instance.recipient_type == instance.RECIPIENT_TYPE_CASE_OWNER and instance._prefetched_case
+    ]
+    owners = get_wrapped_owners(get_owner_id(instance._prefetched_case) for instance in owner_instances)
+    for instance in owner_instances:
+        instance._prefetched_case_owner = owners.get(get_owner_id(instance._prefetched_case))
+
+
 @no_result_task(queue='background_queue', acks_late=True)
 def delete_schedule_instances_for_cases(domain, case_ids):
     for case_id in case_ids:
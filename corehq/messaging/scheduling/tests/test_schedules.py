@@ -1,10 +1,12 @@
+from collections import defaultdict
 from datetime import date, datetime, time
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from unittest.mock import patch
 
 from casexml.apps.case.tests.util import create_case
-from dimagi.utils.parsing import json_format_date
+from dimagi.utils.couch.cache.cache_core import get_redis_client
+from dimagi.utils.parsing import json_format_date, json_format_datetime
 
 from corehq.apps.domain.models import Domain
 from corehq.apps.hqcase.utils import update_case
@@ -24,6 +26,7 @@ from corehq.messaging.scheduling.scheduling_partitioned.dbaccessors import (
     delete_timed_schedule_instance,
     delete_timed_schedule_instances_for_schedule,
     get_alert_schedule_instances_for_schedule,
+    get_due_schedule_instance_buckets,
     get_timed_schedule_instances_for_schedule,
     save_alert_schedule_instance,
     save_timed_schedule_instance,
@@ -34,6 +37,12 @@ from corehq.messaging.scheduling.scheduling_partitioned.models import (
     TimedScheduleInstance,
 )
 from corehq.messaging.scheduling.tasks import (
+    get_handle_schedule_instance_lock_key,
+    get_schedule_bucket_claim_key,
+    handle_schedule_instance_batch,
+    handle_schedule_instance_batch_task,
+    handle_schedule_instance_bucket,
+    prefetch_schedule_instance_data,
     refresh_alert_schedule_instances,
     refresh_timed_schedule_instances,
 )
@@ -454,6 +463,89 @@ class DeleteScheduleInstancesTest(BaseScheduleTest):
         self.assertEqual(self.count(get_timed_schedule_instances_for_schedule(self.timed_schedule_2)), 0)
 
 
+@sharded
+@patch('corehq.messaging.scheduling.models.content.SMSContent.send')
+class ScheduleInstanceBatchTest(BaseScheduleTest):
+
+    def setUp(self):
+        super().setUp()
+        self.schedule = AlertSchedule.create_simple_alert(self.domain, SMSContent())
+        refresh_alert_schedule_instances(
+            self.schedule.schedule_id.hex,
+            (('CommCareUser', self.user1.get_id), ('CommCareUser', self.user2.get_id))
+        )
+
+    def tearDown(self):
+        delete_alert_schedule_instances_for_schedule(AlertScheduleInstance, self.schedule.schedule_id)
+        self.schedule.delete()
+        super().tearDown()
+
+    def test_prefetch_schedule_instance_data(self, send_patch):
+        instances = list(get_alert_schedule_instances_for_schedule(self.schedule))
+        prefetch_schedule_instance_data(instances)
+        with self.assertNumQueries(0):
+            for instance in instances:
+                self.assertEqual(instance.memoized_schedule, self.schedule)
+
+    def test_handle_schedule_instance_batch(self, send_patch):
+        for instance in get_alert_schedule_instances_for_schedule(self.schedule):
+            handle_schedule_instance_batch(
+                AlertScheduleInstance, instance._state.db, [(instance.schedule_instance_id,)]
+            )
+
+        self.assertEqual(send_patch.call_count, 2)
+        for instance in get_alert_schedule_instances_for_schedule(self.schedule):
+            self.assertFalse(instance.active)
+
+    def test_batch_locks_one_instance_at_a_time(self, send_patch):
+        instances = list(get_alert_schedule_instances_for_schedule(self.schedule))
+        db_alias = instances[0]._state.db
+        instances = [instance for instance in instances if instance._state.db == db_alias]
+        with patch('corehq.messaging.scheduling.tasks.CriticalSection') as critical_section:
+            handle_schedule_instance_batch(
+                AlertScheduleInstance, db_alias, [(instance.schedule_instance_id,) for instance in instances]
+            )
+
+        self.assertEqual(
+            sorted(call.args[0] for call in critical_section.call_args_list),
+            sorted(
+                [get_handle_schedule_instance_lock_key(AlertScheduleInstance, instance.schedule_instance_id)]
+                for instance in instances
+            ),
+        )
+
+    def test_skipped_domain_does_not_make_bucket_due(self, send_patch):
+        now = datetime.utcnow()
+        for instance in get_alert_schedule_instances_for_schedule(self.schedule):
+            db_alias = instance._state.db
+            self.assertNotEqual(get_due_schedule_instance_buckets(AlertScheduleInstance, db_alias, now), [])
+            self.assertEqual(
+                get_due_schedule_instance_buckets(AlertScheduleInstance, db_alias, now, {self.domain}), [])
+
+    @override_settings(SCHEDULE_INSTANCE_BATCH_SIZE=1)
+    def test_bucket_is_handled_in_batches(self, send_patch):
+        buckets = defaultdict(int)
+        for instance in get_alert_schedule_instances_for_schedule(self.schedule):
+            buckets[instance._state.db, instance.next_event_due.replace(second=0, microsecond=0)] += 1
+
+        client = get_redis_client()
+        for (db_alias, bucket), num_instances in buckets.items():
+            claim_key = get_schedule_bucket_claim_key(AlertScheduleInstance, db_alias, bucket)
+            client.set(claim_key, True, timeout=60)
+            with patch.object(handle_schedule_instance_batch_task, 'delay') as delay:
+                handle_schedule_instance_bucket(
+                    AlertScheduleInstance.__name__, db_alias, json_format_datetime(bucket), claim_key)
+            self.assertEqual(delay.call_count, num_instances)
+
+            for batch_call in delay.call_args_list:
+                self.assertIsNotNone(client.get(claim_key))
+                handle_schedule_instance_batch_task(*batch_call.args)
+            # the claim is released by the last batch
+            self.assertIsNone(client.get(claim_key))
+
+        self.assertEqual(send_patch.call_count, 2)
+
+
 @sharded
 @patch('corehq.messaging.scheduling.models.content.SMSContent.send')
 @patch('corehq.messaging.scheduling.util.utcnow')
@@ -4,9 +4,14 @@ from django.db.models import Q
 
 from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import CriticalSection
+from dimagi.utils.logging import notify_exception
 from field_audit.models import AuditAction
 
-from corehq.apps.data_interfaces.models import AutomaticUpdateRule
+from corehq import toggles
+from corehq.apps.data_interfaces.models import (
+    AutomaticUpdateRule,
+    batched_schedule_instance_refresh,
+)
 from corehq.apps.es import CaseES
 from corehq.apps.sms import tasks as sms_tasks
 from corehq.form_processor.exceptions import CaseNotFound
@@ -51,6 +56,18 @@ def sync_case_for_messaging_rule(self, domain, case_id, rule_id):
 
 @no_result_task(queue=settings.CELERY_REMINDER_CASE_UPDATE_BULK_QUEUE, acks_late=True)
 def sync_case_chunk_for_messaging_rule(domain, case_id_chunk, rule_id):
+    if toggles.BULK_REFRESH_MESSAGING_RULES.enabled(domain):
+        try:
+            sync_keys = sorted({get_sync_key(case_id) for case_id in case_id_chunk})
+            with CriticalSection(sync_keys, timeout=5 * 60):
+                _sync_case_chunk_for_messaging_rule(domain, case_id_chunk, rule_id)
+            return
+        except Exception:
+            notify_exception(None, "Error refreshing messaging rule in bulk", {
+                'domain': domain,
+                'rule_id': rule_id,
+            })
+
     for case_id in case_id_chunk:
         try:
             with CriticalSection([get_sync_key(case_id)], timeout=5 * 60):
@@ -114,6 +131,23 @@ def _sync_case_for_messaging_rule(domain, case_id, rule_id):
         MessagingRuleProgressHelper(rule_id).increment_current_case_count()
 
 
+def _sync_case_chunk_for_messaging_rule(domain, case_ids, rule_id):
+    case_load_counter("messaging_rule_sync", domain)(len(case_ids))
+    cases = CommCareCase.objects.get_cases(case_ids, domain)
+    found_case_ids = {case.case_id for case in cases}
+    for case_id in case_ids:
+        if case_id not in found_case_ids:
+            clear_messaging_for_case(domain, case_id)
+
+    rule = get_cached_rule(domain, rule_id)
+    if rule:
+        now = utcnow()
+        with batched_schedule_instance_refresh(rule, list(found_case_ids)):
+            for case in cases:
+                rule.run_rule(case, now)
+        MessagingRuleProgressHelper(rule_id).increment_current_case_count(count=len(cases))
+
+
 def initiate_messaging_rule_run(rule):
     if not rule.active:
         return
@@ -10,6 +10,7 @@ from corehq.apps.case_search.const import (
 )
 from corehq.apps.case_search.exceptions import CaseSearchNotEnabledException
 from corehq.apps.case_search.models import DomainsNotInCaseSearchIndex
+from corehq.apps.case_search.result_cache import increment_generations
 from corehq.apps.change_feed import topics
 from corehq.apps.change_feed.consumer.feed import (
     KafkaChangeFeed,
@@ -123,6 +124,14 @@ class CaseSearchPillowProcessor(ElasticProcessor):
 
         if domain and domain_needs_search_index(domain):
             super(CaseSearchPillowProcessor, self).process_change(change)
+            increment_generations(domain, _get_case_type(change))
+
+
+def _get_case_type(change):
+    if change.metadata is not None and change.metadata.document_subtype:
+        return change.metadata.document_subtype
+    doc = change.get_document()
+    return doc.get('type') if doc else None
 
 
 def get_case_search_processor():
@@ -96,6 +96,7 @@ def get_xform_pillow(
         processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE,
         topics=None,
         dedicated_migration_process=False,
+        pipeline_queue_size=0,
         **kwargs,
 ):
     """Generic XForm change processor
@@ -159,6 +160,8 @@ def get_xform_pillow(
         change_processed_event_handler=event_handler,
         processor=processors,
         processor_chunk_size=processor_chunk_size,
+        pipeline_queue_size=pipeline_queue_size,
+        prefetch_documents=True,
         process_num=process_num,
         is_dedicated_migration_process=dedicated_migration_process and (process_num == 0)
     )
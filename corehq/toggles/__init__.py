@@ -914,6 +914,39 @@ UCR_SUM_WHEN_TEMPLATES = StaticToggle(
     help_link='https://commcare-hq.readthedocs.io/ucr.html#sumwhencolumn-and-sumwhentemplatecolumn',
 )
 
+UCR_COMPILED_EXPRESSIONS = StaticToggle(
+    'ucr_compiled_expressions',
+    'Compile data source expressions and filters before evaluating them',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Evaluates the filters, base item expression and indicators of UCR data sources "
+        "with compiled functions that share repeated subexpressions."
+    ),
+)
+
+UCR_BULK_WRITES = StaticToggle(
+    'ucr_bulk_writes',
+    'Write UCR rows in pages of multi-row statements',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Saves the rows of data sources in pages of multi-row INSERT ... ON CONFLICT statements, "
+        "and saves the rows of many documents together when rebuilding data sources."
+    ),
+)
+
+UCR_PARALLEL_REBUILD = StaticToggle(
+    'ucr_parallel_rebuild',
+    'Rebuild UCR data sources in parallel ranges of documents',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Splits data source builds into ranges of documents by id hash that are built by separate "
+        "celery tasks. Each range can be resumed on its own."
+    ),
+)
+
 ASYNC_RESTORE = StaticToggle(
     'async_restore',
     'Generate restore response in an asynchronous task to prevent timeouts',
@@ -950,6 +983,17 @@ HIERARCHICAL_LOCATION_FIXTURE = StaticToggle(
     ),
 )
 
+LOCATION_FIXTURE_CACHE = StaticToggle(
+    'location_fixture_cache',
+    'Share cached location fixtures between users that sync the same locations',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Location fixtures are cached by the set of locations they include, so that mobile workers "
+        "assigned to the same locations get the same pre-rendered fixture."
+    ),
+)
+
 EXTENSION_CASES_SYNC_ENABLED = StaticToggle(
     'extension_sync',
     'Enable extension syncing',
@@ -1053,6 +1097,33 @@ CASE_SEARCH_INDEXED_METADATA = StaticToggle(
     """
 )
 
+CASE_SEARCH_RELATED_QUERY_PLANNER = StaticToggle(
+    'CASE_SEARCH_RELATED_QUERY_PLANNER',
+    "Case Search: Choose how related case lookups are run based on their size",
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    This is a performance optimization. Related case lookups (subcase-exists,
+    subcase-count and ancestor-exists) count their matches before running.
+    Empty lookups are skipped, large subcase lookups are aggregated in
+    Elasticsearch instead of fetching every subcase, and large ancestor lookups
+    are run in chunks of case IDs.
+    """
+)
+
+CASE_SEARCH_RESULT_CACHE = StaticToggle(
+    'CASE_SEARCH_RESULT_CACHE',
+    "Case Search: Cache the results of identical searches",
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    This is a performance optimization. The results of app searches are
+    cached in Redis for a few minutes, keyed on the normalized search
+    criteria. Cached results are invalidated when the case search pillow
+    processes a case of a case type the search depends on.
+    """
+)
+
 USH_CASE_CLAIM_UPDATES = StaticToggle(
     'case_claim_autolaunch',
     "USH Specific toggle to support several different case search/claim workflows in web apps",
@@ -1580,6 +1651,18 @@ CASE_DEDUPE_UPDATES = StaticToggle(
     help_link='https://confluence.dimagi.com/display/saas/Surfacing+Case+Duplicates+in+CommCare',
 )
 
+CASE_DEDUPE_BLOCKING_KEYS = StaticToggle(
+    'case_dedupe_blocking_keys',
+    'Find case duplicates with blocking keys stored in Postgres instead of Elasticsearch',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Cases are duplicates if their match properties have exactly the same values, as they are "
+        "when duplicates are found in Elasticsearch. Deduplication rules must be backfilled after "
+        "this is enabled."
+    ),
+)
+
 LEGACY_SYNC_SUPPORT = StaticToggle(
     'legacy_sync_support',
     "Support mobile sync bugs in older projects (2.9 and below).",
@@ -1987,6 +2070,17 @@ SKIP_ORM_FIXTURE_UPLOAD = StaticToggle(
     [NAMESPACE_DOMAIN]
 )
 
+LOOKUP_TABLE_ROW_XML_CACHE = StaticToggle(
+    'lookup_table_row_xml_cache',
+    'Cache the restore XML of each lookup table row',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Lookup table fixtures are assembled from the cached XML of their rows, keyed on the "
+        "row's last modified time, so that only new and changed rows are serialized on restore."
+    ),
+)
+
 ENABLE_UCR_MIRRORS = StaticToggle(
     'enable_ucr_mirrors',
     'Enable the mirrored engines for UCRs in this domain',
@@ -2017,6 +2111,32 @@ DISABLE_CASE_UPDATE_RULE_SCHEDULED_TASK = StaticToggle(
     [NAMESPACE_DOMAIN]
 )
 
+BATCH_CASE_UPDATE_RULE_SUBMISSIONS = StaticToggle(
+    'batch_case_update_rule_submissions',
+    'Submit the case updates of scheduled case update rule runs in multi-case forms',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Cases updated by a rule during a scheduled rule run are updated in
+    batches, with one form per batch instead of one form per case. Undoing
+    the rule archives whole batches. Rules that reference parent cases
+    still submit one form per case.
+    """
+)
+
+BULK_REFRESH_MESSAGING_RULES = StaticToggle(
+    'bulk_refresh_messaging_rules',
+    'Refresh the schedule instances of messaging rule runs in bulk',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    When a messaging rule is run, the schedule instances of each chunk of
+    cases are loaded in one query per shard, refreshed in memory, and only
+    the instances that changed are written. Chunks that fail are synced one
+    case at a time.
+    """
+)
+
 PROCESS_REPEATERS = FeatureRelease(
     'process_repeaters',
     'Process repeaters instead of processing repeat records independently',
@@ -2159,6 +2279,30 @@ LIVEQUERY_READ_FROM_STANDBYS = DynamicallyPredictablyRandomToggle(
     """
 )
 
+CASE_REACHABILITY_TABLE = StaticToggle(
+    'case_reachability_table',
+    'Save livequery results per case owner and reuse them in restores',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Restores read the live cases for each owner from a table that is
+    invalidated on case save, instead of walking the case index graph
+    on every restore. Adds a query to every case save in the domain.
+    """
+)
+
+INCREMENTAL_RESTORE = StaticToggle(
+    'incremental_restore',
+    'Reuse case blocks from previous restores for cases that have not changed',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Keeps an index of the serialized case and ledger blocks sent to each
+    user so that restores only need to load and serialize the cases that
+    were modified since the user's last restore.
+    """
+)
+
 ACCOUNTING_TESTING_TOOLS = StaticToggle(
     'accounting_testing_tools',
     'Enable Accounting Testing Tools',
@@ -5,7 +5,7 @@ from couchdbkit import ResourceNotFound
 from dimagi.ext.couchdbkit import (
     Document, DateTimeProperty, ListProperty, StringProperty
 )
-from corehq.util.quickcache import quickcache
+from corehq.util.quickcache import broadcast_quickcache
 
 
 TOGGLE_ID_PREFIX = 'hqFeatureToggle'
@@ -31,7 +31,7 @@ class Toggle(Document):
         self.bust_cache()
 
     @classmethod
-    @quickcache(['cls.__name__', 'docid'], timeout=60 * 60 * 24)
+    @broadcast_quickcache(['cls.__name__', 'docid'], timeout=60 * 60 * 24)
     def cached_get(cls, docid):
         try:
             return cls.get(docid)
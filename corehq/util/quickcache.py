@@ -1,13 +1,29 @@
+import logging
 import os
+import pickle
+import threading
+import time
 from base64 import b64encode
+from collections import OrderedDict
+from functools import wraps
+from inspect import signature
+
+from django.conf import settings
 
 from celery._state import get_current_task
+from django_redis import get_redis_connection
 from quickcache import ForceSkipCache
 from quickcache.django_quickcache import get_django_quickcache
 
 from corehq.util.global_request import get_request
 from corehq.util.soft_assert import soft_assert
 
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'quickcache-invalidation'
+LOCAL_CACHE_SIZE = 10000
+RESUBSCRIBE_DELAY = 5  # seconds
+
 quickcache_soft_assert = soft_assert(
     notify_admins=True,
     fail_if_debug=False,
@@ -44,4 +60,165 @@ quickcache = get_django_quickcache(timeout=5 * 60, memoize_timeout=10,
                                    assert_function=quickcache_soft_assert,
                                    session_function=get_session_key)
 
-__all__ = ['quickcache']
+
+def broadcast_quickcache(vary_on, timeout=5 * 60, local_timeout=60 * 60, skip_arg=None):
+    """quickcache with a long-lived in-process cache
+
+    Values are cached in Redis like `quickcache`, and also in an LRU in
+    the memory of each process for `local_timeout` seconds. Calling
+    `clear()` publishes the cleared key over Redis pub/sub, and every
+    subscribed process removes it from its in-process cache, so
+    `local_timeout` can be much longer than quickcache's
+    `memoize_timeout`.
+
+    The in-process cache is not used while the process is not
+    subscribed to invalidations (for example, if Redis is unavailable),
+    or in tests.
+    """
+    def decorator(fn):
+        cached_fn = quickcache(
+            vary_on,
+            timeout=timeout,
+            memoize_timeout=0,
+            skip_arg=skip_arg,
+        )(fn)
+        should_skip = _get_skip_function(fn, skip_arg)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if should_skip(*args, **kwargs) or not invalidation_bus.is_listening():
+                return cached_fn(*args, **kwargs)
+            key = cached_fn.get_cache_key(*args, **kwargs)
+            try:
+                return local_cache.get(key)
+            except KeyError:
+                pass
+            generation = invalidation_bus.generation
+            value = cached_fn(*args, **kwargs)
+            if generation == invalidation_bus.generation:
+                # not set if a key was invalidated while getting the value
+                local_cache.set(key, value, local_timeout)
+            return value
+
+        def clear(*args, **kwargs):
+            cached_fn.clear(*args, **kwargs)
+            invalidation_bus.publish(cached_fn.get_cache_key(*args, **kwargs))
+
+        wrapper.clear = clear
+        wrapper.get_cache_key = cached_fn.get_cache_key
+        return wrapper
+    return decorator
+
+
+def _get_skip_function(fn, skip_arg):
+    if skip_arg is None:
+        return lambda *args, **kwargs: False
+    if callable(skip_arg):
+        return skip_arg
+    fn_signature = signature(fn)
+
+    def should_skip(*args, **kwargs):
+        arguments = fn_signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        return arguments.arguments[skip_arg]
+    return should_skip
+
+
+class _LocalCache:
+    """Thread-safe in-process LRU cache
+
+    Values are pickled so callers can't modify cached values.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()  # key -> (pickled value, expires)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data, expires = self.items[key]
+            if expires < time.monotonic():
+                del self.items[key]
+                raise KeyError(key)
+            self.items.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.items[key] = (data, time.monotonic() + timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class _InvalidationBus:
+    """Invalidate keys of `local_cache` in all processes with Redis pub/sub
+
+    Each process subscribes with a daemon thread, which is started on
+    first use.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.generation = 0
+        self.listening = False
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def is_listening(self):
+        if settings.UNIT_TESTING:
+            return False
+        if self.pid != os.getpid():
+            # threads do not survive a fork
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.pid = os.getpid()
+                    self.listening = False
+                    self.cache.clear()
+                    threading.Thread(target=self._listen, name="quickcache-invalidation", daemon=True).start()
+        return self.listening
+
+    def publish(self, key):
+        self.invalidate(key)
+        try:
+            get_redis_connection().publish(INVALIDATION_CHANNEL, key)
+        except Exception:
+            logger.exception("Cannot publish quickcache invalidation")
+
+    def invalidate(self, key):
+        self.generation += 1
+        self.cache.delete(key)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection().pubsub()
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        # invalidations may have been missed while not subscribed
+                        self.cache.clear()
+                        self.listening = True
+                    elif message['type'] == 'message':
+                        self.invalidate(message['data'].decode('utf-8'))
+            except Exception:
+                logger.exception("Quickcache invalidation subscription failed")
+            finally:
+                self.listening = False
+            time.sleep(RESUBSCRIBE_DELAY)
+
+
+local_cache = _LocalCache(LOCAL_CACHE_SIZE)
+invalidation_bus = _InvalidationBus(local_cache)
+
+__all__ = ['quickcache', 'broadcast_quickcache']
@@ -1,6 +1,17 @@
+from contextlib import contextmanager
+from unittest.mock import patch
+
 from testil import eq
 
-from ..quickcache import _quickcache_id
+from corehq.util.test_utils import disable_quickcache
+
+from .. import quickcache as mod
+from ..quickcache import (
+    _quickcache_id,
+    broadcast_quickcache,
+    invalidation_bus,
+    local_cache,
+)
 
 
 def test_quickcache_id():
@@ -15,3 +26,76 @@ def test_quickcache_id():
     eq({len(id) for id in ids}, {7})
     # safe sanity check, 1% is NOT a reasonable collision rate
     assert len(set(ids)) > SAMPLE_SIZE * .99, (len(set(ids)), SAMPLE_SIZE)
+
+
+def test_broadcast_quickcache():
+    calls = []
+
+    @broadcast_quickcache(['name'], local_timeout=60)
+    def get_value(name):
+        calls.append(name)
+        return {'name': name}
+
+    with _listening_bus():
+        value = get_value('bob')
+        value['name'] = 'changed'
+        eq(get_value('bob'), {'name': 'bob'})
+        eq(calls, ['bob'])
+
+        get_value.clear('bob')
+        eq(get_value('bob'), {'name': 'bob'})
+        eq(calls, ['bob', 'bob'])
+
+
+def test_broadcast_quickcache_invalidation_from_other_process():
+    calls = []
+
+    @broadcast_quickcache(['name'], local_timeout=60)
+    def get_value(name):
+        calls.append(name)
+        return name
+
+    with _listening_bus():
+        get_value('bob')
+        invalidation_bus.invalidate(get_value.get_cache_key('bob'))
+        get_value('bob')
+        eq(calls, ['bob', 'bob'])
+
+
+def test_broadcast_quickcache_skip_arg():
+    calls = []
+
+    @broadcast_quickcache(['name'], skip_arg='strict')
+    def get_value(name, strict=False):
+        calls.append(name)
+        return name
+
+    with _listening_bus():
+        get_value('bob', strict=True)
+        get_value('bob', strict=True)
+        eq(calls, ['bob', 'bob'])
+
+
+def test_broadcast_quickcache_not_listening():
+    calls = []
+
+    @broadcast_quickcache(['name'])
+    def get_value(name):
+        calls.append(name)
+        return name
+
+    get_value('bob')
+    get_value('bob')
+    eq(calls, ['bob', 'bob'])
+
+
+@contextmanager
+def _listening_bus():
+    # only the in-process cache is tested
+    with disable_quickcache(), \
+            patch.object(invalidation_bus, 'is_listening', return_value=True), \
+            patch.object(mod, 'get_redis_connection'):
+        try:
+            yield
+        finally:
+            local_cache.clear()
@@ -711,6 +711,13 @@ REMINDERS_QUEUE_STALE_REMINDER_DURATION = 7 * 24
 REMINDERS_RATE_LIMIT_COUNT = 30
 REMINDERS_RATE_LIMIT_PERIOD = 60
 
+# Setting this to True will make queue_schedule_instances queue one task per
+# minute of due schedule instances on each shard, rather than one task per
+# schedule instance. Those tasks handle the schedule instances in batches of
+# SCHEDULE_INSTANCE_BATCH_SIZE.
+SCHEDULE_INSTANCE_TIME_WHEEL_ENABLED = False
+SCHEDULE_INSTANCE_BATCH_SIZE = 100
+
 # Used by the new reminders framework
 LOCAL_AVAILABLE_CUSTOM_SCHEDULING_CONTENT = {}
 AVAILABLE_CUSTOM_SCHEDULING_CONTENT = {
@@ -1073,6 +1080,8 @@ NO_DEVICE_LOG_ENVS = list(ICDS_ENVS) + ['production']
 
 MAX_RULE_UPDATES_IN_ONE_RUN = 10000
 RULE_UPDATE_HOUR = 0
+# Cases per form when the case updates of a rule run are batched
+RULE_CASE_UPDATE_BATCH_SIZE = 100
 
 DEFAULT_ODATA_FEED_LIMIT = 25
 